@@ -1,19 +1,32 @@
-from flask import Flask
+import time
+import click
+from flask import Flask, g, request
 from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
 from app.extensions import db, jwt, migrate
 from app.routes.auth import auth_bp
 from app.logger import Logger
 from app.routes.contact import contacts_bp
-from app.config import Config
+from app.routes.webhook import webhook_bp
+from app.routes.metrics import metrics_bp
+from app.config import Config, config
+from app.json_provider import create_json_provider
+from app.services.outbox import OutboxService, OutboxWorker
+from app.services.metrics import metrics, record_queries
+from app.services.passwords import PasswordHasherBusy
+from app.services.request_limits import apply_route_limits, default_limit, rate_limit_key
+from app.services.mirror_sync import MirrorSync
+from app.services.webhook import WebhookProcessor
 
 def create_app():
     logger = Logger("App")
     app = Flask(__name__)
+    app.json = create_json_provider(app)
 
     limiter = Limiter(
-        key_func=get_remote_address,
-        default_limits=["3 per minute"]
+        key_func=rate_limit_key,
+        default_limits=[default_limit],
+        storage_uri=config.RATELIMIT_STORAGE_URI,
+        strategy="fixed-window",
     )
 
     app.config.from_object(Config)
@@ -25,6 +38,65 @@ def create_app():
 
     app.register_blueprint(auth_bp, url_prefix="/api")
     app.register_blueprint(contacts_bp, url_prefix="/api")
+    app.register_blueprint(webhook_bp, url_prefix="/api")
+    # HubSpot delivers bursts of webhooks from a few addresses, the per-IP default limit would drop them
+    limiter.exempt(webhook_bp)
+    apply_route_limits(app, limiter)
+
+    if config.METRICS_ENABLED:
+        # Scraped by Prometheus, not part of the API and not rate limited
+        app.register_blueprint(metrics_bp)
+        limiter.exempt(metrics_bp)
+        record_queries()
+
+        @app.before_request
+        def start_timer():
+            g.request_started_at = time.perf_counter()
+
+        @app.after_request
+        def record_request(response):
+            if "request_started_at" in g:
+                # The route pattern rather than the path, so ids don't make a series each
+                route = request.url_rule.rule if request.url_rule else "unmatched"
+                metrics.observe(
+                    "http_request_duration_seconds", (request.method, route, str(response.status_code)),
+                    time.perf_counter() - g.request_started_at,
+                )
+            return response
+
+    outbox_worker = OutboxWorker(app)
+
+    @app.cli.command("outbox-worker")
+    @click.option("--retry-failed", is_flag=True, help="Move failed operations back to pending before draining.")
+    def run_outbox_worker(retry_failed):
+        """Drain the HubSpot outbox in the foreground."""
+        if retry_failed:
+            click.echo(f"Requeued {OutboxService.requeue_failed()} failed operations")
+        outbox_worker.run()
+
+    mirror_sync = MirrorSync(app)
+    app.extensions["hubspot_webhooks"] = WebhookProcessor(app, mirror_sync)
+
+    @app.cli.command("mirror-sync")
+    @click.option("--once", is_flag=True, help="Sync once and exit instead of polling.")
+    def run_mirror_sync(once):
+        """Sync the local HubSpot mirror in the foreground."""
+        if once:
+            mirror_sync.sync_once()
+        else:
+            mirror_sync.run()
+
+    if config.HUBSPOT_MIRROR_SYNC_ENABLED:
+        @app.before_request
+        def start_mirror_sync():
+            mirror_sync.ensure_started()
+
+    if config.HUBSPOT_WRITE_MODE == "outbox" and config.OUTBOX_WORKER_ENABLED:
+        # Started on the first request rather than here so CLI commands like `flask db upgrade`
+        # don't start it, and so every forked server worker gets its own thread
+        @app.before_request
+        def start_outbox_worker():
+            outbox_worker.ensure_started()
 
     @app.errorhandler(404)
     def not_found(error):
@@ -49,6 +121,11 @@ def create_app():
     def invalid_token_response(callback):
         return {"error": "Invalid token"}, 401
 
+    @app.errorhandler(PasswordHasherBusy)
+    def password_hasher_busy(e):
+        # Logins and registrations beyond what the bcrypt pool can queue fail fast instead of holding a worker
+        return {"error": "Too many logins in progress, try again shortly"}, 503, {"Retry-After": "1"}
+
     @app.errorhandler(429)
     def ratelimit_handler(e):
         return {"error": "ratelimit exceeded %s" % e.description}, 429
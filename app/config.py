@@ -1,4 +1,4 @@
-import os, dotenv
+import json, os, dotenv
 
 dotenv.load_dotenv()
 
@@ -8,10 +8,85 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = os.getenv("SQLALCHEMY_TRACK_MODIFICATIONS", False)
     JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "jwtsecretkey")
     JWT_ACCESS_TOKEN_EXPIRES = 86400
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    METRICS_DIR = os.getenv("METRICS_DIR", "/tmp/hubspot-crm-metrics")
+    METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", 5))
+    LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+    LOG_SAMPLE_RATES = json.loads(os.getenv("LOG_SAMPLE_RATES", "{}"))
+    LOG_SAMPLE_MESSAGES = json.loads(os.getenv("LOG_SAMPLE_MESSAGES", "{}"))
+    RATELIMIT_STORAGE_URI = os.getenv("RATELIMIT_STORAGE_URI", "mmap:///tmp/hubspot-crm-rate-limits")
+    RATELIMIT_DEFAULT = os.getenv("RATELIMIT_DEFAULT", "3 per minute")
+    RATELIMIT_IDENTITY_DEFAULT = os.getenv("RATELIMIT_IDENTITY_DEFAULT", "3 per minute")
+    RATELIMIT_ROUTES = json.loads(os.getenv("RATELIMIT_ROUTES", "{}"))
+    PASSWORD_HASH_ROUNDS = int(os.getenv("PASSWORD_HASH_ROUNDS", 12))
+    PASSWORD_HASH_POOL = os.getenv("PASSWORD_HASH_POOL", "threads")
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", 8))
+    USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", 300))
+    USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", 10000))
     PORT = os.getenv("PORT", 5001)
     HUBSPOT_CLIENT_ID = os.getenv("HUBSPOT_CLIENT_ID")
     HUBSPOT_CLIENT_SECRET = os.getenv("HUBSPOT_CLIENT_SECRET")
     HUBSPOT_REFRESH_TOKEN = os.getenv("HUBSPOT_REFRESH_TOKEN")
+    HUBSPOT_API_BASE_URL = os.getenv("HUBSPOT_API_BASE_URL")
+    HUBSPOT_TOKEN_STORE = os.getenv("HUBSPOT_TOKEN_STORE", "file")
+    HUBSPOT_TOKEN_FILE = os.getenv("HUBSPOT_TOKEN_FILE", "/tmp/hubspot-token.json")
+    HUBSPOT_TOKEN_REFRESH_AHEAD = int(os.getenv("HUBSPOT_TOKEN_REFRESH_AHEAD", 300))
+    HUBSPOT_TOKEN_REFRESH_MARGIN = int(os.getenv("HUBSPOT_TOKEN_REFRESH_MARGIN", 30))
+    HUBSPOT_TOKEN_RETRY_INTERVAL = int(os.getenv("HUBSPOT_TOKEN_RETRY_INTERVAL", 10))
+    HUBSPOT_WARM_UP = os.getenv("HUBSPOT_WARM_UP", "true").lower() == "true"
+    HUBSPOT_BATCH_SIZE = int(os.getenv("HUBSPOT_BATCH_SIZE", 100))
+    HUBSPOT_ASSOCIATIONS_BATCH_SIZE = int(os.getenv("HUBSPOT_ASSOCIATIONS_BATCH_SIZE", 1000))
+    HUBSPOT_FETCH_MODE = os.getenv("HUBSPOT_FETCH_MODE", "threads")
+    HUBSPOT_MAX_CONCURRENCY = int(os.getenv("HUBSPOT_MAX_CONCURRENCY", 4))
+    HUBSPOT_CALL_TIMEOUT = float(os.getenv("HUBSPOT_CALL_TIMEOUT", 10))
+    HUBSPOT_CONNECT_TIMEOUT = float(os.getenv("HUBSPOT_CONNECT_TIMEOUT", 3))
+    HUBSPOT_POOL_MAXSIZE = int(os.getenv("HUBSPOT_POOL_MAXSIZE", 10))
+    HUBSPOT_POOL_HOSTS = int(os.getenv("HUBSPOT_POOL_HOSTS", 4))
+    HUBSPOT_POOL_BLOCK = os.getenv("HUBSPOT_POOL_BLOCK", "false").lower() == "true"
+    HUBSPOT_POOL_KEEPALIVE = os.getenv("HUBSPOT_POOL_KEEPALIVE", "true").lower() == "true"
+    HUBSPOT_RATE_LIMIT_STORE = os.getenv("HUBSPOT_RATE_LIMIT_STORE", "file")
+    HUBSPOT_RATE_LIMIT_FILE = os.getenv("HUBSPOT_RATE_LIMIT_FILE", "/tmp/hubspot-rate-limit.json")
+    HUBSPOT_RATE_LIMIT = float(os.getenv("HUBSPOT_RATE_LIMIT", 10))
+    HUBSPOT_RATE_LIMIT_BURST = float(os.getenv("HUBSPOT_RATE_LIMIT_BURST", 20))
+    HUBSPOT_SEARCH_RATE_LIMIT = float(os.getenv("HUBSPOT_SEARCH_RATE_LIMIT", 4))
+    HUBSPOT_SEARCH_RATE_LIMIT_BURST = float(os.getenv("HUBSPOT_SEARCH_RATE_LIMIT_BURST", 4))
+    HUBSPOT_RATE_LIMIT_MAX_WAIT = float(os.getenv("HUBSPOT_RATE_LIMIT_MAX_WAIT", 10))
+    HUBSPOT_MAX_RETRIES = int(os.getenv("HUBSPOT_MAX_RETRIES", 3))
+    HUBSPOT_RETRY_BACKOFF_BASE = float(os.getenv("HUBSPOT_RETRY_BACKOFF_BASE", 0.5))
+    HUBSPOT_RETRY_BACKOFF_MAX = float(os.getenv("HUBSPOT_RETRY_BACKOFF_MAX", 8))
+    HUBSPOT_CACHE_BACKEND = os.getenv("HUBSPOT_CACHE_BACKEND", "memory")
+    HUBSPOT_CACHE_URL = os.getenv("HUBSPOT_CACHE_URL", "redis://localhost:6379/0")
+    HUBSPOT_CACHE_TTL = int(os.getenv("HUBSPOT_CACHE_TTL", 300))
+    HUBSPOT_CACHE_MAX_ENTRIES = int(os.getenv("HUBSPOT_CACHE_MAX_ENTRIES", 10000))
+    HUBSPOT_EXPORT_PAGE_SIZE = int(os.getenv("HUBSPOT_EXPORT_PAGE_SIZE", 100))
+    JSON_PROVIDER = os.getenv("JSON_PROVIDER", "default")
+    HUBSPOT_PAGE_CACHE_TTL = int(os.getenv("HUBSPOT_PAGE_CACHE_TTL", 30))
+    HUBSPOT_COALESCE_READS = os.getenv("HUBSPOT_COALESCE_READS", "true").lower() == "true"
+    HUBSPOT_COALESCE_GRACE = float(os.getenv("HUBSPOT_COALESCE_GRACE", 0.5))
+    HUBSPOT_LOOKUP_TTL = int(os.getenv("HUBSPOT_LOOKUP_TTL", 86400))
+    HUBSPOT_UPSERT_MODE = os.getenv("HUBSPOT_UPSERT_MODE", "batch")
+    HUBSPOT_DEAL_UNIQUE_PROPERTY = os.getenv("HUBSPOT_DEAL_UNIQUE_PROPERTY")
+    HUBSPOT_READ_SOURCE = os.getenv("HUBSPOT_READ_SOURCE", "live")
+    HUBSPOT_MIRROR_SYNC_ENABLED = os.getenv("HUBSPOT_MIRROR_SYNC_ENABLED", "false").lower() == "true"
+    HUBSPOT_MIRROR_SYNC_INTERVAL = float(os.getenv("HUBSPOT_MIRROR_SYNC_INTERVAL", 30))
+    HUBSPOT_MIRROR_MAX_STALENESS = int(os.getenv("HUBSPOT_MIRROR_MAX_STALENESS", 300))
+    HUBSPOT_MIRROR_OVERLAP = int(os.getenv("HUBSPOT_MIRROR_OVERLAP", 60))
+    HUBSPOT_MIRROR_LEASE = int(os.getenv("HUBSPOT_MIRROR_LEASE", 300))
+    HUBSPOT_WEBHOOK_URL = os.getenv("HUBSPOT_WEBHOOK_URL")
+    HUBSPOT_WEBHOOK_MAX_AGE = int(os.getenv("HUBSPOT_WEBHOOK_MAX_AGE", 300))
+    HUBSPOT_WEBHOOK_QUEUE_SIZE = int(os.getenv("HUBSPOT_WEBHOOK_QUEUE_SIZE", 1000))
+    HUBSPOT_WEBHOOK_BATCH_SIZE = int(os.getenv("HUBSPOT_WEBHOOK_BATCH_SIZE", 500))
+    HUBSPOT_WEBHOOK_BATCH_WINDOW = float(os.getenv("HUBSPOT_WEBHOOK_BATCH_WINDOW", 2))
+    BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", 1000))
+    HUBSPOT_WRITE_MODE = os.getenv("HUBSPOT_WRITE_MODE", "sync")
+    OUTBOX_WORKER_ENABLED = os.getenv("OUTBOX_WORKER_ENABLED", "true").lower() == "true"
+    OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", 2))
+    OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", 100))
+    OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", 8))
+    OUTBOX_BACKOFF_BASE = float(os.getenv("OUTBOX_BACKOFF_BASE", 5))
+    OUTBOX_BACKOFF_MAX = float(os.getenv("OUTBOX_BACKOFF_MAX", 600))
+    OUTBOX_LEASE = int(os.getenv("OUTBOX_LEASE", 300))
     FLASK_ENV = os.getenv("FLASK_ENV", "development")
 
 config = Config()
@@ -0,0 +1,47 @@
+from flask.json.provider import DefaultJSONProvider, JSONProvider
+from app.config import config
+from app.services.records import Contact, Deal, Ticket
+
+RECORD_TYPES = (Contact, Deal, Ticket)
+
+def _default(value):
+    if isinstance(value, RECORD_TYPES):
+        return value.to_dict()
+    return DefaultJSONProvider.default(value)
+
+class RecordJSONProvider(DefaultJSONProvider):
+    """Flask's standard library provider, able to encode the CRM records of app.services.records."""
+    default = staticmethod(_default)
+
+class OrjsonProvider(JSONProvider):
+    """
+    Encodes with orjson, a good deal faster than the standard library on large contact pages. Keys are
+    sorted and output is compact like with Flask's default provider, non-ASCII text is sent as UTF-8.
+    """
+
+    def __init__(self, app):
+        try:
+            import orjson
+        except ImportError:
+            raise ImportError("The orjson package is required for JSON_PROVIDER=orjson")
+        super().__init__(app)
+        self.orjson = orjson
+        self.options = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj, **kwargs):
+        return self.orjson.dumps(obj, default=_default, option=self.options).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return self.orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Skips the round trip through str that dumps needs
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            self.orjson.dumps(obj, default=_default, option=self.options) + b"\n", mimetype="application/json",
+        )
+
+def create_json_provider(app):
+    if config.JSON_PROVIDER == "orjson":
+        return OrjsonProvider(app)
+    return RecordJSONProvider(app)
@@ -1,32 +1,172 @@
-from logging import getLogger, StreamHandler, Formatter, DEBUG
+import atexit
+import json
+import os
+import queue
+import random
+import sys
+from logging import getLevelName, getLogger, makeLogRecord, Formatter, StreamHandler, DEBUG, INFO, WARNING, ERROR
+from logging.handlers import QueueHandler, QueueListener
+from threading import Lock
+from app.config import config
+
+class JsonFormatter(Formatter):
+    """One JSON object per line, contexts that aren't JSON serializable (e.g. exceptions) are logged as strings."""
+
+    def format(self, record):
+        line = {
+            "timestamp": self.formatTime(record),
+            "name": record.name,
+            "level": record.levelname,
+            "message": record.getMessage(),
+            "filename": record.filename,
+            "lineno": record.lineno,
+            "funcName": record.funcName,
+            "context": getattr(record, "context", None),
+        }
+        if getattr(record, "sample_rate", None) is not None:
+            line["sample_rate"] = record.sample_rate
+        if record.exc_info:
+            line["exception"] = self.formatException(record.exc_info)
+        return json.dumps(line, default=str)
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    Formats records on the calling thread, so later changes to a context don't show up in the log,
+    and hands them to a bounded queue written out by a background thread. When the queue is full
+    the line is dropped instead of blocking the request; the number dropped is logged once there is room.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.setFormatter(JsonFormatter())
+        self._lock = Lock()
+        self.dropped = 0
+        self._unreported = 0
+
+    def prepare(self, record):
+        return makeLogRecord({ **record.__dict__, "exc_info": None, "exc_text": None, "args": None, "msg": self.format(record) })
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+                self._unreported += 1
+            return
+        if self._unreported:
+            self._report_dropped()
+
+    def _report_dropped(self):
+        with self._lock:
+            count, self._unreported = self._unreported, 0
+        record = makeLogRecord({
+            "name": "Logger", "levelno": WARNING, "levelname": "WARNING", "msg": "Dropped log lines",
+            "context": {"count": count, "total": self.dropped},
+        })
+        try:
+            self.queue.put_nowait(self.prepare(record))
+        except queue.Full:
+            with self._lock:
+                self._unreported += count
+
+    def get_stats(self):
+        return {"queued": self.queue.qsize(), "dropped": self.dropped}
+
+    def reset_stats(self):
+        self._lock = Lock()
+        self.dropped = 0
+        self._unreported = 0
+
+class DrainingQueueListener(QueueListener):
+    def enqueue_sentinel(self):
+        # Waits for room, stopping with a full queue would otherwise fail instead of writing it out
+        self.queue.put(self._sentinel)
+
+class LogPipeline:
+    """The queue, its handler and the thread writing to stderr, shared by every Logger of the process."""
+
+    def __init__(self):
+        self.handler = DroppingQueueHandler(queue.Queue(maxsize=config.LOG_QUEUE_SIZE))
+        self.listener = None
+        self._lock = Lock()
+        self.start()
+        atexit.register(self.stop)
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def start(self):
+        output = StreamHandler(sys.stderr)
+        output.setFormatter(Formatter("%(message)s"))
+        self.listener = DrainingQueueListener(self.handler.queue, output)
+        self.listener.start()
+
+    def stop(self):
+        # Writes out what is still queued
+        with self._lock:
+            if self.listener is not None:
+                self.listener.stop()
+                self.listener = None
+
+    def _after_fork(self):
+        # The writer thread doesn't survive a fork and the queue's lock may have been held, start over.
+        # The lines the parent dropped are counted in the parent's metrics
+        self._lock = Lock()
+        self.handler.queue = queue.Queue(maxsize=config.LOG_QUEUE_SIZE)
+        self.handler.reset_stats()
+        self.start()
+
+_pipeline = None
+_pipeline_lock = Lock()
+
+def get_pipeline():
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = LogPipeline()
+    return _pipeline
 
 class Logger:
+    """
+    Logs `(message, context)` pairs as JSON lines through the shared pipeline. Records are sampled
+    before they are built: `LOG_SAMPLE_MESSAGES` keeps a fraction of the lines with a given message,
+    e.g. `{"Retrieved contacts": 0.1}`, `LOG_SAMPLE_RATES` of every line of a level, e.g. `{"INFO": 0.5}`.
+    """
+
     def __init__(self, name):
         self.logger = getLogger(name)
         self.logger.setLevel(DEBUG)
-        handler = StreamHandler()
-        handler.setLevel(DEBUG)
-        json_formatter = Formatter(
-            '{"timestamp": "%(asctime)s", "name": "%(name)s", "level": "%(levelname)s", "message": "%(message)s", "filename": "%(filename)s", "lineno": %(lineno)d, "funcName": "%(funcName)s", "context": %(context)s}'
-        )
-        handler.setFormatter(json_formatter)
-        handler.set_name(name)
-        self.logger.addHandler(handler)
+        handler = get_pipeline().handler
+        # getLogger returns the same logger for a name, constructing Logger again must not add a second handler
+        if handler not in self.logger.handlers:
+            self.logger.addHandler(handler)
 
     def get_logger(self):
         return self.logger
-    
+
     def log(self, level, message, data=None):
-        self.logger.log(level, message, extra={"context": data})
+        self._log(level, message, data)
 
     def error(self, message, context=None):
-        self.logger.error(message, extra={"context": context})
+        self._log(ERROR, message, context)
 
     def info(self, message, context=None):
-        self.logger.info(message, extra={"context": context})
+        self._log(INFO, message, context)
 
     def debug(self, message, context=None):
-        self.logger.debug(message, extra={"context": context})
+        self._log(DEBUG, message, context)
 
     def warning(self, message, context=None):
-        self.logger.warning(message, extra={"context": context})
+        self._log(WARNING, message, context)
+
+    def _log(self, level, message, context):
+        if not self.logger.isEnabledFor(level):
+            return
+        sample_rate = config.LOG_SAMPLE_MESSAGES.get(message, config.LOG_SAMPLE_RATES.get(getLevelName(level)))
+        if sample_rate is not None and random.random() >= sample_rate:
+            return
+        self.logger.log(level, message, extra={"context": context, "sample_rate": sample_rate}, stacklevel=3)
+
+def get_log_stats():
+    """Lines waiting to be written and lines dropped by this process, exported on `/metrics`."""
+    return get_pipeline().handler.get_stats()
@@ -1,5 +1,5 @@
 from app.extensions import db
-from bcrypt import checkpw, hashpw, gensalt
+from app.services.passwords import PasswordHasherBusy, password_hasher
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -9,13 +9,92 @@ class User(db.Model):
     firstname = db.Column(db.String(80), nullable=False)
     lastname = db.Column(db.String(80), nullable=False)
     phone = db.Column(db.String(15), nullable=False)
-    contact_id = db.Column(db.String(80), nullable=False)
+    # Empty until the outbox worker has created the contact when HUBSPOT_WRITE_MODE=outbox
+    contact_id = db.Column(db.String(80), nullable=True)
     password_hash = db.Column(db.String(128), nullable=False)
     created_at = db.Column(db.DateTime, default=db.func.now())
     updated_at = db.Column(db.DateTime, default=db.func.now(), onupdate=db.func.now())
 
     def set_password(self, password):
-        self.password_hash = hashpw(password.encode('utf-8'), gensalt()).decode('utf-8')
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password):
-        return checkpw(password.encode('utf-8'), self.password_hash.encode('utf-8'))
+        """
+        Rehashes with the configured cost when the stored hash used another one, the caller commits.
+        When the hashing pool is busy the rehash is left for a later login, the password was verified.
+        """
+        if not password_hasher.verify(password, self.password_hash):
+            return False
+        if password_hasher.needs_rehash(self.password_hash):
+            try:
+                self.set_password(password)
+            except PasswordHasherBusy:
+                pass
+        return True
+
+class HubspotLookup(db.Model):
+    """Local index of HubSpot object ids by a unique key (contact email, deal name)."""
+    __tablename__ = 'hubspot_lookups'
+    __table_args__ = (db.UniqueConstraint('object_type', 'lookup_key'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    object_type = db.Column(db.String(20), nullable=False)
+    lookup_key = db.Column(db.String(255), nullable=False)
+    object_id = db.Column(db.String(80), nullable=False)
+    updated_at = db.Column(db.DateTime, default=db.func.now(), onupdate=db.func.now())
+
+class HubspotOutbox(db.Model):
+    """HubSpot writes queued in the same transaction as the local write, drained by OutboxWorker."""
+    __tablename__ = 'hubspot_outbox'
+    __table_args__ = (db.Index('ix_hubspot_outbox_status_next_attempt_at', 'status', 'next_attempt_at'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    operation = db.Column(db.String(30), nullable=False)
+    payload = db.Column(db.JSON, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=True)
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, default=db.func.now())
+    locked_until = db.Column(db.DateTime, nullable=True)
+    object_id = db.Column(db.String(80), nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=db.func.now())
+    updated_at = db.Column(db.DateTime, default=db.func.now(), onupdate=db.func.now())
+
+class HubspotMirrorMixin:
+    """Columns shared by the local copies of HubSpot objects kept up to date by MirrorSync."""
+    id = db.Column(db.BigInteger, primary_key=True, autoincrement=False)
+    properties = db.Column(db.JSON, nullable=False)
+    modified_at = db.Column(db.DateTime, nullable=True)
+    synced_at = db.Column(db.DateTime, default=db.func.now(), onupdate=db.func.now())
+
+class HubspotContact(HubspotMirrorMixin, db.Model):
+    __tablename__ = 'hubspot_contacts'
+
+class HubspotDeal(HubspotMirrorMixin, db.Model):
+    __tablename__ = 'hubspot_deals'
+
+class HubspotTicket(HubspotMirrorMixin, db.Model):
+    __tablename__ = 'hubspot_tickets'
+
+class HubspotAssociation(db.Model):
+    """Mirrored contact to deal and deal to ticket associations."""
+    __tablename__ = 'hubspot_associations'
+    __table_args__ = (db.Index('ix_hubspot_associations_to', 'to_type', 'to_id'),)
+
+    from_type = db.Column(db.String(20), primary_key=True)
+    from_id = db.Column(db.BigInteger, primary_key=True, autoincrement=False)
+    to_type = db.Column(db.String(20), primary_key=True)
+    to_id = db.Column(db.BigInteger, primary_key=True, autoincrement=False)
+
+class HubspotSyncState(db.Model):
+    """Sync progress of one mirrored object type."""
+    __tablename__ = 'hubspot_sync_state'
+
+    object_type = db.Column(db.String(20), primary_key=True)
+    # Modification time of the newest object synced so far, the next sync searches from there
+    high_water_mark = db.Column(db.DateTime, nullable=True)
+    # Last time a sync caught up with HubSpot, reads only use the mirror while this is recent
+    synced_at = db.Column(db.DateTime, nullable=True)
+    locked_until = db.Column(db.DateTime, nullable=True)
+    updated_at = db.Column(db.DateTime, default=db.func.now(), onupdate=db.func.now())
@@ -4,6 +4,7 @@ from app.services.user import UserService
 from app.logger import Logger
 from app.validation.validator import RegisterSchema, LoginSchema
 from app.services.hubspot import hubspot_service
+from app.config import config
 
 auth_bp = Blueprint("auth", __name__)
 logger = Logger('AuthRouter')
@@ -22,12 +23,15 @@ def register():
     if user_exists:
         return jsonify({"error": "User already exists"}), 400
 
-    contact_response = hubspot_service.create_or_update_contact(data)
-    if "error" in contact_response:
-        logger.error(contact_response["error"], contact_response)
-        return jsonify({"error": "Failed to create account" }), 500
+    if config.HUBSPOT_WRITE_MODE == "outbox":
+        data["contact"] = None
+    else:
+        contact_response = hubspot_service.create_or_update_contact(data)
+        if "error" in contact_response:
+            logger.error(contact_response["error"], contact_response)
+            return jsonify({"error": "Failed to create account" }), 500
+        data["contact"] = contact_response["data"]
 
-    data["contact"] = contact_response["data"]
     response = AuthService.register_user(**data, password=password)
     if "error" in response:
         logger.error(response["error"], response)
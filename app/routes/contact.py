@@ -1,10 +1,14 @@
 from functools import wraps
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
 from app.logger import Logger
-from app.validation.validator import SearchUsersSchema, DealSchema, TicketSchema
+from app.validation.validator import SearchUsersSchema, DealSchema, TicketSchema, TicketBatchItemSchema
+from app.config import config
 from app.services.hubspot import hubspot_service
+from app.services.page_versions import page_version
 from app.services.user import UserService
+from app.services.outbox import OutboxService
+from app.extensions import db
 
 contacts_bp = Blueprint("contacts", __name__)
 logger = Logger('ContactRouter')
@@ -24,6 +28,52 @@ def jwt_required_int():
         return wrapper
     return decorator
 
+def get_contact_id(user_id: int):
+    """
+    Reads the contact id from the token. Tokens issued before it was added to the claims, or while
+    the contact was still queued in the outbox, fall back to UserService's cache of the users table.
+    """
+    contact_id = get_jwt().get("contact_id")
+    if contact_id:
+        return {"data": contact_id}
+    return UserService.get_contact_id(user_id)
+
+def validate_batch(schema, body):
+    if not isinstance(body, list) or not body:
+        return {"error": "Request body must be a non-empty list"}
+    if len(body) > config.BATCH_MAX_ITEMS:
+        return {"error": f"A batch can contain at most {config.BATCH_MAX_ITEMS} items"}
+    return schema.validate(body)
+
+def batch_response(message, results):
+    failed = sum("error" in result for result in results)
+    status = 201 if not failed else 207
+    return jsonify({"message": message, "data": results, "failed": failed}), status
+
+def contact_pending():
+    # The user's contact is still queued in the outbox, writes sent straight to HubSpot would have nothing to link to
+    return jsonify({"error": "Contact is not created in HubSpot yet, retry later"}), 409
+
+def queue_response(message, entries):
+    db.session.commit()
+    return jsonify({"message": message, "data": {"outbox_ids": [entry.id for entry in entries]}}), 202
+
+def versioned(response, version):
+    # Clients keep the page but revalidate it on every use
+    response.set_etag(version, weak=True)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+def not_modified(version, hubspot_calls):
+    return versioned(current_app.response_class(status=304, headers={"X-HubSpot-Calls": str(hubspot_calls)}), version)
+
+def stream_contacts(cursor, properties, limit=None):
+    def generate():
+        for contact in hubspot_service.iter_contacts(config.HUBSPOT_EXPORT_PAGE_SIZE, cursor, properties, limit):
+            yield current_app.json.dumps(contact) + "\n"
+    return Response(stream_with_context(generate()), 200, mimetype="application/x-ndjson")
+
 @contacts_bp.route("/new-crm-objects", methods=["GET"])
 @jwt_required()
 def search():
@@ -35,12 +85,31 @@ def search():
     data = schema.load(request.args)
     cursor = data.get("cursor")
     limit = data.get("limit")
-    contacts = hubspot_service.get_contacts(limit, cursor)
+    properties = schema.get_properties(data)
+    if data.get("stream") == "ndjson":
+        # Without an explicit limit the export runs to the last contact
+        return stream_contacts(cursor, properties, limit if "limit" in request.args else None)
 
-    return jsonify({
+    if request.if_none_match:
+        # Answered from the mirror's modified dates when possible, without reading the page
+        version = hubspot_service.get_page_version(limit, cursor, properties)
+        if version is not None and request.if_none_match.contains_weak(version):
+            return not_modified(version, 0)
+
+    contacts = hubspot_service.get_contacts(limit, cursor, properties)
+    hubspot_calls = contacts.pop("hubspot_calls", 0)
+    version = page_version(contacts["data"], properties) if "data" in contacts else None
+    # Checked before the page is serialized
+    if version is not None and request.if_none_match.contains_weak(version):
+        return not_modified(version, hubspot_calls)
+
+    response = jsonify({
         "message": "Contacts retrieved successfully",
         "data": contacts
-    }), 200
+    })
+    if version is not None:
+        versioned(response, version)
+    return response, 200, {"X-HubSpot-Calls": str(hubspot_calls)}
 
 @contacts_bp.route("/deals", methods=["POST"])
 @jwt_required()
@@ -52,13 +121,19 @@ def create_deal(user_id: int):
         logger.error("Validation error", errors)
         return jsonify(errors), 400
 
-    user = UserService.get_user_by_id(user_id)
-    if not user:
-        return jsonify({"error": "User not found"}), 404
+    contact = get_contact_id(user_id)
+    if "error" in contact:
+        return jsonify(contact), 404
 
-    contact_id = user.contact_id
+    contact_id = contact["data"]
     data = DealSchema().load(body)
     data["dealstage"] = data["dealstage"].value
+    if config.HUBSPOT_WRITE_MODE == "outbox":
+        entry = OutboxService.enqueue(OutboxService.UPSERT_DEAL, {"properties": data}, user_id)
+        return queue_response("Deal queued", [entry])
+
+    if contact_id is None:
+        return contact_pending()
     response = hubspot_service.create_or_update_deal(contact_id, data["dealname"], data)
     if "error" in response:
         logger.error(response["error"], response)
@@ -76,16 +151,79 @@ def create_ticket(user_id: int, deal_id: int):
         logger.error("Validation error", errors)
         return jsonify(errors), 400
 
-    user = UserService.get_user_by_id(user_id)
-    if not user:
-        return jsonify({"error": "User not found"}), 404
+    contact = get_contact_id(user_id)
+    if "error" in contact:
+        return jsonify(contact), 404
 
-    contact_id = user.contact_id
+    contact_id = contact["data"]
     data = TicketSchema().load(body)
     data["category"] = data["category"].value
+    if config.HUBSPOT_WRITE_MODE == "outbox":
+        entry = OutboxService.enqueue(OutboxService.CREATE_TICKET, {"deal_id": deal_id, "properties": data}, user_id)
+        return queue_response("Ticket queued", [entry])
+
+    if contact_id is None:
+        return contact_pending()
     response = hubspot_service.create_ticket(contact_id, deal_id, data)
     if "error" in response:
         logger.error(response["error"], response)
         return jsonify(response), 400
 
     return jsonify(response), 201
+
+@contacts_bp.route("/deals/batch", methods=["POST"])
+@jwt_required()
+@jwt_required_int()
+def create_deals(user_id: int):
+    body = request.get_json()
+    errors = validate_batch(DealSchema(many=True), body)
+    if errors:
+        logger.error("Validation error", errors)
+        return jsonify(errors), 400
+
+    contact = get_contact_id(user_id)
+    if "error" in contact:
+        return jsonify(contact), 404
+
+    deals = DealSchema(many=True).load(body)
+    for deal in deals:
+        deal["dealstage"] = deal["dealstage"].value
+    if config.HUBSPOT_WRITE_MODE == "outbox":
+        entries = [OutboxService.enqueue(OutboxService.UPSERT_DEAL, {"properties": deal}, user_id) for deal in deals]
+        return queue_response("Deals queued", entries)
+
+    if contact["data"] is None:
+        return contact_pending()
+    results = hubspot_service.create_or_update_deals(contact["data"], deals)
+    return batch_response("Deals processed", results)
+
+@contacts_bp.route("/tickets/batch", methods=["POST"])
+@jwt_required()
+@jwt_required_int()
+def create_tickets(user_id: int):
+    body = request.get_json()
+    errors = validate_batch(TicketBatchItemSchema(many=True), body)
+    if errors:
+        logger.error("Validation error", errors)
+        return jsonify(errors), 400
+
+    contact = get_contact_id(user_id)
+    if "error" in contact:
+        return jsonify(contact), 404
+
+    tickets = []
+    for ticket in TicketBatchItemSchema(many=True).load(body):
+        deal_id = ticket.pop("deal_id")
+        ticket["category"] = ticket["category"].value
+        tickets.append((deal_id, ticket))
+    if config.HUBSPOT_WRITE_MODE == "outbox":
+        entries = [
+            OutboxService.enqueue(OutboxService.CREATE_TICKET, {"deal_id": deal_id, "properties": ticket}, user_id)
+            for deal_id, ticket in tickets
+        ]
+        return queue_response("Tickets queued", entries)
+
+    if contact["data"] is None:
+        return contact_pending()
+    results = hubspot_service.create_tickets(contact["data"], tickets)
+    return batch_response("Tickets processed", results)
@@ -0,0 +1,8 @@
+from flask import Blueprint, Response
+from app.services.metrics import metrics
+
+metrics_bp = Blueprint("metrics", __name__)
+
+@metrics_bp.route("/metrics", methods=["GET"])
+def get_metrics():
+    return Response(metrics.render(), 200, mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,33 @@
+from flask import Blueprint, current_app, request, jsonify
+from app.logger import Logger
+from app.config import config
+from app.services.webhook import WebhookService
+
+webhook_bp = Blueprint("webhook", __name__)
+logger = Logger('WebhookRouter')
+
+@webhook_bp.route("/hubspot/webhook", methods=["POST"])
+def hubspot_webhook():
+    body = request.get_data()
+    valid = WebhookService.verify_signature(
+        request.method,
+        config.HUBSPOT_WEBHOOK_URL or request.url,
+        body,
+        request.headers.get("X-HubSpot-Request-Timestamp"),
+        request.headers.get("X-HubSpot-Signature-v3"),
+    )
+    if not valid:
+        logger.error("Invalid webhook signature")
+        return jsonify({"error": "Invalid signature"}), 401
+
+    events = request.get_json(silent=True)
+    if not isinstance(events, list):
+        return jsonify({"error": "Request body must be a list of events"}), 400
+    if not all(WebhookService.is_event(event) for event in events):
+        return jsonify({"error": "Every event needs a subscriptionType and the id of the object it changed"}), 400
+
+    if not current_app.extensions["hubspot_webhooks"].enqueue(events):
+        logger.error("Webhook queue full", {"count": len(events)})
+        return jsonify({"error": "Too many pending events"}), 503
+
+    return jsonify({"message": "Events queued"}), 202
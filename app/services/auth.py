@@ -2,11 +2,15 @@ from flask_jwt_extended import create_access_token
 from datetime import timedelta, datetime
 from app.models import User
 from app.extensions import db
+from app.services.outbox import OutboxService
 
 class AuthService:
     @staticmethod
-    def generate_token(user_id):
-        return create_access_token(identity=str(user_id), expires_delta=timedelta(days=1))
+    def generate_token(user_id, contact_id=None):
+        """The HubSpot contact id travels in the claims, so deal and ticket requests don't have to look it up."""
+        return create_access_token(
+            identity=str(user_id), additional_claims={"contact_id": contact_id}, expires_delta=timedelta(days=1),
+        )
     
     @staticmethod
     def user_exists(email):
@@ -14,11 +18,16 @@ class AuthService:
         return User.query.filter_by(email=email).first() is not None
 
     @staticmethod
-    def register_user(email: str, firstname: str, lastname: str, phone: str, password: str, contact: dict):
+    def register_user(email: str, firstname: str, lastname: str, phone: str, password: str, contact: dict = None):
+        """When `contact` is None the HubSpot contact is queued in the outbox, in the same transaction as the user."""
+        properties = {"email": email, "firstname": firstname, "lastname": lastname, "phone": phone}
         email = email.strip().lower()
-        user = User(email=email, firstname=firstname, lastname=lastname, phone=phone, contact_id=contact["id"])
+        user = User(email=email, firstname=firstname, lastname=lastname, phone=phone, contact_id=contact["id"] if contact else None)
         user.set_password(password)
         db.session.add(user)
+        if contact is None:
+            db.session.flush()
+            OutboxService.enqueue(OutboxService.UPSERT_CONTACT, {"properties": properties}, user.id)
         db.session.commit()
 
         return {"message": "User registered successfully", "data": { "contact": contact } }
@@ -29,8 +38,11 @@ class AuthService:
         user = User.query.filter_by(email=email).first()
         if not user or not user.check_password(password):
             return { "error": "Invalid credentials" }
+        if db.session.is_modified(user):
+            # check_password upgraded the hash to the configured cost
+            db.session.commit()
 
-        token = AuthService.generate_token(user.id)
+        token = AuthService.generate_token(user.id, user.contact_id)
         return {
             "data": {"access_token": token},
             "message": "User authenticated successfully"
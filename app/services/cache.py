@@ -0,0 +1,159 @@
+import json
+import time
+from collections import OrderedDict
+from threading import Lock
+from app.config import config
+
+class CacheStats:
+    def __init__(self):
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def record(self, hits=0, misses=0, evictions=0):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+            self.evictions += evictions
+
+    def to_dict(self):
+        return { "hits": self.hits, "misses": self.misses, "evictions": self.evictions }
+
+class CacheBackend:
+    """
+    Cache of CRM objects keyed by (object_type, id).
+    Backends only need to implement _get, _set and _delete, the many/stats
+    helpers are shared.
+    """
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self.stats = CacheStats()
+
+    def get(self, object_type: str, id: str):
+        return self.get_many(object_type, [id]).get(id)
+
+    def get_many(self, object_type: str, ids: list):
+        found = {}
+        for id in ids:
+            value = self._get(self._key(object_type, id))
+            if value is not None:
+                found[id] = value
+        self.stats.record(hits=len(found), misses=len(ids) - len(found))
+        return found
+
+    def set(self, object_type: str, id: str, value, ttl: int = None):
+        self._set(self._key(object_type, id), value, ttl or self.ttl)
+
+    def set_many(self, object_type: str, values: dict, ttl: int = None):
+        for id, value in values.items():
+            self.set(object_type, id, value, ttl)
+
+    def delete(self, object_type: str, id: str):
+        self._delete(self._key(object_type, id))
+
+    def get_stats(self):
+        return self.stats.to_dict()
+
+    def _key(self, object_type: str, id: str):
+        return f"hubspot:{object_type}:{id}"
+
+    def _get(self, key: str):
+        raise NotImplementedError
+
+    def _set(self, key: str, value, ttl: int):
+        raise NotImplementedError
+
+    def _delete(self, key: str):
+        raise NotImplementedError
+
+class NullCache(CacheBackend):
+    """Caching disabled, every read misses."""
+
+    def _get(self, key):
+        return None
+
+    def _set(self, key, value, ttl):
+        pass
+
+    def _delete(self, key):
+        pass
+
+class MemoryCache(CacheBackend):
+    """In-process cache with per-entry TTL and LRU eviction once `max_entries` is reached."""
+
+    def __init__(self, ttl: int, max_entries: int):
+        super().__init__(ttl)
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _set(self, key, value, ttl):
+        evicted = 0
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+        if evicted:
+            self.stats.record(evictions=evicted)
+
+    def _delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def get_stats(self):
+        return { **super().get_stats(), "size": len(self._entries) }
+
+class RedisCache(CacheBackend):
+    """
+    Cache shared by every worker through Redis. Entries expire through Redis
+    TTLs, size bound and LRU eviction come from the server's maxmemory policy.
+    """
+
+    def __init__(self, ttl: int, url: str):
+        super().__init__(ttl)
+        try:
+            import redis
+        except ImportError:
+            raise ImportError("The redis package is required for HUBSPOT_CACHE_BACKEND=redis")
+        self.client = redis.Redis.from_url(url)
+
+    def get_many(self, object_type, ids):
+        if not ids:
+            return {}
+        values = self.client.mget([self._key(object_type, id) for id in ids])
+        found = { id: json.loads(value) for id, value in zip(ids, values) if value is not None }
+        self.stats.record(hits=len(found), misses=len(ids) - len(found))
+        return found
+
+    def _get(self, key):
+        value = self.client.get(key)
+        return json.loads(value) if value is not None else None
+
+    def _set(self, key, value, ttl):
+        self.client.set(key, json.dumps(value), ex=ttl)
+
+    def _delete(self, key):
+        self.client.delete(key)
+
+def create_cache():
+    if config.HUBSPOT_CACHE_BACKEND == "redis":
+        return RedisCache(config.HUBSPOT_CACHE_TTL, config.HUBSPOT_CACHE_URL)
+    if config.HUBSPOT_CACHE_BACKEND == "memory":
+        return MemoryCache(config.HUBSPOT_CACHE_TTL, config.HUBSPOT_CACHE_MAX_ENTRIES)
+    return NullCache(config.HUBSPOT_CACHE_TTL)
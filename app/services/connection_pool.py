@@ -0,0 +1,58 @@
+import socket
+from threading import Lock
+from app.config import config
+
+class ConnectionPool:
+    """
+    One urllib3 pool shared by every HubSpot API client of the process.
+
+    The SDK builds a new ApiClient, and with it a new connection pool, every time an API
+    such as `client.crm.deals.batch_api` is accessed, so no connection was ever reused.
+    `api_factory` is passed to the SDK client instead: it builds each API once, points it
+    at the shared pool and only swaps the bearer token on later accesses, so keep-alive
+    connections survive token rotations.
+    """
+
+    def __init__(self):
+        import urllib3
+        socket_options = list(urllib3.connection.HTTPConnection.default_socket_options)
+        if config.HUBSPOT_POOL_KEEPALIVE:
+            socket_options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+        self.pool_manager = urllib3.PoolManager(
+            num_pools=config.HUBSPOT_POOL_HOSTS,
+            maxsize=config.HUBSPOT_POOL_MAXSIZE,
+            block=config.HUBSPOT_POOL_BLOCK,
+            socket_options=socket_options,
+            # urllib3's default retries would also sleep through 429s with a Retry-After header, hiding
+            # them from RetryPolicy and the shared rate limit. Only connection errors are retried here
+            retries=urllib3.Retry(3, respect_retry_after_header=False),
+        )
+        self._apis = {}
+        self._lock = Lock()
+
+    def api_factory(self, api_client_package, api_name, api_config):
+        key = (api_client_package.__name__, api_name)
+        api = self._apis.get(key)
+        if api is None:
+            with self._lock:
+                api = self._apis.get(key)
+                if api is None:
+                    from hubspot.discovery.discovery_base import DiscoveryBase
+                    api = DiscoveryBase._default_api_factory(api_client_package, api_name, api_config)
+                    api.api_client.rest_client.pool_manager = self.pool_manager
+                    if config.HUBSPOT_API_BASE_URL:
+                        api.api_client.configuration.host = config.HUBSPOT_API_BASE_URL
+                    self._apis[key] = api
+        api.api_client.configuration.access_token = api_config.get("access_token")
+        return api
+
+    def get_stats(self):
+        opened = 0
+        requests = 0
+        pools = self.pool_manager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                opened += pool.num_connections
+                requests += pool.num_requests
+        return { "opened": opened, "reused": max(requests - opened, 0), "requests": requests }
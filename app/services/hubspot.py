@@ -1,152 +1,881 @@
-from datetime import datetime, timedelta
-from hubspot.client import Client as HubSpot
-from hubspot.crm.contacts import (
-    SimplePublicObjectInputForCreate as ContactSimplePublicObjectInputForCreate,
-    SimplePublicObjectInput as ContactSimplePublicObjectInput,
-    PublicObjectSearchRequest as ContactPublicObjectSearchRequest
-)
-from hubspot.crm.deals import (
-    SimplePublicObjectInput as DealSimplePublicObjectInput,
-    SimplePublicObjectInputForCreate as DealSimplePublicObjectInputForCreate,
-    PublicObjectSearchRequest as DealPublicObjectSearchRequest
-)
-from hubspot.crm.tickets import SimplePublicObjectInputForCreate as TicketSimplePublicObjectInputForCreate
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from threading import Lock, Thread
 from app.config import config
 from app.logger import Logger
+from app.services.cache import create_cache
+from app.services.connection_pool import ConnectionPool
+from app.services.lookup import LookupService
+from app.services.metrics import metrics
+from app.services.mirror import MirrorService
+from app.services.rate_limiter import RetryPolicy, create_rate_limiter
+from app.services.records import Contact, Deal, Ticket
+from app.services.single_flight import SingleFlight
+from app.services.token_manager import create_token_manager
+
+class CallCounter:
+    """Counts the HubSpot API calls made while serving a single request."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self.total = 0
+        self.by_api = {}
+
+    def increment(self, api: str):
+        with self._lock:
+            self.total += 1
+            self.by_api[api] = self.by_api.get(api, 0) + 1
+
+_call_counter = contextvars.ContextVar("hubspot_call_counter", default=None)
 
 class HubspotService:
     def __init__(self):
-        tokens = self._generate_tokens()
-        self.client = HubSpot(access_token=tokens.access_token)
-        self.last_expiration = self._get_last_token_expiration(tokens.expires_in)
+        # Nothing here talks to HubSpot or imports the SDK, the client is built on first use
+        self.token_manager = create_token_manager(self._generate_tokens)
+        self._client = None
+        self._oauth_client = None
+        self._client_lock = Lock()
+        self._pool_lock = Lock()
+        self.connection_pool = None
         self.logger = Logger("HubspotService")
         self.TICKET_FROM_CONTACT = 16
         self.TICKET_FROM_DEAL = 28
         self.DEAL_FROM_CONTACT = 3
+        # HubSpot's object pages hold at most this many objects
+        self.MAX_PAGE_SIZE = 100
+        self.MODIFIED_PROPERTIES = { "contacts": "lastmodifieddate", "deals": "hs_lastmodifieddate", "tickets": "hs_lastmodifieddate" }
+        # Batch created tickets are matched back to their inputs on these properties
+        self.TICKET_MATCH_PROPERTIES = ["subject", "description", "pipeline", "hs_pipeline_stage", "hs_ticket_priority"]
+        self.cache = create_cache()
+        self.retry_policy = RetryPolicy(create_rate_limiter())
+        # Shared by every request in the process so HUBSPOT_MAX_CONCURRENCY caps the total
+        # number of in-flight fetches, not just the ones made for a single page
+        self.executor = None
+        if config.HUBSPOT_FETCH_MODE == "threads":
+            self.executor = ThreadPoolExecutor(
+                max_workers=config.HUBSPOT_MAX_CONCURRENCY, thread_name_prefix="hubspot-fetch"
+            )
+        # Identical concurrent page reads share one fetch
+        self.page_flights = SingleFlight(config.HUBSPOT_COALESCE_GRACE) if config.HUBSPOT_COALESCE_READS else None
+
+    @property
+    def sdk(self):
+        from app.services import hubspot_sdk
+        return hubspot_sdk
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    from hubspot.client import Client as HubSpot
+                    self._client = HubSpot(
+                        access_token=self.token_manager.get_access_token(),
+                        api_factory=self._get_connection_pool().api_factory,
+                    )
+        return self._client
+
+    def _get_connection_pool(self):
+        if self.connection_pool is None:
+            with self._pool_lock:
+                if self.connection_pool is None:
+                    self.connection_pool = ConnectionPool()
+        return self.connection_pool
+
+    def warm_up(self):
+        """Imports the SDK and fetches an access token in the background so the first request doesn't pay for it."""
+        def run():
+            try:
+                self.sdk
+                self.client
+                self.logger.info("HubSpot client ready")
+            except Exception as e:
+                self.logger.error("Error warming up HubSpot client", {"error": str(e)})
+        Thread(target=run, name="hubspot-warm-up", daemon=True).start()
 
     def create_or_update_contact(self, properties: dict):
         email = properties.get("email")
         if not email:
             raise ValueError("Email is required")
+        lookup_key = email.strip().lower()
         try:
             self._refresh_token()
-            contact_id = self._search_contact(email)
             contact = None
-            if contact_id:
-                contact = self.client.crm.contacts.basic_api.update(contact_id, ContactSimplePublicObjectInput(properties=properties))
-                self.logger.info(f"Updated contact with email: {email}")
-            else:
-                contact = self.client.crm.contacts.basic_api.create(ContactSimplePublicObjectInputForCreate(properties=properties))
+            if config.HUBSPOT_UPSERT_MODE == "batch":
+                contact, created = self._upsert("contacts", "email", email, properties)
+            if contact is None:
+                contact, created = self._search_and_write_contact(email, lookup_key, properties)
+
+            if created:
+                self._invalidate_contact_pages()
                 self.logger.info(f"Created new contact with email: {email}")
+            else:
+                self.cache.delete("contacts", contact.id)
+                self._forget_shared_pages()
+                self.logger.info(f"Updated contact with email: {email}")
+            LookupService.save("contacts", lookup_key, contact.id)
             return { "data": self._format_contact(contact), "message": "Contact created successfully" }
         except Exception as e:
+            # The indexed id may point at a contact deleted in HubSpot, search again next time
+            LookupService.delete("contacts", lookup_key)
             self.logger.error("Error creating or updating contact", {"error": str(e)})
             return { "error": "Error creating or updating contact" }
 
     def create_or_update_deal(self, contact_id: str, deal_name: str, properties: dict):
         try:
             self._refresh_token()
-            deal_id = self._search_deal(deal_name)
             deal = None
-            if deal_id:
-                deal = self.client.crm.deals.basic_api.update(deal_id, DealSimplePublicObjectInput(properties=properties))
-                self.logger.info(f"Updated deal with name: {deal_name}")
-            else:
-                associations = [
-                    {
-                        "to": { "id": contact_id },
-                        "types": [
-                            {
-                                "associationCategory": "HUBSPOT_DEFINED",
-                                "associationTypeId": self.DEAL_FROM_CONTACT
-                            }
-                        ]
-                    }
-                ]
-                deal = self.client.crm.deals.basic_api.create(DealSimplePublicObjectInputForCreate(
-                    properties=properties,
-                    associations=associations
-                ))
-                self.logger.info(f"Created new deal with name: {deal_name}")
+            unique_property = config.HUBSPOT_DEAL_UNIQUE_PROPERTY
+            linked = False
+            if config.HUBSPOT_UPSERT_MODE == "batch" and unique_property:
+                deal, created = self._upsert("deals", unique_property, deal_name, { **properties, unique_property: deal_name })
+                if deal is not None:
+                    # Batch upsert inputs carry no associations, link the deal to the contact separately.
+                    # Updated deals too: linking is idempotent, and an earlier attempt may have created
+                    # the deal but failed to link it
+                    self._call(
+                        "associations.deals.contacts.basic_api.create_default",
+                        self.client.crm.associations.v4.basic_api.create_default,
+                        "deals", deal.id, "contacts", contact_id,
+                    )
+                    linked = True
+            if deal is None:
+                deal, created = self._search_and_write_deal(contact_id, deal_name, properties)
 
-            return { "data": self._format_deal(deal), "message": "Deal created successfully" }
+            self.logger.info(f"{'Created new' if created else 'Updated'} deal with name: {deal_name}")
+            LookupService.save("deals", deal_name, deal.id)
+            deal_data = self._format_deal(deal)
+            self.cache.set("deals", deal.id, dict(deal_data))
+            if created:
+                self.cache.set("deal_tickets", deal.id, [])
+            if created or linked:
+                self.cache.delete("contacts", contact_id)
+            self._forget_shared_pages()
+            return { "data": deal_data, "message": "Deal created successfully" }
         except Exception as e:
+            LookupService.delete("deals", deal_name)
             self.logger.error("Error creating or updating deal", {"error": str(e)})
             return { "error": "Error creating or updating deal" }
 
+    def _upsert(self, object_type: str, id_property: str, id: str, properties: dict):
+        """
+        Creates or updates the object whose unique `id_property` equals `id` in a single call.
+        Returns `(object, created)`, or `(None, False)` when HubSpot rejects the upsert with a 400
+        (for example because `id_property` is not a unique property) so the caller can fall back to
+        searching. Any other failure is raised, searching and writing again would only repeat it.
+        """
+        batch_input, upsert_input = self.sdk.BATCH_UPSERT_INPUTS[object_type]
+        try:
+            response = self._call(
+                f"{object_type}.batch_api.upsert",
+                getattr(self.client.crm, object_type).batch_api.upsert,
+                batch_input(inputs=[upsert_input(id=id, id_property=id_property, properties=properties)]),
+            )
+        except Exception as e:
+            if getattr(e, "status", None) != 400:
+                raise
+            self.logger.warning(f"Batch upsert of {object_type} rejected, falling back to search", {"error": str(e)})
+            return None, False
+        if not response.results:
+            self.logger.warning(f"Batch upsert of {object_type} returned no result, falling back to search")
+            return None, False
+        result = response.results[0]
+        return result, bool(result.new)
+
+    def _search_and_write_contact(self, email: str, lookup_key: str, properties: dict):
+        contact_id = LookupService.get_object_id("contacts", lookup_key) or self._search_contact(email)
+        if contact_id:
+            contact = self._call(
+                "contacts.basic_api.update",
+                self.client.crm.contacts.basic_api.update,
+                contact_id, self.sdk.ContactSimplePublicObjectInput(properties=properties)
+            )
+            return contact, False
+
+        contact = self._call(
+            "contacts.basic_api.create",
+            self.client.crm.contacts.basic_api.create,
+            self.sdk.ContactSimplePublicObjectInputForCreate(properties=properties)
+        )
+        return contact, True
+
+    def _search_and_write_deal(self, contact_id: str, deal_name: str, properties: dict):
+        deal_id = LookupService.get_object_id("deals", deal_name) or self._search_deal(deal_name)
+        if deal_id:
+            deal = self._call(
+                "deals.basic_api.update",
+                self.client.crm.deals.basic_api.update,
+                deal_id, self.sdk.DealSimplePublicObjectInput(properties=properties)
+            )
+            return deal, False
+
+        associations = [self._association(contact_id, self.DEAL_FROM_CONTACT)]
+        deal = self._call(
+            "deals.basic_api.create",
+            self.client.crm.deals.basic_api.create,
+            self.sdk.DealSimplePublicObjectInputForCreate(properties=properties, associations=associations)
+        )
+        return deal, True
+
     def create_ticket(self, contact_id, deal_id, properties):
         try:
             associations = [
-                {
-                    "to": { "id": deal_id },
-                    "types": [
-                        {
-                            "associationCategory": "HUBSPOT_DEFINED",
-                            "associationTypeId": self.TICKET_FROM_DEAL
-                        }
-                    ]
-                },
-                {
-                    "to": { "id": contact_id },
-                    "types": [
-                        {
-                            "associationCategory": "HUBSPOT_DEFINED",
-                            "associationTypeId": self.TICKET_FROM_CONTACT
-                        }
-                    ]
-                }
+                self._association(deal_id, self.TICKET_FROM_DEAL),
+                self._association(contact_id, self.TICKET_FROM_CONTACT),
             ]
             self._refresh_token()
             properties["category"] = "general_inquiry"
-            ticket = self.client.crm.tickets.basic_api.create(TicketSimplePublicObjectInputForCreate(
-                properties=properties,
-                associations=associations
-            ))
+            ticket = self._call(
+                "tickets.basic_api.create",
+                self.client.crm.tickets.basic_api.create,
+                self.sdk.TicketSimplePublicObjectInputForCreate(properties=properties, associations=associations)
+            )
             self.logger.info(f"Created new ticket linked to contact ID: {contact_id} and deal ID: {deal_id}")
-            return { "data": self._format_ticket(ticket), "message": "Ticket created successfully" }
+            ticket_data = self._format_ticket(ticket)
+            self.cache.set("tickets", ticket.id, dict(ticket_data))
+            self.cache.delete("deal_tickets", deal_id)
+            self._forget_shared_pages()
+            return { "data": ticket_data, "message": "Ticket created successfully" }
         except Exception as e:
             self.logger.error("Error creating ticket", {"error": str(e)})
             return { "error": "Error creating ticket" }
 
-    def get_contacts(self, limit=10, after=None):
+    def create_or_update_contacts(self, contacts: list):
+        """
+        Creates or updates `contacts`, a list of property dicts keyed by `email`, with batch
+        upserts of up to `HUBSPOT_BATCH_SIZE` contacts each. Falls back to
+        `create_or_update_contact` per contact when batch upserts are turned off.
+        Returns one `{"data": ...}` or `{"error": ...}` result per contact, in input order.
+        """
+        if config.HUBSPOT_UPSERT_MODE != "batch":
+            return [self.create_or_update_contact(properties) for properties in contacts]
+
+        contacts_by_email = { properties["email"].strip().lower(): properties for properties in contacts }
+
+        def upsert(emails):
+            try:
+                response = self._call(
+                    "contacts.batch_api.upsert",
+                    self.client.crm.contacts.batch_api.upsert,
+                    self.sdk.ContactBatchInputSimplePublicObjectBatchInputUpsert(inputs=[
+                        self.sdk.ContactSimplePublicObjectBatchInputUpsert(id=email, id_property="email", properties=contacts_by_email[email])
+                        for email in emails
+                    ]),
+                )
+                return { contact.properties.get("email", "").strip().lower(): (contact, bool(contact.new)) for contact in response.results }
+            except Exception as e:
+                self.logger.error("Error upserting contacts", {"count": len(emails), "error": str(e)})
+                return {}
+
+        try:
+            self._refresh_token()
+            tasks = [partial(upsert, chunk) for chunk in self._chunks(list(contacts_by_email), config.HUBSPOT_BATCH_SIZE)]
+            written = self._merge(self._run_all(tasks))
+        except Exception as e:
+            self.logger.error("Error creating or updating contacts", {"error": str(e)})
+            written = {}
+
+        formatted = {}
+        for email, (contact, created) in written.items():
+            formatted[email] = self._format_contact(contact)
+            self.cache.delete("contacts", contact.id)
+        if any(created for _, created in written.values()):
+            self._invalidate_contact_pages()
+        elif written:
+            self._forget_shared_pages()
+        LookupService.save_many("contacts", { email: data["id"] for email, data in formatted.items() })
+
+        self.logger.info("Created or updated contacts", { "count": len(formatted), "failed": len(contacts_by_email) - len(formatted) })
+        return [
+            { "data": formatted[email] } if email in formatted else { "error": "Error creating or updating contact" }
+            for email in (properties["email"].strip().lower() for properties in contacts)
+        ]
+
+    def create_or_update_deals(self, contact_id: str, deals: list):
+        """
+        Creates or updates `deals`, a list of property dicts, with batch calls of up to
+        `HUBSPOT_BATCH_SIZE` deals each. Deals are keyed by `dealname` like in
+        `create_or_update_deal`; when several share a name the last one is written.
+        Returns one `{"data": ...}` or `{"error": ...}` result per deal, in input order.
+        """
+        deals_by_name = { properties["dealname"]: properties for properties in deals }
         try:
             self._refresh_token()
-            contacts_response = self.client.crm.contacts.basic_api.get_page(
-                limit=limit, after=after, associations=["deals"],
+            unique_property = config.HUBSPOT_DEAL_UNIQUE_PROPERTY
+            if config.HUBSPOT_UPSERT_MODE == "batch" and unique_property:
+                written = self._batch_upsert_deals(contact_id, deals_by_name, unique_property)
+            else:
+                written = self._batch_write_deals(contact_id, deals_by_name)
+        except Exception as e:
+            self.logger.error("Error creating or updating deals", {"error": str(e)})
+            written = {}
+
+        formatted, created_ids = {}, []
+        for deal_name, (deal, created) in written.items():
+            formatted[deal_name] = self._format_deal(deal)
+            self.cache.set("deals", deal.id, dict(formatted[deal_name]))
+            if created:
+                created_ids.append(deal.id)
+                self.cache.set("deal_tickets", deal.id, [])
+        if written:
+            # Upserted deals are linked whether or not they are new, so the contact's deal ids may have changed
+            self.cache.delete("contacts", contact_id)
+            self._forget_shared_pages()
+        LookupService.save_many("deals", { deal_name: data["id"] for deal_name, data in formatted.items() })
+
+        self.logger.info("Created or updated deals", { "count": len(formatted), "created": len(created_ids), "failed": len(deals_by_name) - len(formatted) })
+        return [
+            { "data": formatted[properties["dealname"]] } if properties["dealname"] in formatted
+            else { "error": "Error creating or updating deal" }
+            for properties in deals
+        ]
+
+    def create_tickets(self, contact_id: str, tickets: list):
+        """
+        Creates `tickets`, a list of `(deal_id, properties)` pairs, with batch calls of up to
+        `HUBSPOT_BATCH_SIZE` tickets each. Returns one `{"data": ...}` or `{"error": ...}`
+        result per ticket, in input order.
+        """
+        try:
+            self._refresh_token()
+            tasks = [partial(self._batch_create_tickets, contact_id, chunk) for chunk in self._chunks(tickets, config.HUBSPOT_BATCH_SIZE)]
+            results = [result for chunk_results in self._run_all(tasks) for result in chunk_results]
+        except Exception as e:
+            self.logger.error("Error creating tickets", {"error": str(e)})
+            results = [{ "error": "Error creating ticket" } for _ in tickets]
+
+        for (deal_id, _), result in zip(tickets, results):
+            if "data" in result:
+                self.cache.set("tickets", result["data"]["id"], dict(result["data"]))
+                self.cache.delete("deal_tickets", deal_id)
+        if any("data" in result for result in results):
+            self._forget_shared_pages()
+        self.logger.info("Created tickets", { "count": len(tickets), "failed": sum("error" in result for result in results) })
+        return results
+
+    def _batch_upsert_deals(self, contact_id: str, deals_by_name: dict, unique_property: str):
+        """Returns a map of deal name to `(deal, created)` for every deal that was written and linked to the contact."""
+        def upsert(deal_names):
+            try:
+                response = self._call(
+                    "deals.batch_api.upsert",
+                    self.client.crm.deals.batch_api.upsert,
+                    self.sdk.DealBatchInputSimplePublicObjectBatchInputUpsert(inputs=[
+                        self.sdk.DealSimplePublicObjectBatchInputUpsert(
+                            id=deal_name, id_property=unique_property,
+                            properties={ **deals_by_name[deal_name], unique_property: deal_name },
+                        )
+                        for deal_name in deal_names
+                    ]),
+                )
+                return { deal.properties.get(unique_property): (deal, bool(deal.new)) for deal in response.results }
+            except Exception as e:
+                self.logger.error("Error upserting deals", {"count": len(deal_names), "error": str(e)})
+                return {}
+
+        tasks = [partial(upsert, chunk) for chunk in self._chunks(list(deals_by_name), config.HUBSPOT_BATCH_SIZE)]
+        written = self._merge(self._run_all(tasks))
+
+        # Batch upsert inputs carry no associations, link the deals to the contact in batches. Updated
+        # deals too, an earlier attempt may have created them but failed to link them
+        linked = self._merge(self._run_all([
+            partial(self._batch_associate_deals, contact_id, chunk)
+            for chunk in self._chunks([deal.id for deal, _ in written.values()], config.HUBSPOT_BATCH_SIZE)
+        ]))
+        return {
+            deal_name: (deal, created) for deal_name, (deal, created) in written.items() if linked.get(deal.id)
+        }
+
+    def _batch_associate_deals(self, contact_id: str, deal_ids: list):
+        try:
+            self._call(
+                "associations.deals.contacts.batch_api.create_default",
+                self.client.crm.associations.v4.batch_api.create_default,
+                "deals", "contacts",
+                self.sdk.BatchInputPublicDefaultAssociationMultiPost(inputs=[
+                    self.sdk.PublicDefaultAssociationMultiPost(_from=self.sdk.PublicObjectId(id=deal_id), to=self.sdk.PublicObjectId(id=contact_id))
+                    for deal_id in deal_ids
+                ]),
             )
+            return { deal_id: True for deal_id in deal_ids }
+        except Exception as e:
+            self.logger.error("Error associating deals with contact", {"count": len(deal_ids), "error": str(e)})
+            return {}
 
-            contacts = []
-            for contact_response in contacts_response.results:
-                contact = self._format_contact(contact_response)
-                contact["deals"] = []
+    def _batch_write_deals(self, contact_id: str, deals_by_name: dict):
+        """Returns a map of deal name to `(deal, created)` for every deal that was written."""
+        deal_ids = self._find_deal_ids(list(deals_by_name))
+        updates = [deal_name for deal_name in deals_by_name if deal_name in deal_ids]
+        creates = [deal_name for deal_name in deals_by_name if deal_name not in deal_ids]
 
-                if contact_response.associations and "deals" in contact_response.associations:
-                    for deal_assoc in contact_response.associations["deals"].results:
-                        deal_response = self.client.crm.deals.basic_api.get_by_id(
-                            deal_assoc.id, associations=["tickets"]
+        def update(deal_names):
+            try:
+                response = self._call(
+                    "deals.batch_api.update",
+                    self.client.crm.deals.batch_api.update,
+                    self.sdk.DealBatchInputSimplePublicObjectBatchInput(inputs=[
+                        self.sdk.DealSimplePublicObjectBatchInput(id=deal_ids[deal_name], properties=deals_by_name[deal_name])
+                        for deal_name in deal_names
+                    ]),
+                )
+                names_by_id = { deal_ids[deal_name]: deal_name for deal_name in deal_names }
+                return { names_by_id[deal.id]: (deal, False) for deal in response.results if deal.id in names_by_id }
+            except Exception as e:
+                self.logger.error("Error updating deals", {"count": len(deal_names), "error": str(e)})
+                return {}
+
+        def create(deal_names):
+            try:
+                response = self._call(
+                    "deals.batch_api.create",
+                    self.client.crm.deals.batch_api.create,
+                    self.sdk.DealBatchInputSimplePublicObjectInputForCreate(inputs=[
+                        self.sdk.DealSimplePublicObjectInputForCreate(
+                            properties=deals_by_name[deal_name],
+                            associations=[self._association(contact_id, self.DEAL_FROM_CONTACT)],
                         )
-                        deal = self._format_deal(deal_response)
-                        tickets = []
-                        if deal_response.associations and "tickets" in deal_response.associations:
-                            for ticket_assoc in deal_response.associations["tickets"].results:
-                                ticket_response = self.client.crm.tickets.basic_api.get_by_id(ticket_assoc.id)
-                                tickets.append(self._format_ticket(ticket_response))
+                        for deal_name in deal_names
+                    ]),
+                )
+                return { deal.properties.get("dealname"): (deal, True) for deal in response.results }
+            except Exception as e:
+                self.logger.error("Error creating deals", {"count": len(deal_names), "error": str(e)})
+                return {}
+
+        tasks = [partial(update, chunk) for chunk in self._chunks(updates, config.HUBSPOT_BATCH_SIZE)]
+        tasks += [partial(create, chunk) for chunk in self._chunks(creates, config.HUBSPOT_BATCH_SIZE)]
+        return self._merge(self._run_all(tasks))
 
-                        deal["tickets"] = tickets
-                        contact["deals"].append(deal)
+    def _find_deal_ids(self, deal_names: list):
+        """Looks deal names up in the local index, then searches HubSpot for the rest with one `IN` query per chunk."""
+        deal_ids = LookupService.get_object_ids("deals", deal_names)
+        missing = [deal_name for deal_name in deal_names if deal_name not in deal_ids]
+        tasks = [partial(self._search_deals, chunk) for chunk in self._chunks(missing, config.HUBSPOT_BATCH_SIZE)]
+        for found in self._run_all(tasks):
+            deal_ids.update(found)
+        return deal_ids
 
-                contacts.append(contact)
+    def _batch_create_tickets(self, contact_id: str, tickets: list):
+        try:
+            inputs = []
+            for deal_id, properties in tickets:
+                properties["category"] = "general_inquiry"
+                inputs.append(self.sdk.TicketSimplePublicObjectInputForCreate(
+                    properties=properties,
+                    associations=[
+                        self._association(deal_id, self.TICKET_FROM_DEAL),
+                        self._association(contact_id, self.TICKET_FROM_CONTACT),
+                    ],
+                ))
+            response = self._call(
+                "tickets.batch_api.create",
+                self.client.crm.tickets.batch_api.create,
+                self.sdk.TicketBatchInputSimplePublicObjectInputForCreate(inputs=inputs),
+            )
+        except Exception as e:
+            self.logger.error("Error creating tickets", {"count": len(tickets), "error": str(e)})
+            return [{ "error": "Error creating ticket" } for _ in tickets]
 
-            next_after = contacts_response.paging.next.after if contacts_response.paging else None
-            self.logger.info("Retrieved contacts", { "count": len(contacts), "next_after": next_after })
-            return { "data": { "contacts": contacts, "next_after": next_after } }
+        # HubSpot does not return batch results in input order, match them on the properties that were sent.
+        # Tickets with the same properties for different deals, and tickets HubSpot stored with changed values,
+        # are matched on their deal, read back in one call. Those still ambiguous are reported as errors
+        results = [{ "error": "Error creating ticket" } for _ in tickets]
+        unmatched, undecided = list(range(len(tickets))), []
+        for ticket in response.results:
+            candidates = [position for position in unmatched if self._ticket_matches(tickets[position][1], ticket)]
+            if candidates and len({ str(tickets[position][0]) for position in candidates }) == 1:
+                results[candidates[0]] = { "data": self._format_ticket(ticket) }
+                unmatched.remove(candidates[0])
+            else:
+                undecided.append(ticket)
+        if not undecided:
+            return results
+
+        try:
+            deal_ids = self._merge(self._run_all(self._batch_read_associations_tasks("tickets", "deals", [ticket.id for ticket in undecided])))
+        except Exception as e:
+            self.logger.error("Error reading the deals of created tickets", {"count": len(undecided), "error": str(e)})
+            deal_ids = {}
+        # Tickets whose properties match go first, so the one left for a deal is not taken by a changed ticket
+        for require_properties in (True, False):
+            for ticket in list(undecided):
+                candidates = [
+                    position for position in unmatched
+                    if str(tickets[position][0]) in deal_ids.get(ticket.id, [])
+                    and (not require_properties or self._ticket_matches(tickets[position][1], ticket))
+                ]
+                if not candidates or (not require_properties and len(candidates) > 1):
+                    continue
+                results[candidates[0]] = { "data": self._format_ticket(ticket) }
+                unmatched.remove(candidates[0])
+                undecided.remove(ticket)
+        if undecided:
+            self.logger.warning("Created tickets not matched to their inputs", {"ticket_ids": [ticket.id for ticket in undecided]})
+            for position in unmatched:
+                results[position] = { "error": "Ticket may have been created but could not be matched to the request" }
+        return results
+
+    def _ticket_matches(self, properties: dict, ticket):
+        return all(str(properties.get(name)) == str(ticket.properties.get(name)) for name in self.TICKET_MATCH_PROPERTIES)
+
+    def get_contacts(self, limit=10, after=None, properties: dict = None):
+        """
+        `properties` maps an object type to the only properties to request and return for it,
+        types it doesn't mention get HubSpot's default properties. Concurrent calls for the same
+        page and properties share one fetch, and its result is reused for `HUBSPOT_COALESCE_GRACE`
+        seconds after it finished; pages are never shared across a write made by this process.
+        """
+        properties = properties or {}
+        if config.HUBSPOT_READ_SOURCE == "mirror":
+            page = MirrorService.get_contacts(limit, after, properties)
+            if page is not None:
+                return { "data": page, "hubspot_calls": 0 }
+
+        if self.page_flights is None:
+            return self._fetch_contacts(limit, after, properties)
+        key = (limit, after, tuple((object_type, tuple(names)) for object_type, names in sorted(properties.items())))
+        page, shared = self.page_flights.do(
+            key, partial(self._fetch_contacts, limit, after, properties), keep=lambda page: "error" not in page,
+        )
+        # Callers get their own dict, the records in it are shared and never modified.
+        # The HubSpot calls were counted for the caller whose fetch made them
+        return { **page, "hubspot_calls": 0 if shared else page["hubspot_calls"] }
+
+    def _fetch_contacts(self, limit, after, properties: dict):
+        counter = CallCounter()
+        counter_token = _call_counter.set(counter)
+        try:
+            self._refresh_token()
+            page_contacts, next_after = self._get_contact_page(limit, after, properties.get("contacts"))
+
+            deal_ids = self._unique(contact["deal_ids"] for contact in page_contacts)
+            # Deals and their ticket associations only depend on the deal ids, so both are fetched in one stage
+            deals, ticket_ids_by_deal = self._read_through(
+                ("deals", deal_ids, partial(self._batch_read_tasks, "deals", properties=properties.get("deals")), properties.get("deals")),
+                ("deal_tickets", deal_ids, partial(self._batch_read_associations_tasks, "deals", "tickets"), None),
+            )
+            tickets, = self._read_through(
+                (
+                    "tickets", self._unique(ticket_ids_by_deal.values()),
+                    partial(self._batch_read_tasks, "tickets", properties=properties.get("tickets")), properties.get("tickets"),
+                ),
+            )
+
+            contacts = self._assemble_contacts(page_contacts, deals, tickets, ticket_ids_by_deal, properties)
+
+            self.logger.info("Retrieved contacts", {
+                "count": len(contacts), "next_after": next_after, "hubspot_calls": counter.total, "cache": self.cache.get_stats(),
+                "connections": self._get_connection_pool().get_stats(), "coalescing": self.get_coalescing_stats(),
+            })
+            return { "data": { "contacts": contacts, "next_after": next_after }, "hubspot_calls": counter.total }
         except Exception as e:
             self.logger.error("Error retrieving contacts", {"error": str(e)})
-            return { "error": "Error retrieving contacts" }
+            return { "error": "Error retrieving contacts", "hubspot_calls": counter.total }
+        finally:
+            _call_counter.reset(counter_token)
+
+    def get_page_version(self, limit=10, after=None, properties: dict = None):
+        """
+        Version of the page get_contacts would return, when the local mirror can tell it without the page
+        being read, otherwise None.
+        """
+        if config.HUBSPOT_READ_SOURCE != "mirror":
+            return None
+        return MirrorService.get_page_version(limit, after, properties)
+
+    def get_coalescing_stats(self):
+        """Page reads that ran a fetch of their own and ones that shared another read's fetch."""
+        if self.page_flights is None:
+            return None
+        return self.page_flights.get_stats()
+
+    def _assemble_contacts(self, page_contacts: list, deals: dict, tickets: dict, ticket_ids_by_deal: dict, properties: dict):
+        """
+        Nests the deals and tickets under their contacts as records. Unless they are projected, records
+        reference the fetched property dicts, which may be the cached ones, instead of copying them.
+        """
+        contacts = []
+        for page_contact in page_contacts:
+            contact = Contact(page_contact["id"], self._project(page_contact, properties.get("contacts")))
+            for deal_id in page_contact["deal_ids"]:
+                if deal_id not in deals:
+                    continue
+                deal = Deal(deal_id, self._project(deals[deal_id], properties.get("deals")))
+                deal.tickets = [
+                    Ticket(ticket_id, self._project(tickets[ticket_id], properties.get("tickets")))
+                    for ticket_id in ticket_ids_by_deal.get(deal_id, []) if ticket_id in tickets
+                ]
+                contact.deals.append(deal)
+            contacts.append(contact)
+        return contacts
+
+    def iter_contacts(self, page_size: int, after=None, properties: dict = None, limit: int = None):
+        """
+        Yields every contact from `after` on, or the first `limit` of them, shaped like the contacts of
+        get_contacts. Pages of up to `page_size` contacts, and never more than HubSpot's MAX_PAGE_SIZE,
+        are fetched lazily as the caller consumes them, so only one page is held in memory.
+        If a page fails, its error dict is yielded last.
+        """
+        page_size = min(page_size, self.MAX_PAGE_SIZE)
+        remaining = limit
+        while remaining is None or remaining > 0:
+            page = self.get_contacts(page_size if remaining is None else min(page_size, remaining), after, properties)
+            if "error" in page:
+                yield { "error": page["error"] }
+                return
+            contacts = page["data"]["contacts"]
+            yield from contacts
+            if remaining is not None:
+                remaining -= len(contacts)
+            after = page["data"]["next_after"]
+            if not after:
+                return
+
+    def search_modified(self, object_type: str, since_ms: int = None, after: str = None):
+        """
+        Returns one page of `object_type` objects modified at or after `since_ms` (all of them when it
+        is None), oldest first, as `(object, modified_at)` pairs, and the cursor of the next page.
+        """
+        modified_property = self.MODIFIED_PROPERTIES[object_type]
+        filters = [{ "propertyName": modified_property, "operator": "GTE", "value": str(since_ms) }] if since_ms is not None else []
+        return self._search_page(object_type, filters, modified_property, after)
+
+    def search_modified_at(self, object_type: str, modified_ms: int, after_id: str = None):
+        """
+        Returns one page of the `object_type` objects modified exactly at `modified_ms` with an id above
+        `after_id`, by id, as `(object, modified_at)` pairs, and whether more may follow. Pass the
+        last id returned to get the next page; the search API's paging stops after SEARCH_RESULT_LIMIT.
+        """
+        filters = [{ "propertyName": self.MODIFIED_PROPERTIES[object_type], "operator": "EQ", "value": str(modified_ms) }]
+        if after_id is not None:
+            filters.append({ "propertyName": "hs_object_id", "operator": "GT", "value": str(after_id) })
+        objects, next_after = self._search_page(object_type, filters, "hs_object_id")
+        return objects, next_after is not None
+
+    def _search_page(self, object_type: str, filters: list, sort_property: str, after: str = None):
+        self._refresh_token()
+        response = self._call(
+            f"{object_type}.search_api.do_search",
+            getattr(self.client.crm, object_type).search_api.do_search,
+            self.sdk.SEARCH_REQUESTS[object_type](
+                filter_groups=[{ "filters": filters }] if filters else [],
+                sorts=[{ "propertyName": sort_property, "direction": "ASCENDING" }],
+                limit=config.HUBSPOT_BATCH_SIZE,
+                after=after,
+            ),
+        )
+        formatter = { "contacts": self._format_contact, "deals": self._format_deal, "tickets": self._format_ticket }[object_type]
+        next_after = response.paging.next.after if response.paging and response.paging.next else None
+        return [(formatter(result), result.updated_at) for result in response.results], next_after
+
+    def read_objects(self, object_type: str, ids: list):
+        """Batch reads `ids` from HubSpot, returns the formatted objects keyed by id. Missing ids were deleted."""
+        self._refresh_token()
+        return self._merge(self._run_all(self._batch_read_tasks(object_type, ids)))
+
+    def forget(self, object_type: str, ids: list, created: bool = False):
+        """Drops cached copies of objects that changed in HubSpot. New contacts also invalidate cached pages."""
+        for id in ids:
+            self.cache.delete(object_type, id)
+            if object_type == "deals":
+                self.cache.delete("deal_tickets", id)
+        if created and object_type == "contacts":
+            self._invalidate_contact_pages()
+        else:
+            self._forget_shared_pages()
+
+    def get_associations(self, from_object_type: str, to_object_type: str, ids: list):
+        """Returns a map of every id in `ids` to the ids of its associated `to_object_type` objects."""
+        self._refresh_token()
+        return self._merge(self._run_all(self._batch_read_associations_tasks(from_object_type, to_object_type, ids)))
+
+    def _get_contact_page(self, limit, after, properties: list = None):
+        """
+        Returns the page's contacts, each with the ids of its deals under `deal_ids`, and the next cursor.
+        A cached page is only used while every contact on it is still cached with all `properties`.
+        """
+        generation = self.cache.get("contact_pages", "generation") or "0"
+        page_key = f"{generation}:{limit}:{after}"
+        page = self.cache.get("contact_pages", page_key)
+        if page is not None:
+            cached_contacts = self._with_properties(self.cache.get_many("contacts", page["contact_ids"]), properties)
+            if len(cached_contacts) == len(page["contact_ids"]):
+                return [cached_contacts[id] for id in page["contact_ids"]], page["next_after"]
+
+        contacts_response = self._call(
+            "contacts.basic_api.get_page",
+            self.client.crm.contacts.basic_api.get_page,
+            limit=limit, after=after, properties=properties, associations=["deals"],
+        )
+        contacts = []
+        for contact_response in contacts_response.results:
+            contact = self._format_contact(contact_response, properties)
+            contact["deal_ids"] = self._associated_ids(contact_response, "deals")
+            contacts.append(contact)
+        next_after = contacts_response.paging.next.after if contacts_response.paging else None
+
+        if properties:
+            # Projected contacts lack the default properties, keep them out of the shared cache
+            return contacts, next_after
+        self.cache.set_many("contacts", { contact["id"]: contact for contact in contacts })
+        self.cache.set(
+            "contact_pages", page_key,
+            { "contact_ids": [contact["id"] for contact in contacts], "next_after": next_after },
+            config.HUBSPOT_PAGE_CACHE_TTL,
+        )
+        return contacts, next_after
+
+    def _invalidate_contact_pages(self):
+        # Pages are keyed by generation, so moving to a new one orphans every cached page at once
+        self.cache.set("contact_pages", "generation", str(time.time_ns()))
+        self._forget_shared_pages()
+
+    def _forget_shared_pages(self):
+        # Pages fetched before a write must not be handed out during the grace window
+        if self.page_flights is not None:
+            self.page_flights.forget()
+
+    def _read_through(self, *reads):
+        """
+        Each read is a `(cache_type, ids, task_factory, properties)` tuple. Ids found in the cache,
+        with all `properties` when given, are served from it, the rest are fetched with the tasks
+        `task_factory` builds for them, all reads in a single `_run_all` stage. Fetched objects are
+        cached unless they were projected to `properties`. Returns one id-keyed map per read.
+        """
+        found, tasks, slices = [], [], []
+        for cache_type, ids, task_factory, properties in reads:
+            cached = self._with_properties(self.cache.get_many(cache_type, ids), properties)
+            read_tasks = task_factory([id for id in ids if id not in cached])
+            slices.append(slice(len(tasks), len(tasks) + len(read_tasks)))
+            tasks.extend(read_tasks)
+            found.append(cached)
+
+        results = self._run_all(tasks)
+        for (cache_type, _, _, properties), cached, results_slice in zip(reads, found, slices):
+            fetched = self._merge(results[results_slice])
+            if not properties:
+                self.cache.set_many(cache_type, fetched)
+            cached.update(fetched)
+        return found
+
+    def _batch_read_tasks(self, object_type: str, ids: list, properties: list = None):
+        """
+        Each task reads one `HUBSPOT_BATCH_SIZE` chunk of `ids`, with only `properties` when
+        given, and returns the objects formatted and keyed by id. Ids HubSpot does not return
+        (archived or deleted objects) are left out of the result.
+        """
+        batch_input, object_id = self.sdk.BATCH_READ_INPUTS[object_type]
+        batch_api = getattr(self.client.crm, object_type).batch_api
+        formatter = { "contacts": self._format_contact, "deals": self._format_deal, "tickets": self._format_ticket }[object_type]
+
+        def read(chunk):
+            response = self._call(
+                f"{object_type}.batch_api.read",
+                batch_api.read,
+                batch_input(inputs=[object_id(id=id) for id in chunk], properties=properties or [], properties_with_history=[]),
+            )
+            return { result.id: formatter(result, properties) for result in response.results }
+
+        return [partial(read, chunk) for chunk in self._chunks(ids, config.HUBSPOT_BATCH_SIZE)]
+
+    def _batch_read_associations_tasks(self, from_object_type: str, to_object_type: str, ids: list):
+        """Each task returns a map of `from_object_type` id to the ids of its associated `to_object_type` objects."""
+        batch_api = self.client.crm.associations.v4.batch_api
+
+        def read(chunk):
+            response = self._call(
+                f"associations.{from_object_type}.{to_object_type}.batch_api.get_page",
+                batch_api.get_page,
+                from_object_type, to_object_type,
+                self.sdk.BatchInputPublicFetchAssociationsBatchRequest(inputs=[self.sdk.PublicFetchAssociationsBatchRequest(id=id) for id in chunk]),
+            )
+            associations = { id: [] for id in chunk }
+            for result in response.results:
+                to_ids = associations.setdefault(result._from.id, [])
+                for associated in result.to:
+                    to_id = str(associated.to_object_id)
+                    if to_id not in to_ids:
+                        to_ids.append(to_id)
+            return associations
+
+        return [partial(read, chunk) for chunk in self._chunks(ids, config.HUBSPOT_ASSOCIATIONS_BATCH_SIZE)]
+
+    def _run_all(self, tasks: list):
+        """
+        Runs `tasks` and returns their results in the order the tasks were given.
+        In `threads` mode the tasks run on the shared executor; each task carries
+        the caller's context so the request's CallCounter still sees its calls.
+        """
+        if self.executor is None or len(tasks) < 2:
+            return [task() for task in tasks]
+
+        futures = [self.executor.submit(contextvars.copy_context().run, task) for task in tasks]
+        try:
+            return [future.result() for future in futures]
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def _with_properties(self, objects: dict, properties: list = None):
+        if not properties:
+            return objects
+        return { id: data for id, data in objects.items() if all(name in data for name in properties) }
+
+    def _project(self, data: dict, properties: list = None):
+        """Keeps only `properties` and the id in a new dict, or returns `data` itself when no properties are given."""
+        if not properties:
+            return data
+        projected = { name: data.get(name) for name in properties }
+        projected["id"] = data["id"]
+        return projected
+
+    def _merge(self, results: list):
+        merged = {}
+        for result in results:
+            merged.update(result)
+        return merged
+
+    def _associated_ids(self, object_response, to_object_type: str):
+        if not object_response.associations or to_object_type not in object_response.associations:
+            return []
+        # HubSpot lists an association once per association type, so the same id can appear more than once
+        return self._unique([[assoc.id for assoc in object_response.associations[to_object_type].results]])
+
+    def _unique(self, id_lists):
+        seen = {}
+        for ids in id_lists:
+            for id in ids:
+                seen.setdefault(id, None)
+        return list(seen)
+
+    def _chunks(self, items: list, size: int):
+        for i in range(0, len(items), size):
+            yield items[i:i + size]
+
+    def _call(self, api: str, fn, *args, **kwargs):
+        counter = _call_counter.get()
+        if counter is not None:
+            counter.increment(api)
+        kwargs.setdefault("_request_timeout", (config.HUBSPOT_CONNECT_TIMEOUT, config.HUBSPOT_CALL_TIMEOUT))
+        return self._timed(api, self.retry_policy.call, api, fn, *args, **kwargs)
+
+    def _timed(self, api: str, fn, *args, **kwargs):
+        """Calls `fn` and records how long it took, and how it ended, under `api` in the HubSpot call histogram."""
+        started_at = time.perf_counter()
+        outcome = "success"
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            outcome = str(getattr(e, "status", None) or "error")
+            raise
+        finally:
+            metrics.observe("hubspot_call_duration_seconds", (api, outcome), time.perf_counter() - started_at)
 
     def _search_contact(self, email):
         try:
-            contact_search = self.client.crm.contacts.search_api.do_search(ContactPublicObjectSearchRequest(
+            contact_search = self._call("contacts.search_api.do_search", self.client.crm.contacts.search_api.do_search, self.sdk.ContactPublicObjectSearchRequest(
                 filter_groups=[{
                     "filters": [{
                         "propertyName": "email",
@@ -165,7 +894,7 @@ class HubspotService:
 
     def _search_deal(self, deal_name):
         try:
-            deal_search = self.client.crm.deals.search_api.do_search(DealPublicObjectSearchRequest(
+            deal_search = self._call("deals.search_api.do_search", self.client.crm.deals.search_api.do_search, self.sdk.DealPublicObjectSearchRequest(
                 filter_groups=[{
                     "filters": [{
                         "propertyName": "dealname",
@@ -182,38 +911,76 @@ class HubspotService:
         except Exception as e:
             self.logger.error("Error searching deal", {"error": str(e)})
 
-    def _format_deal(self, deal):
+    def _search_deals(self, deal_names: list):
+        """Returns a map of deal name to id for the `deal_names` that exist in HubSpot."""
+        try:
+            deal_search = self._call("deals.search_api.do_search", self.client.crm.deals.search_api.do_search, self.sdk.DealPublicObjectSearchRequest(
+                filter_groups=[{
+                    "filters": [{
+                        "propertyName": "dealname",
+                        "operator": "IN",
+                        "values": deal_names
+                    }]
+                }],
+                properties=["dealname"],
+                limit=len(deal_names),
+            ))
+            deal_ids = {}
+            for deal in deal_search.results:
+                deal_ids.setdefault(deal.properties.get("dealname"), deal.id)
+            return deal_ids
+        except Exception as e:
+            self.logger.error("Error searching deals", {"error": str(e)})
+            return {}
+
+    def _association(self, to_id, association_type_id: int):
+        return {
+            "to": { "id": to_id },
+            "types": [
+                {
+                    "associationCategory": "HUBSPOT_DEFINED",
+                    "associationTypeId": association_type_id
+                }
+            ]
+        }
+
+    def _format_deal(self, deal, properties: list = None):
         deal_data = deal.properties
         deal_data["id"] = deal.id
-        return deal_data
+        return self._project(deal_data, properties) if properties else deal_data
 
-    def _format_ticket(self, ticket):
+    def _format_ticket(self, ticket, properties: list = None):
         ticket_data = ticket.properties
         ticket_data["id"] = ticket.id
-        return ticket_data
+        return self._project(ticket_data, properties) if properties else ticket_data
  
-    def _format_contact(self, contact):
+    def _format_contact(self, contact, properties: list = None):
         contact_data = contact.properties
         contact_data["id"] = contact.id
-        return contact_data
-
-    def _get_last_token_expiration(self, expiry: int):
-        return datetime.now() + timedelta(seconds=expiry)
+        return self._project(contact_data, properties) if properties else contact_data
 
     def _generate_tokens(self):
-        client = HubSpot()
-        return client.oauth.tokens_api.create(
+        # The token manager never runs two refreshes at once, so this needs no lock of its own
+        if self._oauth_client is None:
+            from hubspot.client import Client as HubSpot
+            self._oauth_client = HubSpot(api_factory=self._get_connection_pool().api_factory)
+        # Not through _call: the token endpoint has no part in the API rate limits and the token
+        # manager retries failed refreshes itself
+        return self._timed(
+            "oauth.tokens_api.create",
+            self._oauth_client.oauth.tokens_api.create,
             grant_type="refresh_token",
             client_id=config.HUBSPOT_CLIENT_ID,
             client_secret=config.HUBSPOT_CLIENT_SECRET,
             refresh_token=config.HUBSPOT_REFRESH_TOKEN,
+            _request_timeout=(config.HUBSPOT_CONNECT_TIMEOUT, config.HUBSPOT_CALL_TIMEOUT),
         )
     
     def _refresh_token(self):
-        if datetime.now() >= self.last_expiration:
-            tokens = self._generate_tokens()
-            self.client = HubSpot(access_token=tokens.access_token)
-            self.last_expiration = self._get_last_token_expiration(tokens.expires_in)
-            self.logger.info("Refreshed HubSpot access token")
+        # Each access to an API hands the client's current token to ConnectionPool.api_factory,
+        # so swapping it here is enough and the pooled connections are kept
+        access_token = self.token_manager.get_access_token()
+        if self.client.access_token != access_token:
+            self.client.access_token = access_token
 
 hubspot_service = HubspotService()
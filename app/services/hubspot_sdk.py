@@ -0,0 +1,56 @@
+"""
+HubSpot SDK models used by HubspotService. The hubspot.crm packages are slow to
+import, so HubspotService only loads this module when it first talks to HubSpot.
+"""
+from hubspot.crm.contacts import (
+    SimplePublicObjectInputForCreate as ContactSimplePublicObjectInputForCreate,
+    SimplePublicObjectInput as ContactSimplePublicObjectInput,
+    PublicObjectSearchRequest as ContactPublicObjectSearchRequest,
+    BatchReadInputSimplePublicObjectId as ContactBatchReadInputSimplePublicObjectId,
+    SimplePublicObjectId as ContactSimplePublicObjectId,
+    BatchInputSimplePublicObjectBatchInputUpsert as ContactBatchInputSimplePublicObjectBatchInputUpsert,
+    SimplePublicObjectBatchInputUpsert as ContactSimplePublicObjectBatchInputUpsert
+)
+from hubspot.crm.deals import (
+    SimplePublicObjectInput as DealSimplePublicObjectInput,
+    SimplePublicObjectInputForCreate as DealSimplePublicObjectInputForCreate,
+    PublicObjectSearchRequest as DealPublicObjectSearchRequest,
+    BatchReadInputSimplePublicObjectId as DealBatchReadInputSimplePublicObjectId,
+    SimplePublicObjectId as DealSimplePublicObjectId,
+    BatchInputSimplePublicObjectBatchInputUpsert as DealBatchInputSimplePublicObjectBatchInputUpsert,
+    SimplePublicObjectBatchInputUpsert as DealSimplePublicObjectBatchInputUpsert,
+    BatchInputSimplePublicObjectBatchInput as DealBatchInputSimplePublicObjectBatchInput,
+    SimplePublicObjectBatchInput as DealSimplePublicObjectBatchInput,
+    BatchInputSimplePublicObjectInputForCreate as DealBatchInputSimplePublicObjectInputForCreate
+)
+from hubspot.crm.tickets import (
+    SimplePublicObjectInputForCreate as TicketSimplePublicObjectInputForCreate,
+    BatchReadInputSimplePublicObjectId as TicketBatchReadInputSimplePublicObjectId,
+    SimplePublicObjectId as TicketSimplePublicObjectId,
+    PublicObjectSearchRequest as TicketPublicObjectSearchRequest,
+    BatchInputSimplePublicObjectInputForCreate as TicketBatchInputSimplePublicObjectInputForCreate
+)
+from hubspot.crm.associations.v4 import (
+    BatchInputPublicFetchAssociationsBatchRequest,
+    PublicFetchAssociationsBatchRequest,
+    BatchInputPublicDefaultAssociationMultiPost,
+    PublicDefaultAssociationMultiPost,
+    PublicObjectId
+)
+
+BATCH_READ_INPUTS = {
+    "contacts": (ContactBatchReadInputSimplePublicObjectId, ContactSimplePublicObjectId),
+    "deals": (DealBatchReadInputSimplePublicObjectId, DealSimplePublicObjectId),
+    "tickets": (TicketBatchReadInputSimplePublicObjectId, TicketSimplePublicObjectId),
+}
+
+BATCH_UPSERT_INPUTS = {
+    "contacts": (ContactBatchInputSimplePublicObjectBatchInputUpsert, ContactSimplePublicObjectBatchInputUpsert),
+    "deals": (DealBatchInputSimplePublicObjectBatchInputUpsert, DealSimplePublicObjectBatchInputUpsert),
+}
+
+SEARCH_REQUESTS = {
+    "contacts": ContactPublicObjectSearchRequest,
+    "deals": DealPublicObjectSearchRequest,
+    "tickets": TicketPublicObjectSearchRequest,
+}
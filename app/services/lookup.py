@@ -0,0 +1,90 @@
+from datetime import timedelta
+from sqlalchemy.dialects.postgresql import insert
+from app.models import HubspotLookup
+from app.extensions import db
+from app.config import config
+from app.logger import Logger
+
+logger = Logger("LookupService")
+
+class LookupService:
+    """
+    Maps contact emails and deal names to HubSpot ids so writes can skip the
+    search API. Failures are logged and treated as a miss, the caller then
+    falls back to searching HubSpot.
+    """
+
+    @staticmethod
+    def get_object_id(object_type: str, lookup_key: str):
+        try:
+            lookup = HubspotLookup.query.filter(
+                HubspotLookup.object_type == object_type,
+                HubspotLookup.lookup_key == lookup_key,
+                HubspotLookup.updated_at >= db.func.now() - timedelta(seconds=config.HUBSPOT_LOOKUP_TTL),
+            ).first()
+            return lookup.object_id if lookup else None
+        except Exception as e:
+            db.session.rollback()
+            logger.error("Error reading lookup", {"object_type": object_type, "error": str(e)})
+            return None
+
+    @staticmethod
+    def get_object_ids(object_type: str, lookup_keys: list):
+        if not lookup_keys:
+            return {}
+        try:
+            lookups = HubspotLookup.query.filter(
+                HubspotLookup.object_type == object_type,
+                HubspotLookup.lookup_key.in_(lookup_keys),
+                HubspotLookup.updated_at >= db.func.now() - timedelta(seconds=config.HUBSPOT_LOOKUP_TTL),
+            ).all()
+            return { lookup.lookup_key: lookup.object_id for lookup in lookups }
+        except Exception as e:
+            db.session.rollback()
+            logger.error("Error reading lookups", {"object_type": object_type, "error": str(e)})
+            return {}
+
+    @staticmethod
+    def save(object_type: str, lookup_key: str, object_id: str):
+        LookupService.save_many(object_type, { lookup_key: object_id })
+
+    @staticmethod
+    def save_many(object_type: str, object_ids: dict):
+        if not object_ids:
+            return
+        try:
+            statement = insert(HubspotLookup).values([
+                { "object_type": object_type, "lookup_key": lookup_key, "object_id": object_id }
+                for lookup_key, object_id in object_ids.items()
+            ])
+            statement = statement.on_conflict_do_update(
+                index_elements=["object_type", "lookup_key"],
+                set_={"object_id": statement.excluded.object_id, "updated_at": db.func.now()},
+            )
+            db.session.execute(statement)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error("Error saving lookups", {"object_type": object_type, "error": str(e)})
+
+    @staticmethod
+    def delete(object_type: str, lookup_key: str):
+        try:
+            HubspotLookup.query.filter_by(object_type=object_type, lookup_key=lookup_key).delete()
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error("Error deleting lookup", {"object_type": object_type, "error": str(e)})
+
+    @staticmethod
+    def delete_object_ids(object_type: str, object_ids: list):
+        if not object_ids:
+            return
+        try:
+            HubspotLookup.query.filter(
+                HubspotLookup.object_type == object_type, HubspotLookup.object_id.in_(object_ids),
+            ).delete(synchronize_session=False)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error("Error deleting lookups", {"object_type": object_type, "error": str(e)})
@@ -0,0 +1,205 @@
+import atexit
+import fcntl
+import glob
+import json
+import os
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from threading import Event, Lock, Thread
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.config import config
+from app.logger import get_log_stats
+
+# Seconds, Prometheus' defaults plus a slower tail for HubSpot calls that wait on rate limits
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+HISTOGRAMS = {
+    "http_request_duration_seconds": ("Time spent serving API requests.", ("method", "route", "status")),
+    "hubspot_call_duration_seconds": ("Time spent in HubSpot API calls, including retries and rate limit waits.", ("api", "outcome")),
+    "db_query_duration_seconds": ("Time spent in database queries.", ("operation",)),
+    "password_hash_duration_seconds": ("Time spent hashing and verifying passwords, including the wait for the pool.", ("operation",)),
+}
+
+# Totals kept elsewhere in the process, read when the snapshot is written
+COUNTERS = {
+    "log_lines_dropped_total": ("Log lines dropped because the log queue was full.", lambda: get_log_stats()["dropped"]),
+}
+
+class MetricsRegistry:
+    """
+    Latency histograms of one process. Each process writes a snapshot of its own to `METRICS_DIR`
+    every `METRICS_FLUSH_INTERVAL` seconds, `render` adds up the snapshots of every process of the
+    host, so any gunicorn worker can answer a scrape. Snapshots of processes that exited are folded
+    into one archive file, their counts stay in the totals.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._histograms = {}
+        self._lock = Lock()
+        self._stop = Event()
+        self._thread = None
+        atexit.register(self._flush_at_exit)
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def observe(self, name: str, labels: tuple, seconds: float):
+        with self._lock:
+            series = self._histograms.setdefault(name, {}).get(labels)
+            if series is None:
+                # One count per bucket, then +Inf, then the sum
+                series = self._histograms[name][labels] = [0] * (len(BUCKETS) + 1) + [0.0]
+            series[bisect_left(BUCKETS, seconds)] += 1
+            series[-1] += seconds
+        if self._thread is None:
+            self.ensure_started()
+
+    def ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = Thread(target=self.run, name="metrics-flush", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self):
+        while not self._stop.wait(config.METRICS_FLUSH_INTERVAL):
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            snapshot = { name: { json.dumps(labels): list(series) for labels, series in histogram.items() } for name, histogram in self._histograms.items() }
+        for name, (_, read) in COUNTERS.items():
+            snapshot[name] = { json.dumps(()): [read()] }
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(os.getpid())
+        with open(f"{path}.tmp", "w") as snapshot_file:
+            json.dump(snapshot, snapshot_file)
+        os.replace(f"{path}.tmp", path)
+
+    def _flush_at_exit(self):
+        if self._histograms or any(read() for _, read in COUNTERS.values()):
+            self.flush()
+
+    def render(self):
+        """All processes' histograms and counters in the Prometheus text format."""
+        self.flush()
+        with self._directory_lock():
+            self._archive_exited()
+            merged = {}
+            for path in glob.glob(os.path.join(self.directory, "metrics-*.json")):
+                try:
+                    with open(path) as snapshot_file:
+                        self._merge(merged, json.load(snapshot_file))
+                except (OSError, ValueError):
+                    continue
+
+        lines = []
+        for name, (description, label_names) in HISTOGRAMS.items():
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, series in sorted(merged.get(name, {}).items()):
+                label_text = ",".join(f'{label}="{self._escape(value)}"' for label, value in zip(label_names, json.loads(labels)))
+                cumulative = 0
+                for bound, count in zip([*BUCKETS, "+Inf"], series[:-1]):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+                lines.append(f"{name}_sum{{{label_text}}} {series[-1]}")
+                lines.append(f"{name}_count{{{label_text}}} {cumulative}")
+        for name, (description, _) in COUNTERS.items():
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name} {sum(series[0] for series in merged.get(name, {}).values())}")
+        return "\n".join(lines) + "\n"
+
+    def _archive_exited(self):
+        archive_path = os.path.join(self.directory, "metrics-archive.json")
+        exited = [
+            path for path in glob.glob(os.path.join(self.directory, "metrics-[0-9]*.json"))
+            if not self._is_running(int(os.path.basename(path)[len("metrics-"):-len(".json")]))
+        ]
+        if not exited:
+            return
+        archive = {}
+        for path in [archive_path, *exited]:
+            try:
+                with open(path) as snapshot_file:
+                    self._merge(archive, json.load(snapshot_file))
+            except (OSError, ValueError):
+                continue
+        with open(f"{archive_path}.tmp", "w") as archive_file:
+            json.dump(archive, archive_file)
+        os.replace(f"{archive_path}.tmp", archive_path)
+        for path in exited:
+            os.remove(path)
+
+    @contextmanager
+    def _directory_lock(self):
+        with open(os.path.join(self.directory, ".lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _path(self, pid: int):
+        return os.path.join(self.directory, f"metrics-{pid}.json")
+
+    def _after_fork(self):
+        # The child starts from zero, the parent's counts are in the parent's snapshot
+        self._histograms = {}
+        self._lock = Lock()
+        self._stop = Event()
+        self._thread = None
+
+    @staticmethod
+    def _merge(merged: dict, snapshot: dict):
+        for name, histogram in snapshot.items():
+            merged_histogram = merged.setdefault(name, {})
+            for labels, series in histogram.items():
+                merged_series = merged_histogram.get(labels)
+                merged_histogram[labels] = series if merged_series is None else [a + b for a, b in zip(merged_series, series)]
+
+    @staticmethod
+    def _is_running(pid: int):
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    @staticmethod
+    def _escape(value):
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class NullMetrics:
+    def observe(self, name: str, labels: tuple, seconds: float):
+        pass
+
+def create_metrics():
+    if config.METRICS_ENABLED:
+        return MetricsRegistry(config.METRICS_DIR)
+    return NullMetrics()
+
+metrics = create_metrics()
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started_at = conn.info["query_started_at"].pop()
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+    if operation not in ("SELECT", "INSERT", "UPDATE", "DELETE"):
+        operation = "OTHER"
+    metrics.observe("db_query_duration_seconds", (operation,), time.perf_counter() - started_at)
+
+def record_queries():
+    """Times the queries of every SQLAlchemy engine."""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
@@ -0,0 +1,247 @@
+from datetime import timedelta
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from app.models import HubspotAssociation, HubspotContact, HubspotDeal, HubspotSyncState, HubspotTicket
+from app.services.page_versions import PageVersion
+from app.services.records import Contact, Deal, Ticket
+from app.extensions import db
+from app.config import config
+from app.logger import Logger
+
+logger = Logger("MirrorService")
+
+class MirrorService:
+    """
+    Local Postgres copy of HubSpot contacts, deals, tickets and their associations.
+    MirrorSync writes it, HubspotService.get_contacts reads pages from it when
+    `HUBSPOT_READ_SOURCE=mirror` and every object type was synced recently enough.
+    """
+
+    MODELS = { "contacts": HubspotContact, "deals": HubspotDeal, "tickets": HubspotTicket }
+    RECORDS = { "contacts": Contact, "deals": Deal, "tickets": Ticket }
+    # Associations are stored in one direction only, changes on either side replace them
+    ASSOCIATIONS = [("contacts", "deals"), ("deals", "tickets")]
+
+    @staticmethod
+    def is_fresh():
+        fresh = HubspotSyncState.query.filter(
+            HubspotSyncState.synced_at >= db.func.now() - timedelta(seconds=config.HUBSPOT_MIRROR_MAX_STALENESS),
+        ).count()
+        return fresh == len(MirrorService.MODELS)
+
+    @staticmethod
+    def get_contacts(limit: int, after: str = None, properties: dict = None):
+        """
+        Returns a page shaped like the live one, or None when the mirror is stale or can't be read so
+        the caller can go to HubSpot instead. Like HubSpot's, the cursor is the id the next page starts at.
+        """
+        properties = properties or {}
+        try:
+            if not MirrorService.is_fresh():
+                return None
+            query = HubspotContact.query
+            if after:
+                query = query.filter(HubspotContact.id >= int(after))
+            rows = query.order_by(HubspotContact.id).limit(limit + 1).all()
+            next_after = str(rows[limit].id) if len(rows) > limit else None
+            rows = rows[:limit]
+
+            deals_by_contact = MirrorService._associated("contacts", "deals", [row.id for row in rows])
+            deal_ids = [deal.id for deals in deals_by_contact.values() for deal in deals]
+            tickets_by_deal = MirrorService._associated("deals", "tickets", deal_ids)
+
+            contacts = []
+            for row in rows:
+                contact = Contact(str(row.id), MirrorService._format(row, properties.get("contacts")))
+                for deal_row in deals_by_contact.get(row.id, []):
+                    contact.deals.append(Deal(str(deal_row.id), MirrorService._format(deal_row, properties.get("deals")), [
+                        Ticket(str(ticket.id), MirrorService._format(ticket, properties.get("tickets")))
+                        for ticket in tickets_by_deal.get(deal_row.id, [])
+                    ]))
+                contacts.append(contact)
+            return { "contacts": contacts, "next_after": next_after }
+        except Exception as e:
+            db.session.rollback()
+            logger.error("Error reading contacts from mirror", {"error": str(e)})
+            return None
+
+    @staticmethod
+    def get_page_version(limit: int, after: str = None, properties: dict = None):
+        """
+        Version of the page get_contacts would return (see PageVersion), read from the ids and last modified
+        dates alone, without loading or nesting the objects. None when the mirror is stale, the page is
+        projected, or an object has no modified date, the caller then has to read the page to tell.
+        """
+        if properties:
+            return None
+        try:
+            if not MirrorService.is_fresh():
+                return None
+            query = select(HubspotContact.id, MirrorService._modified("contacts"))
+            if after:
+                query = query.where(HubspotContact.id >= int(after))
+            rows = db.session.execute(query.order_by(HubspotContact.id).limit(limit + 1)).all()
+            next_after = str(rows[limit].id) if len(rows) > limit else None
+            rows = rows[:limit]
+
+            deals_by_contact = MirrorService._associated_versions("contacts", "deals", [id for id, _ in rows])
+            deal_ids = [deal_id for deals in deals_by_contact.values() for deal_id, _ in deals]
+            tickets_by_deal = MirrorService._associated_versions("deals", "tickets", deal_ids)
+
+            version = PageVersion(next_after)
+            for id, modified in rows:
+                nested = [(Contact, id, modified)]
+                for deal_id, deal_modified in deals_by_contact.get(id, []):
+                    nested.append((Deal, deal_id, deal_modified))
+                    nested.extend((Ticket, ticket_id, ticket_modified) for ticket_id, ticket_modified in tickets_by_deal.get(deal_id, []))
+                for record_type, record_id, record_modified in nested:
+                    if record_modified is None:
+                        return None
+                    version.add(record_type, str(record_id), record_modified)
+            return version.hexdigest()
+        except Exception as e:
+            db.session.rollback()
+            logger.error("Error reading page version from mirror", {"error": str(e)})
+            return None
+
+    @staticmethod
+    def save_objects(object_type: str, objects: list):
+        """Upserts `(properties, modified_at)` pairs, `properties` holding the object's `id`."""
+        if not objects:
+            return
+        model = MirrorService.MODELS[object_type]
+        statement = insert(model).values([
+            { "id": int(properties["id"]), "properties": properties, "modified_at": modified_at }
+            for properties, modified_at in objects
+        ])
+        statement = statement.on_conflict_do_update(
+            index_elements=["id"],
+            set_={
+                "properties": statement.excluded.properties,
+                "modified_at": statement.excluded.modified_at,
+                "synced_at": db.func.now(),
+            },
+        )
+        db.session.execute(statement)
+
+    @staticmethod
+    def delete_objects(object_type: str, ids: list):
+        if not ids:
+            return
+        ids = [int(id) for id in ids]
+        model = MirrorService.MODELS[object_type]
+        db.session.execute(delete(model).where(model.id.in_(ids)), execution_options={"synchronize_session": False})
+        db.session.execute(
+            delete(HubspotAssociation).where(or_(
+                and_(HubspotAssociation.from_type == object_type, HubspotAssociation.from_id.in_(ids)),
+                and_(HubspotAssociation.to_type == object_type, HubspotAssociation.to_id.in_(ids)),
+            )),
+            execution_options={"synchronize_session": False},
+        )
+
+    @staticmethod
+    def replace_associations(from_type: str, to_type: str, associations: dict, side: str = "from"):
+        """
+        Replaces the stored associations of the objects keyed in `associations` with the ids they map to.
+        With `side="to"` the keys are `to_type` ids and the values `from_type` ids.
+        """
+        if not associations:
+            return
+        ids = [int(id) for id in associations]
+        id_column = HubspotAssociation.from_id if side == "from" else HubspotAssociation.to_id
+        db.session.execute(
+            delete(HubspotAssociation).where(
+                HubspotAssociation.from_type == from_type, HubspotAssociation.to_type == to_type, id_column.in_(ids),
+            ),
+            execution_options={"synchronize_session": False},
+        )
+
+        rows = []
+        for id, associated_ids in associations.items():
+            for associated_id in associated_ids:
+                from_id, to_id = (id, associated_id) if side == "from" else (associated_id, id)
+                rows.append({ "from_type": from_type, "from_id": int(from_id), "to_type": to_type, "to_id": int(to_id) })
+        if rows:
+            db.session.execute(insert(HubspotAssociation).values(rows).on_conflict_do_nothing())
+
+    @staticmethod
+    def claim(object_type: str):
+        """
+        Takes the sync lease of `object_type` for `HUBSPOT_MIRROR_LEASE` seconds so only one worker
+        syncs it at a time. Returns its HubspotSyncState, or None if another worker holds the lease.
+        """
+        db.session.execute(insert(HubspotSyncState).values(object_type=object_type).on_conflict_do_nothing())
+        claimed = db.session.execute(
+            update(HubspotSyncState)
+            .where(
+                HubspotSyncState.object_type == object_type,
+                or_(HubspotSyncState.locked_until.is_(None), HubspotSyncState.locked_until < db.func.now()),
+            )
+            .values(locked_until=db.func.now() + timedelta(seconds=config.HUBSPOT_MIRROR_LEASE))
+            .returning(HubspotSyncState.object_type),
+            execution_options={"synchronize_session": False},
+        ).scalar()
+        db.session.commit()
+        if claimed is None:
+            return None
+        return db.session.get(HubspotSyncState, object_type)
+
+    @staticmethod
+    def release(state: HubspotSyncState, caught_up: bool):
+        if caught_up:
+            state.synced_at = db.func.now()
+        state.locked_until = None
+        db.session.commit()
+
+    @staticmethod
+    def _associated(from_type: str, to_type: str, from_ids: list):
+        if not from_ids:
+            return {}
+        model = MirrorService.MODELS[to_type]
+        rows = db.session.execute(
+            select(HubspotAssociation.from_id, model)
+            .join(model, model.id == HubspotAssociation.to_id)
+            .where(
+                HubspotAssociation.from_type == from_type,
+                HubspotAssociation.to_type == to_type,
+                HubspotAssociation.from_id.in_(from_ids),
+            )
+            .order_by(HubspotAssociation.from_id, model.id)
+        ).all()
+        associated = {}
+        for from_id, row in rows:
+            associated.setdefault(from_id, []).append(row)
+        return associated
+
+    @staticmethod
+    def _associated_versions(from_type: str, to_type: str, from_ids: list):
+        """Like _associated, with `(id, modified)` pairs instead of rows."""
+        if not from_ids:
+            return {}
+        model = MirrorService.MODELS[to_type]
+        rows = db.session.execute(
+            select(HubspotAssociation.from_id, model.id, MirrorService._modified(to_type))
+            .join(model, model.id == HubspotAssociation.to_id)
+            .where(
+                HubspotAssociation.from_type == from_type,
+                HubspotAssociation.to_type == to_type,
+                HubspotAssociation.from_id.in_(from_ids),
+            )
+            .order_by(HubspotAssociation.from_id, model.id)
+        ).all()
+        associated = {}
+        for from_id, id, modified in rows:
+            associated.setdefault(from_id, []).append((id, modified))
+        return associated
+
+    @staticmethod
+    def _modified(object_type: str):
+        # The modified date property as sent by HubSpot, modified_at is parsed and wouldn't match the live pages
+        return MirrorService.MODELS[object_type].properties[MirrorService.RECORDS[object_type].MODIFIED_PROPERTY].as_string()
+
+    @staticmethod
+    def _format(row, properties: list = None):
+        """The mirror holds HubSpot's default properties, projected properties outside of those come back as null."""
+        if properties:
+            return { name: row.properties.get(name) for name in properties }
+        return row.properties
@@ -0,0 +1,158 @@
+from datetime import datetime, timedelta, timezone
+from threading import Event, Lock, Thread
+from app.extensions import db
+from app.config import config
+from app.logger import Logger
+from app.services.hubspot import hubspot_service
+from app.services.mirror import MirrorService
+
+# HubSpot's search API stops paging after this many results for one query
+SEARCH_RESULT_LIMIT = 10000
+
+class MirrorSync:
+    """
+    Keeps the local mirror up to date: searches HubSpot for contacts, deals and tickets
+    modified since each type's high-water mark, oldest first, upserts them and their
+    associations in bulk and moves the mark forward after every page, so an interrupted
+    sync resumes where it stopped. Objects deleted in HubSpot are not removed.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.logger = Logger("MirrorSync")
+        self._stop = Event()
+        self._thread = None
+        self._lock = Lock()
+
+    def ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = Thread(target=self.run, name="hubspot-mirror-sync", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self):
+        self.logger.info("Mirror sync started")
+        while not self._stop.is_set():
+            self.sync_once()
+            self._stop.wait(config.HUBSPOT_MIRROR_SYNC_INTERVAL)
+
+    def sync_once(self):
+        with self.app.app_context():
+            try:
+                for object_type in MirrorService.MODELS:
+                    try:
+                        self._sync(object_type)
+                    except Exception as e:
+                        db.session.rollback()
+                        self.logger.error("Error syncing mirror", {"object_type": object_type, "error": str(e)})
+            finally:
+                db.session.remove()
+
+    def _sync(self, object_type: str):
+        state = MirrorService.claim(object_type)
+        if state is None:
+            return
+        caught_up = False
+        synced = 0
+        try:
+            high_water_mark = state.high_water_mark
+            # HubSpot's search index trails writes a little, look back so late arrivals aren't skipped
+            since = high_water_mark - timedelta(seconds=config.HUBSPOT_MIRROR_OVERLAP) if high_water_mark else None
+            after = None
+            # Modified time of the last object returned, the newest of the current query
+            newest = None
+            while not self._stop.is_set():
+                objects, next_after = hubspot_service.search_modified(object_type, self._to_ms(since), after)
+                objects = [(properties, self._to_utc(modified_at)) for properties, modified_at in objects]
+                self._save(object_type, objects)
+                if objects and objects[-1][1]:
+                    newest = objects[-1][1]
+                    high_water_mark = max(filter(None, [high_water_mark, newest]))
+                state.high_water_mark = high_water_mark
+                state.locked_until = db.func.now() + timedelta(seconds=config.HUBSPOT_MIRROR_LEASE)
+                db.session.commit()
+                synced += len(objects)
+
+                if not next_after:
+                    caught_up = True
+                    break
+                restart_at = newest or high_water_mark
+                if int(next_after) < SEARCH_RESULT_LIMIT:
+                    after = next_after
+                elif since is None or restart_at > since:
+                    # Start a new query from the newest object seen to get past the paging limit
+                    since, after = restart_at, None
+                else:
+                    # A whole query's results share one modified time, so starting from it again would
+                    # return them once more. Walk that time by id, then go on after it
+                    synced += self._sync_modified_at(object_type, state, restart_at)
+                    since, after = restart_at + timedelta(milliseconds=1), None
+        except Exception:
+            db.session.rollback()
+            raise
+        finally:
+            MirrorService.release(state, caught_up)
+        if synced:
+            self.logger.info("Synced mirror", {"object_type": object_type, "count": synced})
+
+    def _sync_modified_at(self, object_type: str, state, modified_at: datetime):
+        """Saves every object modified exactly at `modified_at`, page by page in id order, returns how many."""
+        after_id = None
+        synced = 0
+        while not self._stop.is_set():
+            objects, more = hubspot_service.search_modified_at(object_type, self._to_ms(modified_at), after_id)
+            objects = [(properties, self._to_utc(modified)) for properties, modified in objects]
+            self._save(object_type, objects)
+            state.locked_until = db.func.now() + timedelta(seconds=config.HUBSPOT_MIRROR_LEASE)
+            db.session.commit()
+            synced += len(objects)
+            if not objects or not more:
+                break
+            after_id = objects[-1][0]["id"]
+        return synced
+
+    def apply_changes(self, object_type: str, ids: list):
+        """Refetches objects reported changed, e.g. by a webhook, ids HubSpot no longer returns are deleted."""
+        found = hubspot_service.read_objects(object_type, ids)
+        modified_property = hubspot_service.MODIFIED_PROPERTIES[object_type]
+        self._save(object_type, [
+            (properties, self._parse_modified(properties.get(modified_property))) for properties in found.values()
+        ])
+        MirrorService.delete_objects(object_type, [id for id in ids if id not in found])
+
+    def _save(self, object_type: str, objects: list):
+        MirrorService.save_objects(object_type, objects)
+        ids = [properties["id"] for properties, _ in objects]
+        if not ids:
+            return
+        for from_type, to_type in MirrorService.ASSOCIATIONS:
+            if object_type == from_type:
+                MirrorService.replace_associations(
+                    from_type, to_type, hubspot_service.get_associations(from_type, to_type, ids),
+                )
+            elif object_type == to_type:
+                MirrorService.replace_associations(
+                    from_type, to_type, hubspot_service.get_associations(to_type, from_type, ids), side="to",
+                )
+
+    @staticmethod
+    def _to_ms(value):
+        return int(value.replace(tzinfo=timezone.utc).timestamp() * 1000) if value else None
+
+    @classmethod
+    def _parse_modified(cls, value):
+        try:
+            return cls._to_utc(datetime.fromisoformat(value)) if value else None
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _to_utc(value):
+        # Stored without a timezone like the other DateTime columns, always UTC
+        if value is None or value.tzinfo is None:
+            return value
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
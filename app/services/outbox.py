@@ -0,0 +1,195 @@
+import random
+from collections import defaultdict
+from datetime import timedelta
+from threading import Event, Lock, Thread
+from sqlalchemy import and_, or_, select, update
+from app.models import HubspotOutbox, User
+from app.extensions import db
+from app.config import config
+from app.logger import Logger
+from app.services.hubspot import hubspot_service
+
+class OutboxService:
+    UPSERT_CONTACT = "upsert_contact"
+    UPSERT_DEAL = "upsert_deal"
+    CREATE_TICKET = "create_ticket"
+
+    @staticmethod
+    def enqueue(operation: str, payload: dict, user_id: int = None):
+        """Adds an operation to the session, it is committed together with the caller's local write."""
+        entry = HubspotOutbox(operation=operation, payload=payload, user_id=user_id, status="pending", attempts=0)
+        db.session.add(entry)
+        return entry
+
+    @staticmethod
+    def claim(limit: int):
+        """
+        Marks up to `limit` due operations as processing for `OUTBOX_LEASE` seconds and returns them.
+        Rows locked by another worker are skipped, operations whose lease ran out are claimed again.
+        """
+        due = select(HubspotOutbox.id).where(or_(
+            and_(HubspotOutbox.status == "pending", HubspotOutbox.next_attempt_at <= db.func.now()),
+            and_(HubspotOutbox.status == "processing", HubspotOutbox.locked_until < db.func.now()),
+        )).order_by(HubspotOutbox.id).limit(limit).with_for_update(skip_locked=True)
+        ids = db.session.execute(
+            update(HubspotOutbox)
+            .where(HubspotOutbox.id.in_(due.scalar_subquery()))
+            .values(status="processing", locked_until=db.func.now() + timedelta(seconds=config.OUTBOX_LEASE))
+            .returning(HubspotOutbox.id),
+            execution_options={"synchronize_session": False},
+        ).scalars().all()
+        db.session.commit()
+        if not ids:
+            return []
+        return HubspotOutbox.query.filter(HubspotOutbox.id.in_(ids)).order_by(HubspotOutbox.id).all()
+
+    @staticmethod
+    def complete(entry: HubspotOutbox, object_id: str):
+        entry.status = "done"
+        entry.object_id = object_id
+        entry.locked_until = None
+        entry.last_error = None
+
+    @staticmethod
+    def retry(entry: HubspotOutbox, error: str):
+        """
+        Reschedules a failed operation with exponential backoff, it is marked failed after
+        `OUTBOX_MAX_ATTEMPTS` attempts. Contact upserts are never given up on since the user's
+        deals and tickets wait for them, their delay stays at `OUTBOX_BACKOFF_MAX`.
+        """
+        entry.attempts += 1
+        entry.last_error = error
+        entry.locked_until = None
+        if entry.attempts >= config.OUTBOX_MAX_ATTEMPTS and entry.operation != OutboxService.UPSERT_CONTACT:
+            entry.status = "failed"
+            return
+        delay = min(config.OUTBOX_BACKOFF_MAX, config.OUTBOX_BACKOFF_BASE * 2 ** min(entry.attempts - 1, 32))
+        OutboxService._schedule(entry, delay * random.uniform(0.5, 1))
+
+    @staticmethod
+    def postpone(entry: HubspotOutbox, reason: str):
+        """Reschedules an operation that can't be sent yet without counting it as an attempt."""
+        entry.last_error = reason
+        entry.locked_until = None
+        OutboxService._schedule(entry, config.OUTBOX_BACKOFF_BASE)
+
+    @staticmethod
+    def _schedule(entry: HubspotOutbox, delay: float):
+        entry.status = "pending"
+        entry.next_attempt_at = db.func.now() + timedelta(seconds=delay)
+
+    @staticmethod
+    def requeue_failed():
+        """Moves every failed operation back to pending with its attempts reset, returns how many were moved."""
+        count = HubspotOutbox.query.filter_by(status="failed").update(
+            {"status": "pending", "attempts": 0, "next_attempt_at": db.func.now(), "locked_until": None},
+            synchronize_session=False,
+        )
+        db.session.commit()
+        return count
+
+class OutboxWorker:
+    """
+    Drains the outbox in the background: claims due operations, sends them to HubSpot
+    with batch calls grouped by operation and contact, writes the resulting ids back
+    and reschedules failures with exponential backoff.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.logger = Logger("OutboxWorker")
+        self._stop = Event()
+        self._thread = None
+        self._lock = Lock()
+
+    def ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = Thread(target=self.run, name="hubspot-outbox", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self):
+        self.logger.info("Outbox worker started")
+        while not self._stop.is_set():
+            try:
+                processed = self.drain_once()
+            except Exception as e:
+                self.logger.error("Error draining outbox", {"error": str(e)})
+                processed = 0
+            if not processed:
+                self._stop.wait(config.OUTBOX_POLL_INTERVAL)
+
+    def drain_once(self):
+        with self.app.app_context():
+            try:
+                entries = OutboxService.claim(config.OUTBOX_BATCH_SIZE)
+                by_operation = defaultdict(list)
+                for entry in entries:
+                    by_operation[entry.operation].append(entry)
+
+                # Contacts first, deals and tickets of a new user need the contact id written back here
+                self._process_contacts(by_operation.pop(OutboxService.UPSERT_CONTACT, []))
+                self._process_deals(by_operation.pop(OutboxService.UPSERT_DEAL, []))
+                self._process_tickets(by_operation.pop(OutboxService.CREATE_TICKET, []))
+                for unknown in by_operation.values():
+                    for entry in unknown:
+                        entry.status = "failed"
+                        entry.last_error = f"Unknown operation {entry.operation}"
+                db.session.commit()
+                if entries:
+                    self.logger.info("Drained outbox", {"count": len(entries)})
+                return len(entries)
+            finally:
+                db.session.remove()
+
+    def _process_contacts(self, entries):
+        if not entries:
+            return
+        results = hubspot_service.create_or_update_contacts([entry.payload["properties"] for entry in entries])
+        for entry, result in zip(entries, results):
+            if "error" in result:
+                OutboxService.retry(entry, result["error"])
+                continue
+            contact_id = result["data"]["id"]
+            if entry.user_id:
+                User.query.filter_by(id=entry.user_id).update({"contact_id": contact_id})
+            OutboxService.complete(entry, contact_id)
+        db.session.commit()
+
+    def _process_deals(self, entries):
+        for contact_id, contact_entries in self._group_by_contact(entries).items():
+            results = hubspot_service.create_or_update_deals(contact_id, [entry.payload["properties"] for entry in contact_entries])
+            self._apply_results(contact_entries, results)
+
+    def _process_tickets(self, entries):
+        for contact_id, contact_entries in self._group_by_contact(entries).items():
+            results = hubspot_service.create_tickets(
+                contact_id, [(entry.payload["deal_id"], entry.payload["properties"]) for entry in contact_entries]
+            )
+            self._apply_results(contact_entries, results)
+
+    def _group_by_contact(self, entries):
+        users = { user.id: user for user in User.query.filter(User.id.in_({entry.user_id for entry in entries})) } if entries else {}
+        grouped = defaultdict(list)
+        for entry in entries:
+            user = users.get(entry.user_id)
+            if not user:
+                entry.status = "failed"
+                entry.last_error = "User not found"
+            elif not user.contact_id:
+                OutboxService.postpone(entry, "Contact not created yet")
+            else:
+                grouped[user.contact_id].append(entry)
+        return grouped
+
+    def _apply_results(self, entries, results):
+        for entry, result in zip(entries, results):
+            if "error" in result:
+                OutboxService.retry(entry, result["error"])
+            else:
+                OutboxService.complete(entry, result["data"]["id"])
+        db.session.commit()
@@ -0,0 +1,37 @@
+import json
+from hashlib import blake2b
+
+class PageVersion:
+    """
+    Fingerprint of a contacts page, used as its weak ETag: the projection, the next cursor, and the
+    id and last modified date of every contact, deal and ticket in the order they are nested. A page
+    whose objects didn't change keeps its version, however it was read.
+    """
+
+    def __init__(self, next_after: str = None, properties: dict = None):
+        self._hash = blake2b(digest_size=16)
+        self._hash.update(json.dumps([next_after, properties or {}], sort_keys=True).encode("utf-8"))
+
+    def add(self, record_type, id: str, modified: str):
+        self._hash.update(f"\n{record_type.__name__}:{id}:{modified}".encode("utf-8"))
+
+    def hexdigest(self):
+        return self._hash.hexdigest()
+
+def page_version(page: dict, properties: dict = None):
+    """Version of a page returned by HubspotService.get_contacts."""
+    version = PageVersion(page["next_after"], properties)
+    for contact in page["contacts"]:
+        _add(version, contact)
+        for deal in contact.deals:
+            _add(version, deal)
+            for ticket in deal.tickets:
+                _add(version, ticket)
+    return version.hexdigest()
+
+def _add(version: PageVersion, record):
+    modified = record.properties.get(record.MODIFIED_PROPERTY)
+    if modified is None:
+        # Projected out, the properties themselves have to tell whether the record changed
+        modified = json.dumps(record.properties, sort_keys=True, default=str)
+    version.add(type(record), record.id, modified)
@@ -0,0 +1,74 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from threading import BoundedSemaphore, Lock
+from bcrypt import checkpw, gensalt, hashpw
+from app.config import config
+from app.services.metrics import metrics
+
+class PasswordHasherBusy(Exception):
+    """Raised instead of queueing when `PASSWORD_HASH_MAX_PENDING` hashes are already pending."""
+
+def _hash(password: bytes, rounds: int):
+    return hashpw(password, gensalt(rounds)).decode("utf-8")
+
+def _verify(password: bytes, password_hash: bytes):
+    return checkpw(password, password_hash)
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a pool of `workers` threads (bcrypt releases the GIL) or processes, so a burst of
+    logins uses at most that many cores while other requests keep being served. At most `max_pending`
+    hashes run or wait at once, callers beyond that get PasswordHasherBusy straight away.
+    """
+
+    def __init__(self, rounds: int, workers: int, max_pending: int, pool: str = "threads"):
+        self.rounds = rounds
+        self.workers = workers
+        self.pool = pool
+        self._pending = BoundedSemaphore(max_pending)
+        self._executor = None
+        self._lock = Lock()
+
+    def hash(self, password: str):
+        return self._run("hash", _hash, password.encode("utf-8"), self.rounds)
+
+    def verify(self, password: str, password_hash: str):
+        return self._run("verify", _verify, password.encode("utf-8"), password_hash.encode("utf-8"))
+
+    def needs_rehash(self, password_hash: str):
+        """bcrypt hashes carry their cost, `$2b$<rounds>$<salt and hash>`."""
+        try:
+            return int(password_hash.split("$")[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+    def _run(self, operation: str, function, *args):
+        if not self._pending.acquire(blocking=False):
+            raise PasswordHasherBusy()
+        started_at = time.perf_counter()
+        try:
+            future = self._get_executor().submit(function, *args)
+        except Exception:
+            self._pending.release()
+            raise
+        future.add_done_callback(lambda _: self._pending.release())
+        try:
+            return future.result()
+        finally:
+            # Includes the wait for a free worker
+            metrics.observe("password_hash_duration_seconds", (operation,), time.perf_counter() - started_at)
+
+    def _get_executor(self):
+        # Created on first use so every forked server worker gets its own pool
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.pool == "processes":
+                        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                    else:
+                        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+password_hasher = PasswordHasher(
+    config.PASSWORD_HASH_ROUNDS, config.PASSWORD_HASH_WORKERS, config.PASSWORD_HASH_MAX_PENDING, config.PASSWORD_HASH_POOL,
+)
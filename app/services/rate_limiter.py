@@ -0,0 +1,161 @@
+import fcntl
+import json
+import os
+import random
+import time
+from contextlib import contextmanager
+from threading import Lock
+from app.config import config
+from app.logger import Logger
+
+class RateLimitExceeded(Exception):
+    pass
+
+class MemoryBucketStore:
+    """Keeps bucket state in the process, each server process gets its own share of the quota."""
+
+    def __init__(self):
+        self._state = {}
+        self._lock = Lock()
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    @contextmanager
+    def state(self):
+        with self._lock:
+            yield self._state
+
+    def _after_fork(self):
+        self._lock = Lock()
+
+class FileBucketStore:
+    """
+    Shares bucket state between the worker processes of a host through a JSON file,
+    every update happens under an exclusive lock on the file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    @contextmanager
+    def state(self):
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        with os.fdopen(fd, "r+") as state_file:
+            fcntl.flock(state_file, fcntl.LOCK_EX)
+            try:
+                try:
+                    state = json.load(state_file)
+                except ValueError:
+                    state = {}
+                yield state
+                state_file.seek(0)
+                state_file.truncate()
+                json.dump(state, state_file)
+                # Written before the lock is released, or the next holder could read stale state
+                state_file.flush()
+            finally:
+                fcntl.flock(state_file, fcntl.LOCK_UN)
+
+class RateLimiter:
+    """
+    Token buckets in front of the HubSpot API, one per quota: search calls have a much
+    lower limit than object calls. Each call reserves a token and waits until it is due,
+    so callers queue up instead of being throttled by HubSpot. When HubSpot answers 429
+    anyway the bucket is paused for everyone sharing the store until `Retry-After` passed.
+    """
+
+    def __init__(self, store, limits: dict):
+        self.store = store
+        # bucket name -> (tokens per second, burst size)
+        self.limits = limits
+
+    def acquire(self, bucket: str):
+        rate, burst = self.limits[bucket]
+        with self.store.state() as state:
+            now = time.time()
+            tokens, updated_at, paused_until = state.get(bucket, (burst, now, 0))
+            tokens = min(burst, tokens + max(now - updated_at, 0) * rate)
+            wait = max(paused_until - now, (1 - tokens) / rate if tokens < 1 else 0)
+            if wait > config.HUBSPOT_RATE_LIMIT_MAX_WAIT:
+                raise RateLimitExceeded(f"HubSpot {bucket} rate limit would delay the call by {wait:.1f}s")
+            state[bucket] = (tokens - 1, now, paused_until)
+        if wait > 0:
+            time.sleep(wait)
+
+    def pause(self, bucket: str, seconds: float):
+        rate, burst = self.limits[bucket]
+        with self.store.state() as state:
+            now = time.time()
+            _, _, paused_until = state.get(bucket, (burst, now, 0))
+            # Calls already waiting hold reservations, start over from an empty bucket
+            state[bucket] = (0, now + seconds, max(paused_until, now + seconds))
+
+class NullRateLimiter:
+    def acquire(self, bucket: str):
+        pass
+
+    def pause(self, bucket: str, seconds: float):
+        pass
+
+class RetryPolicy:
+    """
+    Retries HubSpot calls rejected with 429 or a 5xx status, waiting `Retry-After` when HubSpot
+    sends it and a jittered exponential backoff otherwise. Creates are only retried on 429,
+    after a 5xx they may have gone through and retrying could duplicate the object.
+    """
+
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(self, rate_limiter):
+        self.rate_limiter = rate_limiter
+        self.logger = Logger("HubspotRetry")
+
+    def call(self, api: str, fn, *args, **kwargs):
+        bucket = self.bucket(api)
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire(bucket)
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                status = getattr(e, "status", None)
+                if not self._should_retry(api, status) or attempt >= config.HUBSPOT_MAX_RETRIES:
+                    raise
+                attempt += 1
+                delay = self._retry_after(e)
+                if delay is None:
+                    delay = min(config.HUBSPOT_RETRY_BACKOFF_MAX, config.HUBSPOT_RETRY_BACKOFF_BASE * 2 ** (attempt - 1))
+                    delay *= random.uniform(0.5, 1)
+                if status == 429:
+                    self.rate_limiter.pause(bucket, delay)
+                self.logger.warning("Retrying HubSpot call", {"api": api, "status": status, "attempt": attempt, "delay": delay})
+                if status != 429:
+                    # A paused bucket already makes the next acquire wait
+                    time.sleep(delay)
+
+    @staticmethod
+    def bucket(api: str):
+        return "search" if ".search_api." in api else "objects"
+
+    def _should_retry(self, api: str, status):
+        if status == 429:
+            return True
+        return status in self.RETRY_STATUSES and not api.endswith("_api.create")
+
+    @staticmethod
+    def _retry_after(error):
+        headers = getattr(error, "headers", None) or {}
+        try:
+            return max(float(headers.get("Retry-After")), 0)
+        except (TypeError, ValueError):
+            return None
+
+def create_rate_limiter():
+    limits = {
+        "search": (config.HUBSPOT_SEARCH_RATE_LIMIT, config.HUBSPOT_SEARCH_RATE_LIMIT_BURST),
+        "objects": (config.HUBSPOT_RATE_LIMIT, config.HUBSPOT_RATE_LIMIT_BURST),
+    }
+    if config.HUBSPOT_RATE_LIMIT_STORE == "file":
+        return RateLimiter(FileBucketStore(config.HUBSPOT_RATE_LIMIT_FILE), limits)
+    if config.HUBSPOT_RATE_LIMIT_STORE == "memory":
+        return RateLimiter(MemoryBucketStore(), limits)
+    return NullRateLimiter()
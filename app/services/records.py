@@ -0,0 +1,43 @@
+class Ticket:
+    """
+    A ticket in a contacts page. `properties` is the formatted (and possibly cached) property dict, it is
+    referenced rather than copied and must not be modified; the JSON provider flattens records with `to_dict`.
+    """
+    # Set by HubSpot whenever the object changes, page ETags are built from it
+    MODIFIED_PROPERTY = "hs_lastmodifieddate"
+    __slots__ = ("id", "properties")
+
+    def __init__(self, id: str, properties: dict):
+        self.id = id
+        self.properties = properties
+
+    def to_dict(self):
+        return { **self.properties, "id": self.id }
+
+class Deal:
+    MODIFIED_PROPERTY = "hs_lastmodifieddate"
+    __slots__ = ("id", "properties", "tickets")
+
+    def __init__(self, id: str, properties: dict, tickets: list = None):
+        self.id = id
+        self.properties = properties
+        self.tickets = tickets if tickets is not None else []
+
+    def to_dict(self):
+        return { **self.properties, "id": self.id, "tickets": self.tickets }
+
+class Contact:
+    MODIFIED_PROPERTY = "lastmodifieddate"
+    __slots__ = ("id", "properties", "deals")
+
+    def __init__(self, id: str, properties: dict, deals: list = None):
+        self.id = id
+        self.properties = properties
+        self.deals = deals if deals is not None else []
+
+    def to_dict(self):
+        # Cached contacts also hold the ids of their deals, which aren't part of the response
+        data = { name: value for name, value in self.properties.items() if name != "deal_ids" }
+        data["id"] = self.id
+        data["deals"] = self.deals
+        return data
@@ -0,0 +1,153 @@
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import time
+from contextlib import contextmanager
+from threading import Lock
+from urllib.parse import parse_qs, urlparse
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from flask_limiter.util import get_remote_address
+from limits.storage import Storage
+from app.config import config
+
+# key hash, expires at (epoch seconds), count
+SLOT = struct.Struct("<Qdq")
+# Slots tried from a key's home slot before the one expiring soonest is taken over
+PROBES = 8
+
+class MmapStorage(Storage):
+    """
+    Fixed window counters for Flask-Limiter in a memory-mapped file shared by every worker process
+    of the host, e.g. `mmap:///dev/shm/hubspot-crm-rate-limits?slots=65536`. Each key lives in a
+    24 byte slot found by its hash, updates hold a process lock and an flock on the file for a few
+    microseconds. When every slot near a key is live the one expiring soonest is reused, which
+    can only let that key's client through early, never block it wrongly.
+    """
+
+    STORAGE_SCHEME = ["mmap"]
+
+    def __init__(self, uri: str, wrap_exceptions: bool = False, **options):
+        parsed = urlparse(uri)
+        self.path = parsed.path
+        self.slots = int(parse_qs(parsed.query).get("slots", [options.get("slots", 65536)])[0])
+        self._file = open(self.path, "a+b")
+        size = self.slots * SLOT.size
+        if os.fstat(self._file.fileno()).st_size < size:
+            os.ftruncate(self._file.fileno(), size)
+        self._map = mmap.mmap(self._file.fileno(), size, mmap.MAP_SHARED)
+        self._lock = Lock()
+        os.register_at_fork(after_in_child=self._after_fork)
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+    @property
+    def base_exceptions(self):
+        return OSError
+
+    def incr(self, key: str, expiry: float, elastic_expiry: bool = False, amount: int = 1):
+        key_hash = self._hash(key)
+        with self._locked():
+            now = time.time()
+            offset, stored_hash, expires_at, count = self._find(key_hash, now)
+            if stored_hash != key_hash or expires_at <= now:
+                expires_at, count = now + expiry, 0
+            elif elastic_expiry:
+                expires_at = now + expiry
+            count += amount
+            SLOT.pack_into(self._map, offset, key_hash, expires_at, count)
+            return count
+
+    def get(self, key: str):
+        _, stored_hash, expires_at, count = self._read(key)
+        return count if stored_hash == self._hash(key) and expires_at > time.time() else 0
+
+    def get_expiry(self, key: str):
+        _, stored_hash, expires_at, _ = self._read(key)
+        return expires_at if stored_hash == self._hash(key) else time.time()
+
+    def check(self):
+        return not self._map.closed
+
+    def reset(self):
+        with self._locked():
+            now = time.time()
+            live = sum(
+                1 for offset in range(0, self.slots * SLOT.size, SLOT.size)
+                if SLOT.unpack_from(self._map, offset)[1] > now
+            )
+            self._map[:] = bytes(self.slots * SLOT.size)
+            return live
+
+    def clear(self, key: str):
+        key_hash = self._hash(key)
+        with self._locked():
+            offset, stored_hash, _, _ = self._find(key_hash, time.time())
+            if stored_hash == key_hash:
+                SLOT.pack_into(self._map, offset, 0, 0, 0)
+
+    def _read(self, key: str):
+        with self._locked():
+            return self._find(self._hash(key), time.time())
+
+    def _find(self, key_hash: int, now: float):
+        """Returns the slot holding `key_hash`, or else the one it should take, as `(offset, *slot)`."""
+        home = key_hash % self.slots
+        candidate = None
+        for probe in range(PROBES):
+            offset = (home + probe) % self.slots * SLOT.size
+            stored_hash, expires_at, count = SLOT.unpack_from(self._map, offset)
+            if stored_hash == key_hash:
+                return offset, stored_hash, expires_at, count
+            if candidate is None or expires_at < candidate[2]:
+                candidate = (offset, stored_hash, expires_at, count)
+        return candidate
+
+    @contextmanager
+    def _locked(self):
+        # flock only excludes other processes, the threads of this one take the lock first
+        with self._lock:
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._file, fcntl.LOCK_UN)
+
+    def _after_fork(self):
+        # A forked child shares the parent's open file and with it the flock, open the file again
+        self._lock = Lock()
+        self._file = open(self.path, "a+b")
+
+    @staticmethod
+    def _hash(key: str):
+        # 0 marks an empty slot
+        return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little") or 1
+
+def get_identity():
+    """The JWT identity of the request, or None for anonymous requests and invalid tokens."""
+    try:
+        verify_jwt_in_request(optional=True)
+        return get_jwt_identity()
+    except Exception:
+        return None
+
+def rate_limit_key():
+    """Authenticated requests are counted per user, wherever they come from, the others per IP."""
+    identity = get_identity()
+    if identity is not None:
+        return f"user:{identity}"
+    return f"ip:{get_remote_address()}"
+
+def default_limit():
+    if get_identity() is not None:
+        return config.RATELIMIT_IDENTITY_DEFAULT
+    return config.RATELIMIT_DEFAULT
+
+def apply_route_limits(app, limiter):
+    """Gives the endpoints of `RATELIMIT_ROUTES` their own limit instead of the default one."""
+    for endpoint, limit in config.RATELIMIT_ROUTES.items():
+        view_function = app.view_functions.get(endpoint)
+        if view_function is None:
+            raise ValueError(f"RATELIMIT_ROUTES names an unknown endpoint: {endpoint}")
+        # Decorated limits are checked by the wrapper, not before the request
+        app.view_functions[endpoint] = limiter.limit(limit)(view_function)
@@ -0,0 +1,84 @@
+import time
+from collections import deque
+from threading import Event, Lock
+
+class _Flight:
+    __slots__ = ("done", "result", "error", "finished_at", "generation")
+
+    def __init__(self, generation: int):
+        self.generation = generation
+        self.done = Event()
+        self.result = None
+        self.error = None
+        self.finished_at = None
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time. Callers asking for a key that is already being computed
+    wait for that call and get its result (or its exception) instead of running their own. For
+    `grace` seconds after a call finished its result is also handed to callers that arrive late,
+    unless `keep` rejects it, e.g. because it is an error.
+    """
+
+    def __init__(self, grace: float):
+        self.grace = grace
+        self._flights = {}
+        # (finished_at, key, flight) in the order the calls finished, to drop expired results
+        self._finished = deque()
+        self._lock = Lock()
+        # Bumped by forget, results of calls that started before are not kept
+        self._generation = 0
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key, function, keep=None):
+        """Returns `(result, shared)`, `shared` is True when the result came from another caller's call."""
+        with self._lock:
+            self._expire(time.monotonic())
+            flight = self._flights.get(key)
+            shared = flight is not None
+            if shared:
+                self.coalesced += 1
+            else:
+                flight = self._flights[key] = _Flight(self._generation)
+                self.executed += 1
+
+        if shared:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+
+        kept = False
+        try:
+            flight.result = function()
+            kept = self.grace > 0 and (keep is None or keep(flight.result))
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                flight.finished_at = time.monotonic()
+                if kept and flight.generation == self._generation:
+                    self._finished.append((flight.finished_at, key, flight))
+                elif self._flights.get(key) is flight:
+                    del self._flights[key]
+            flight.done.set()
+        return flight.result, False
+
+    def forget(self):
+        """Stops sharing every earlier call, kept or in flight, later callers start a call of their own."""
+        with self._lock:
+            self._generation += 1
+            self._flights.clear()
+            self._finished.clear()
+
+    def get_stats(self):
+        with self._lock:
+            return { "executed": self.executed, "coalesced": self.coalesced, "in_flight": len(self._flights) - len(self._finished) }
+
+    def _expire(self, now: float):
+        while self._finished and now - self._finished[0][0] >= self.grace:
+            _, key, flight = self._finished.popleft()
+            if self._flights.get(key) is flight:
+                del self._flights[key]
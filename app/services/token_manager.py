@@ -0,0 +1,139 @@
+import fcntl
+import json
+import os
+import time
+from contextlib import contextmanager
+from threading import Event, Lock, Thread
+from app.config import config
+from app.logger import Logger
+
+class Token:
+    def __init__(self, access_token: str, expires_at: float):
+        self.access_token = access_token
+        self.expires_at = expires_at
+
+    def expires_within(self, seconds: float):
+        return self.expires_at - seconds <= time.time()
+
+class TokenFileStore:
+    """
+    Shares the current token between the worker processes of a host through a JSON file.
+    An exclusive lock on a sibling `.lock` file makes sure only one process refreshes at a time.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    @contextmanager
+    def lock(self):
+        with open(f"{self.path}.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def read(self):
+        try:
+            with open(self.path) as token_file:
+                data = json.load(token_file)
+            return Token(data["access_token"], data["expires_at"])
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def write(self, token: Token):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as token_file:
+            json.dump({ "access_token": token.access_token, "expires_at": token.expires_at }, token_file)
+        os.replace(tmp_path, self.path)
+
+class TokenManager:
+    """
+    Hands out a valid HubSpot access token.
+
+    A background thread refreshes the token `HUBSPOT_TOKEN_REFRESH_AHEAD` seconds before
+    it expires, so requests only refresh inline if that failed and the token is within
+    `HUBSPOT_TOKEN_REFRESH_MARGIN` seconds of expiring. Only one thread per process
+    refreshes at a time while the others wait for its result, and with a store only one
+    process per host does, the others pick the new token up from the store.
+    """
+
+    def __init__(self, generate_tokens, store: TokenFileStore = None):
+        self.generate_tokens = generate_tokens
+        self.store = store
+        self.logger = Logger("TokenManager")
+        self._token = None
+        self._lock = Lock()
+        self._stop = Event()
+        self._thread = None
+        self._pid = None
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def get_access_token(self):
+        self._ensure_refresher()
+        token = self._token
+        if token is None or token.expires_within(config.HUBSPOT_TOKEN_REFRESH_MARGIN):
+            token = self._refresh(config.HUBSPOT_TOKEN_REFRESH_MARGIN)
+        return token.access_token
+
+    def stop(self):
+        self._stop.set()
+
+    def _refresh(self, margin: float):
+        with self._lock:
+            # Another thread may have refreshed while this one waited for the lock
+            token = self._token
+            if token is not None and not token.expires_within(margin):
+                return token
+            token = self._load_or_generate(margin)
+            self._token = token
+            return token
+
+    def _load_or_generate(self, margin: float):
+        if self.store is None:
+            return self._generate()
+        with self.store.lock():
+            token = self.store.read()
+            if token is not None and not token.expires_within(margin):
+                return token
+            token = self._generate()
+            self.store.write(token)
+            return token
+
+    def _generate(self):
+        tokens = self.generate_tokens()
+        self.logger.info("Refreshed HubSpot access token")
+        return Token(tokens.access_token, time.time() + tokens.expires_in)
+
+    def _ensure_refresher(self):
+        # Threads don't survive a fork, so each server process starts its own
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = Thread(target=self._run_refresher, name="hubspot-token-refresher", daemon=True)
+            self._thread.start()
+
+    def _after_fork(self):
+        # The parent's lock may have been held by a thread that does not exist in the child
+        self._lock = Lock()
+
+    def _run_refresher(self):
+        while not self._stop.is_set():
+            token = self._token
+            if token is not None:
+                wait = token.expires_at - config.HUBSPOT_TOKEN_REFRESH_AHEAD - time.time()
+                if self._stop.wait(max(wait, config.HUBSPOT_TOKEN_RETRY_INTERVAL)):
+                    return
+            try:
+                self._refresh(config.HUBSPOT_TOKEN_REFRESH_AHEAD)
+            except Exception as e:
+                self.logger.error("Error refreshing HubSpot access token", {"error": str(e)})
+                self._stop.wait(config.HUBSPOT_TOKEN_RETRY_INTERVAL)
+
+def create_token_manager(generate_tokens):
+    store = TokenFileStore(config.HUBSPOT_TOKEN_FILE) if config.HUBSPOT_TOKEN_STORE == "file" else None
+    return TokenManager(generate_tokens, store)
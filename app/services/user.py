@@ -1,5 +1,10 @@
 from app.models import User
 from app.extensions import db
+from app.config import config
+from app.services.cache import MemoryCache
+
+# User id -> HubSpot contact id, per process. Users whose contact isn't created yet aren't cached.
+contact_ids = MemoryCache(config.USER_CACHE_TTL, config.USER_CACHE_MAX_ENTRIES)
 
 class UserService:
     @staticmethod
@@ -10,6 +15,20 @@ class UserService:
     def get_user_by_id(user_id):
         user = User.query.get(user_id)
         return user
+
+    @staticmethod
+    def get_contact_id(user_id):
+        """Returns the user's HubSpot contact id, or an error when the user doesn't exist."""
+        contact_id = contact_ids.get("users", str(user_id))
+        if contact_id is not None:
+            return {"data": contact_id}
+
+        user = UserService.get_user_by_id(user_id)
+        if not user:
+            return {"error": "User not found"}
+        if user.contact_id:
+            contact_ids.set("users", str(user_id), user.contact_id)
+        return {"data": user.contact_id}
     
     @staticmethod
     def delete_user_by_email(email):
@@ -17,6 +36,7 @@ class UserService:
         if not user:
             return {"error": "User not found"}
         
+        contact_ids.delete("users", str(user.id))
         db.session.delete(user)
         db.session.commit()
         return {"message": "User deleted successfully"}
@@ -27,6 +47,7 @@ class UserService:
         if not user:
             return {"error": "User not found"}
 
+        contact_ids.delete("users", str(user.id))
         db.session.delete(user)
         db.session.commit()
         return {"message": "User deleted successfully"}
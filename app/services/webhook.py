@@ -0,0 +1,163 @@
+import base64
+import hashlib
+import hmac
+import queue
+import time
+from collections import defaultdict
+from threading import Event, Lock, Thread
+from urllib.parse import unquote
+from app.extensions import db
+from app.config import config
+from app.logger import Logger
+from app.services.hubspot import hubspot_service
+from app.services.lookup import LookupService
+from app.services.mirror import MirrorService
+
+class WebhookService:
+    OBJECT_TYPES = { "contact": "contacts", "deal": "deals", "ticket": "tickets" }
+
+    @staticmethod
+    def verify_signature(method: str, url: str, body: bytes, timestamp: str, signature: str):
+        """Checks HubSpot's v3 request signature and rejects requests older than `HUBSPOT_WEBHOOK_MAX_AGE` seconds."""
+        if not signature or not timestamp or not config.HUBSPOT_CLIENT_SECRET:
+            return False
+        try:
+            if abs(time.time() * 1000 - int(timestamp)) > config.HUBSPOT_WEBHOOK_MAX_AGE * 1000:
+                return False
+        except ValueError:
+            return False
+        source = f"{method}{unquote(url)}{body.decode('utf-8', errors='replace')}{timestamp}"
+        digest = hmac.new(config.HUBSPOT_CLIENT_SECRET.encode("utf-8"), source.encode("utf-8"), hashlib.sha256).digest()
+        return hmac.compare_digest(base64.b64encode(digest).decode("utf-8"), signature)
+
+    # The field holding the object's id, by change, for the changes that don't send `objectId`
+    ID_PROPERTIES = { "associationChange": "fromObjectId", "merge": "primaryObjectId" }
+
+    @staticmethod
+    def is_event(event):
+        """True for a dict with a `subscriptionType` string, the id of the object it changed and a numeric `occurredAt` if any."""
+        if not isinstance(event, dict) or not isinstance(event.get("subscriptionType"), str):
+            return False
+        change = event["subscriptionType"].partition(".")[2]
+        return (
+            event.get(WebhookService.ID_PROPERTIES.get(change, "objectId")) is not None
+            and isinstance(event.get("occurredAt", 0), (int, float))
+        )
+
+    @staticmethod
+    def collapse(events: list):
+        """
+        Reduces events to the latest state of every object they touch, returns a map of
+        object type to `{ id: "created" | "changed" | "deleted" }`. Both sides of an
+        association change count as changed. Malformed events are skipped.
+        """
+        changes = defaultdict(dict)
+        events = [event for event in events if WebhookService.is_event(event)]
+        for event in sorted(events, key=lambda event: event.get("occurredAt") or 0):
+            object_name, _, change = (event.get("subscriptionType") or "").partition(".")
+            object_type = WebhookService.OBJECT_TYPES.get(object_name)
+            if object_type is None:
+                continue
+            if change == "associationChange":
+                to_type = WebhookService.OBJECT_TYPES.get((event.get("associationType") or "").split("_TO_")[-1].lower())
+                changes[object_type].setdefault(str(event.get("fromObjectId")), "changed")
+                if to_type:
+                    changes[to_type].setdefault(str(event.get("toObjectId")), "changed")
+            elif change == "merge":
+                for merged_id in event.get("mergedObjectIds") or []:
+                    changes[object_type][str(merged_id)] = "deleted"
+                changes[object_type][str(event.get("primaryObjectId"))] = "changed"
+            elif change == "deletion":
+                changes[object_type][str(event.get("objectId"))] = "deleted"
+            elif change == "creation":
+                changes[object_type][str(event.get("objectId"))] = "created"
+            elif event.get("objectId") is not None:
+                id = str(event.get("objectId"))
+                # A change after a deletion means the object was restored
+                if changes[object_type].get(id) != "created":
+                    changes[object_type][id] = "changed"
+        return changes
+
+class WebhookProcessor:
+    """
+    Applies queued HubSpot webhook events in the background. Events that arrive within
+    `HUBSPOT_WEBHOOK_BATCH_WINDOW` seconds of each other are applied together, so many
+    events for the same object cost one cache invalidation and, when the mirror serves
+    reads, one batch read per object type.
+    """
+
+    def __init__(self, app, mirror_sync):
+        self.app = app
+        self.mirror_sync = mirror_sync
+        self.logger = Logger("WebhookProcessor")
+        self.queue = queue.Queue(maxsize=config.HUBSPOT_WEBHOOK_QUEUE_SIZE)
+        self._stop = Event()
+        self._thread = None
+        self._lock = Lock()
+
+    def enqueue(self, events: list):
+        """Returns False when the queue is full, HubSpot retries the delivery later."""
+        self.ensure_started()
+        try:
+            self.queue.put_nowait(events)
+            return True
+        except queue.Full:
+            return False
+
+    def ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = Thread(target=self.run, name="hubspot-webhooks", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self):
+        while not self._stop.is_set():
+            events = self._next_batch()
+            if not events:
+                continue
+            try:
+                self.apply(events)
+            except Exception as e:
+                self.logger.error("Error applying webhook events", {"count": len(events), "error": str(e)})
+
+    def apply(self, events: list):
+        changes = WebhookService.collapse(events)
+        with self.app.app_context():
+            try:
+                for object_type, states in changes.items():
+                    deleted = [id for id, state in states.items() if state == "deleted"]
+                    hubspot_service.forget(object_type, list(states), created="created" in states.values())
+                    if object_type in ("contacts", "deals"):
+                        LookupService.delete_object_ids(object_type, deleted)
+                    if config.HUBSPOT_READ_SOURCE == "mirror":
+                        self.mirror_sync.apply_changes(object_type, [id for id in states if id not in deleted])
+                        MirrorService.delete_objects(object_type, deleted)
+                        db.session.commit()
+                self.logger.info("Applied webhook events", {
+                    "events": len(events), "objects": sum(len(states) for states in changes.values()),
+                })
+            except Exception:
+                db.session.rollback()
+                raise
+            finally:
+                db.session.remove()
+
+    def _next_batch(self):
+        try:
+            events = list(self.queue.get(timeout=1))
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + config.HUBSPOT_WEBHOOK_BATCH_WINDOW
+        while len(events) < config.HUBSPOT_WEBHOOK_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                events.extend(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return events
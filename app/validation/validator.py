@@ -1,6 +1,6 @@
 import re
 from enum import Enum
-from marshmallow import Schema, fields, validates, ValidationError, INCLUDE
+from marshmallow import Schema, fields, validate, validates, ValidationError, INCLUDE
 
 class CategoryEnum(Enum):
     general_inquiry = "general_inquiry"
@@ -41,6 +41,10 @@ class TicketSchema(Schema):
     class Meta:
         unknown = INCLUDE
 
+class TicketBatchItemSchema(TicketSchema):
+    """Schema for a ticket sent to the batch endpoint, `deal_id` is the deal it is linked to."""
+    deal_id = fields.Str(required=True)
+
 class DealSchema(Schema):
     """
     Schema for deal validation.
@@ -102,6 +106,33 @@ class LoginSchema(Schema):
     password = fields.Str(required=True)
 
 class SearchUsersSchema(Schema):
-    """Schema for search users validation."""
+    """
+    Schema for search users validation.
+    `fields` is a comma separated list of `<object>.<property>`, object being one of contact, deal or ticket,
+    e.g. `contact.email,deal.dealname,deal.amount`. Object types it doesn't mention get HubSpot's default properties.
+    """
+    PROJECTION_OBJECTS = { "contact": "contacts", "deal": "deals", "ticket": "tickets" }
+
     cursor = fields.Str()
     limit = fields.Int(missing=10)
+    stream = fields.Str(validate=validate.OneOf(["ndjson"]))
+    properties = fields.Str(data_key="fields")
+
+    @validates("properties")
+    def validate_properties(self, value):
+        for item in value.split(","):
+            object_name, _, property_name = item.strip().partition(".")
+            if object_name not in self.PROJECTION_OBJECTS or not re.match(r"^[a-z0-9_]+$", property_name):
+                raise ValidationError("Fields must be a comma separated list of contact.<property>, deal.<property> or ticket.<property>.")
+
+    def get_properties(self, data):
+        """Returns the requested properties by object type, or None when `fields` wasn't passed."""
+        if not data.get("properties"):
+            return None
+        properties = {}
+        for item in data["properties"].split(","):
+            object_name, _, property_name = item.strip().partition(".")
+            object_properties = properties.setdefault(self.PROJECTION_OBJECTS[object_name], [])
+            if property_name not in object_properties:
+                object_properties.append(property_name)
+        return properties
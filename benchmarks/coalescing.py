@@ -0,0 +1,73 @@
+"""
+Measures what sharing identical concurrent page reads saves: `--clients` threads ask for the same
+contacts page at once, `--rounds` times, against benchmarks/fake_hubspot.py, first with every read
+running its own fetch and then sharing the reads in flight. There is no grace window, so every
+round fetches once, and the object cache is off so each fetch goes to the fake. Reports latency
+and the HubSpot calls made per round.
+
+    python benchmarks/coalescing.py --clients 32 --rounds 20 --latency 80
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+from fake_hubspot import add_arguments, create_server, from_arguments
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--page-size", type=int, default=10)
+    parser.add_argument("--fake-port", type=int, default=5098)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    fake = from_arguments(args)
+    server = create_server(args.fake_port, fake)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ.update({
+        "HUBSPOT_API_BASE_URL": f"http://127.0.0.1:{args.fake_port}", "HUBSPOT_CLIENT_ID": "benchmark",
+        "HUBSPOT_CLIENT_SECRET": "benchmark", "HUBSPOT_REFRESH_TOKEN": "benchmark", "HUBSPOT_TOKEN_STORE": "memory",
+        "HUBSPOT_RATE_LIMIT_STORE": "none", "HUBSPOT_CACHE_BACKEND": "none", "HUBSPOT_WARM_UP": "false",
+        "HUBSPOT_COALESCE_READS": "true", "METRICS_ENABLED": "false",
+    })
+    from app.services.hubspot import hubspot_service
+    from app.services.single_flight import SingleFlight
+    hubspot_service.get_contacts(1)
+
+    print(f"{args.clients} clients per round, {args.rounds} rounds, HubSpot latency {args.latency:.0f}+{args.jitter:.0f} ms")
+    for name, page_flights in (("separate", None), ("coalesced", SingleFlight(0))):
+        hubspot_service.page_flights = page_flights
+        fake.reset_stats()
+        latencies, failed = [], 0
+        for _ in range(args.rounds):
+            barrier = threading.Barrier(args.clients)
+            results = []
+
+            def client():
+                barrier.wait()
+                started_at = time.perf_counter()
+                page = hubspot_service.get_contacts(args.page_size)
+                results.append((time.perf_counter() - started_at, "error" in page))
+
+            threads = [threading.Thread(target=client) for _ in range(args.clients)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            latencies.extend(latency * 1000 for latency, error in results if not error)
+            failed += sum(error for _, error in results)
+        latencies.sort()
+        print(
+            f"{name:<10} p50 {statistics.median(latencies):7.1f} ms   p99 {latencies[int(len(latencies) * 0.99) - 1]:7.1f} ms"
+            f"   HubSpot calls/round {fake.get_stats()['total'] / args.rounds:6.1f}   failed {failed}"
+        )
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,531 @@
+"""
+A local stand-in for the HubSpot API, so the API can be run and measured without a HubSpot account.
+
+It keeps contacts, deals and tickets in memory and answers the calls HubspotService makes: the
+OAuth token endpoint, object pages, reads, creates and updates, search, batch read, create, update
+and upsert, and the v4 association endpoints. Responses are shaped like HubSpot's, so the SDK
+parses them as usual. The store starts with an association graph of `--contacts` contacts with
+`--deals-per-contact` deals each and `--tickets-per-deal` tickets per deal.
+
+`--latency` (plus up to `--jitter`) milliseconds are added to every call. `--rate-429` rejects that
+fraction of calls with 429, and `--rate-limit` rejects calls beyond that many per second, both
+with a `Retry-After` of `--retry-after` seconds. `GET /__stats` returns the calls served per
+endpoint, `POST /__stats` returns them and sets them back to zero.
+
+    python benchmarks/fake_hubspot.py --port 5098 --contacts 200 --latency 80 --rate-429 0.01
+
+Point the API at it with HUBSPOT_API_BASE_URL=http://127.0.0.1:5098 and any HUBSPOT_CLIENT_ID,
+HUBSPOT_CLIENT_SECRET and HUBSPOT_REFRESH_TOKEN.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+OBJECT_TYPES = ("contacts", "deals", "tickets")
+
+# HubSpot-defined association type id and name of each direction
+ASSOCIATION_TYPES = {
+    ("contacts", "deals"): (4, "contact_to_deal"),
+    ("deals", "contacts"): (3, "deal_to_contact"),
+    ("contacts", "tickets"): (15, "contact_to_ticket"),
+    ("tickets", "contacts"): (16, "ticket_to_contact"),
+    ("deals", "tickets"): (27, "deal_to_ticket"),
+    ("tickets", "deals"): (28, "ticket_to_deal"),
+}
+
+DEFAULT_PROPERTIES = {
+    "contacts": ["firstname", "lastname", "email", "createdate", "lastmodifieddate", "hs_object_id"],
+    "deals": ["dealname", "amount", "dealstage", "pipeline", "closedate", "createdate", "hs_lastmodifieddate", "hs_object_id"],
+    "tickets": ["subject", "content", "hs_pipeline", "hs_pipeline_stage", "hs_ticket_priority", "createdate", "hs_lastmodifieddate", "hs_object_id"],
+}
+
+MODIFIED_PROPERTIES = { "contacts": "lastmodifieddate", "deals": "hs_lastmodifieddate", "tickets": "hs_lastmodifieddate" }
+
+class NotFound(Exception):
+    pass
+
+def timestamp(ms: int):
+    return datetime.fromtimestamp(ms / 1000, timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+class Store:
+    """Objects keyed by type and id, and associations in both directions. Ids are shared by every type, like numeric HubSpot ids."""
+
+    def __init__(self):
+        self.objects = { object_type: {} for object_type in OBJECT_TYPES }
+        # (type, id) -> to type -> associated ids, in the order they were associated
+        self.associations = {}
+        self._next_id = 1000
+        self._lock = threading.Lock()
+
+    def create(self, object_type: str, properties: dict, associations: list = ()):
+        now = int(time.time() * 1000)
+        with self._lock:
+            self._next_id += 1
+            id = str(self._next_id)
+            self.objects[object_type][id] = {
+                "id": id, "created_at": now, "updated_at": now,
+                "properties": {
+                    **{ name: None if value is None else str(value) for name, value in properties.items() },
+                    "hs_object_id": id, "createdate": str(now), MODIFIED_PROPERTIES[object_type]: str(now),
+                },
+            }
+        for association in associations:
+            to_type = self._type_of(association["to"]["id"])
+            if to_type:
+                self.associate(object_type, id, to_type, association["to"]["id"])
+        return self.objects[object_type][id]
+
+    def update(self, object_type: str, id: str, properties: dict):
+        now = int(time.time() * 1000)
+        with self._lock:
+            stored = self.objects[object_type].get(id)
+            if stored is None:
+                raise NotFound(f"resource not found: {object_type} {id}")
+            stored["properties"].update({ name: None if value is None else str(value) for name, value in properties.items() })
+            stored["properties"][MODIFIED_PROPERTIES[object_type]] = str(now)
+            stored["updated_at"] = now
+            return stored
+
+    def upsert(self, object_type: str, id_property: str, id: str, properties: dict):
+        """Returns the object and whether it was created."""
+        found = self.find(object_type, id_property, id)
+        if found is None:
+            return self.create(object_type, { **properties, id_property: id }), True
+        return self.update(object_type, found["id"], properties), False
+
+    def find(self, object_type: str, property_name: str, value: str):
+        for stored in list(self.objects[object_type].values()):
+            if (stored["properties"].get(property_name) or "").lower() == str(value).lower():
+                return stored
+        return None
+
+    def associate(self, from_type: str, from_id: str, to_type: str, to_id: str):
+        with self._lock:
+            to_ids = self.associations.setdefault((from_type, from_id), {}).setdefault(to_type, [])
+            if to_id not in to_ids:
+                to_ids.append(to_id)
+            from_ids = self.associations.setdefault((to_type, to_id), {}).setdefault(from_type, [])
+            if from_id not in from_ids:
+                from_ids.append(from_id)
+
+    def associated(self, object_type: str, id: str, to_type: str):
+        return list(self.associations.get((object_type, id), {}).get(to_type, []))
+
+    def _type_of(self, id: str):
+        for object_type in OBJECT_TYPES:
+            if id in self.objects[object_type]:
+                return object_type
+        return None
+
+def seed(store: Store, contacts: int, deals_per_contact: int, tickets_per_deal: int):
+    for contact_number in range(contacts):
+        contact = store.create("contacts", {
+            "email": f"contact{contact_number}@example.com", "firstname": "Seeded", "lastname": f"Contact{contact_number}",
+        })
+        for deal_number in range(deals_per_contact):
+            deal = store.create("deals", {
+                "dealname": f"Deal {contact_number}-{deal_number}", "amount": 1000 + deal_number,
+                "dealstage": "appointmentscheduled", "pipeline": "default",
+            })
+            store.associate("contacts", contact["id"], "deals", deal["id"])
+            for ticket_number in range(tickets_per_deal):
+                ticket = store.create("tickets", {
+                    "subject": f"Ticket {contact_number}-{deal_number}-{ticket_number}", "content": "Seeded ticket",
+                    "hs_pipeline": "0", "hs_pipeline_stage": "1", "hs_ticket_priority": "MEDIUM",
+                })
+                store.associate("deals", deal["id"], "tickets", ticket["id"])
+                store.associate("contacts", contact["id"], "tickets", ticket["id"])
+
+class FakeHubspot:
+    """The store plus the simulated network: latency, rate limits and call counts."""
+
+    def __init__(self, store: Store, latency: float = 0, jitter: float = 0, rate_429: float = 0, rate_limit: float = 0, retry_after: int = 1):
+        self.store = store
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_429 = rate_429
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.calls = Counter()
+        # endpoint -> statuses its next calls fail with, in order
+        self.failures = {}
+        # HubSpot doesn't promise batch results in input order, set to return them reversed
+        self.reverse_batches = False
+        self._window = (0, 0)
+        self._lock = threading.Lock()
+
+    def fail(self, endpoint: str, status: int = 500, times: int = 1):
+        """Makes the next `times` calls of `endpoint` fail with `status`."""
+        with self._lock:
+            self.failures.setdefault(endpoint, []).extend([status] * times)
+
+    def take_failure(self, endpoint: str):
+        """The status this call of `endpoint` fails with, or None."""
+        with self._lock:
+            statuses = self.failures.get(endpoint)
+            return statuses.pop(0) if statuses else None
+
+    def admit(self, endpoint: str):
+        """Counts the call, waits the simulated latency and returns False when the call is rate limited."""
+        with self._lock:
+            self.calls[endpoint] += 1
+            second = int(time.monotonic())
+            window_second, window_calls = self._window
+            window_calls = window_calls + 1 if window_second == second else 1
+            self._window = (second, window_calls)
+        delay = (self.latency + random.uniform(0, self.jitter)) / 1000
+        if delay:
+            time.sleep(delay)
+        if self.rate_limit and window_calls > self.rate_limit:
+            self.calls["429"] += 1
+            return False
+        if self.rate_429 and random.random() < self.rate_429:
+            self.calls["429"] += 1
+            return False
+        return True
+
+    def get_stats(self):
+        with self._lock:
+            calls = dict(self.calls)
+        return { "calls": calls, "total": sum(count for endpoint, count in calls.items() if endpoint != "429") }
+
+    def reset_stats(self):
+        with self._lock:
+            self.calls.clear()
+
+    # Object API
+
+    def object_json(self, object_type: str, stored: dict, properties: list = None, associations: list = None, **extra):
+        names = properties or DEFAULT_PROPERTIES[object_type]
+        data = {
+            "id": stored["id"],
+            "properties": { name: stored["properties"].get(name) for name in names if name in stored["properties"] },
+            "createdAt": timestamp(stored["created_at"]),
+            "updatedAt": timestamp(stored["updated_at"]),
+            "archived": False,
+            **extra,
+        }
+        if associations:
+            data["associations"] = {}
+            for to_type in associations:
+                to_ids = self.store.associated(object_type, stored["id"], to_type)
+                if to_ids:
+                    type_name = ASSOCIATION_TYPES[(object_type, to_type)][1]
+                    data["associations"][to_type] = { "results": [{ "id": to_id, "type": type_name } for to_id in to_ids] }
+        return data
+
+    def batch_json(self, results: list):
+        now = timestamp(int(time.time() * 1000))
+        if self.reverse_batches:
+            results = results[::-1]
+        return { "status": "COMPLETE", "results": results, "startedAt": now, "completedAt": now }
+
+    def get_page(self, object_type: str, query: dict):
+        limit = int(query.get("limit", ["10"])[0])
+        after = query.get("after", [None])[0]
+        ids = sorted(self.store.objects[object_type], key=int)
+        if after:
+            ids = [id for id in ids if int(id) >= int(after)]
+        page, rest = ids[:limit], ids[limit:]
+        properties = self._list_parameter(query.get("properties"))
+        associations = self._list_parameter(query.get("associations"))
+        data = { "results": [self.object_json(object_type, self.store.objects[object_type][id], properties, associations) for id in page] }
+        if rest:
+            data["paging"] = { "next": { "after": rest[0], "link": "" } }
+        return data
+
+    def get_object(self, object_type: str, id: str, query: dict):
+        stored = self.store.objects[object_type].get(id)
+        if stored is None:
+            raise NotFound(f"resource not found: {object_type} {id}")
+        return self.object_json(object_type, stored, self._list_parameter(query.get("properties")), self._list_parameter(query.get("associations")))
+
+    def create(self, object_type: str, body: dict):
+        stored = self.store.create(object_type, body.get("properties") or {}, body.get("associations") or [])
+        return self.object_json(object_type, stored, list(stored["properties"]))
+
+    def update(self, object_type: str, id: str, body: dict):
+        stored = self.store.update(object_type, id, body.get("properties") or {})
+        return self.object_json(object_type, stored, list(stored["properties"]))
+
+    def search(self, object_type: str, body: dict):
+        matches = [
+            stored for stored in self.store.objects[object_type].values()
+            if not body.get("filterGroups") or any(self._matches(stored, group.get("filters") or []) for group in body["filterGroups"])
+        ]
+        for sort in reversed(body.get("sorts") or []):
+            matches.sort(
+                key=lambda stored: self._sort_key(stored["properties"].get(sort["propertyName"])),
+                reverse=sort.get("direction") == "DESCENDING",
+            )
+        offset = int(body.get("after") or 0)
+        limit = int(body.get("limit") or 10)
+        page = matches[offset:offset + limit]
+        data = {
+            "total": len(matches),
+            "results": [self.object_json(object_type, stored, body.get("properties")) for stored in page],
+        }
+        if offset + limit < len(matches):
+            data["paging"] = { "next": { "after": str(offset + limit), "link": "" } }
+        return data
+
+    def batch_read(self, object_type: str, body: dict):
+        id_property = body.get("idProperty")
+        results = []
+        for input in body.get("inputs") or []:
+            if id_property:
+                stored = self.store.find(object_type, id_property, input["id"])
+            else:
+                stored = self.store.objects[object_type].get(str(input["id"]))
+            if stored is not None:
+                results.append(self.object_json(object_type, stored, body.get("properties")))
+        return self.batch_json(results)
+
+    def batch_create(self, object_type: str, body: dict):
+        return self.batch_json([self.create(object_type, input) for input in body.get("inputs") or []])
+
+    def batch_update(self, object_type: str, body: dict):
+        results = []
+        for input in body.get("inputs") or []:
+            try:
+                results.append(self.update(object_type, str(input["id"]), input))
+            except NotFound:
+                continue
+        return self.batch_json(results)
+
+    def batch_upsert(self, object_type: str, body: dict):
+        results = []
+        for input in body.get("inputs") or []:
+            stored, created = self.store.upsert(object_type, input["idProperty"], input["id"], input.get("properties") or {})
+            results.append(self.object_json(object_type, stored, list(stored["properties"]), new=created))
+        return self.batch_json(results)
+
+    # Associations API
+
+    def read_associations(self, from_type: str, to_type: str, body: dict):
+        type_id = ASSOCIATION_TYPES[(from_type, to_type)][0]
+        results = []
+        for input in body.get("inputs") or []:
+            to_ids = self.store.associated(from_type, str(input["id"]), to_type)
+            if to_ids:
+                results.append({
+                    "from": { "id": str(input["id"]) },
+                    "to": [
+                        { "toObjectId": int(to_id), "associationTypes": [{ "category": "HUBSPOT_DEFINED", "typeId": type_id, "label": None }] }
+                        for to_id in to_ids
+                    ],
+                })
+        return self.batch_json(results)
+
+    def associate_default(self, from_type: str, to_type: str, pairs: list):
+        type_id = ASSOCIATION_TYPES[(from_type, to_type)][0]
+        results = []
+        for from_id, to_id in pairs:
+            if from_id not in self.store.objects[from_type] or to_id not in self.store.objects[to_type]:
+                continue
+            self.store.associate(from_type, from_id, to_type, to_id)
+            results.append({
+                "from": { "id": from_id }, "to": { "id": to_id },
+                "associationSpec": { "associationCategory": "HUBSPOT_DEFINED", "associationTypeId": type_id },
+            })
+        return self.batch_json(results)
+
+    # OAuth API
+
+    def create_token(self, form: dict):
+        if not form.get("refresh_token"):
+            return 400, { "status": "BAD_REFRESH_TOKEN", "message": "missing or invalid refresh token" }
+        return 200, {
+            "access_token": f"fake-access-token-{time.time_ns()}", "refresh_token": form["refresh_token"][0],
+            "expires_in": 1800, "token_type": "bearer",
+        }
+
+    def _matches(self, stored: dict, filters: list):
+        for filter in filters:
+            value = stored["properties"].get(filter["propertyName"])
+            operator = filter.get("operator", "EQ")
+            if operator == "HAS_PROPERTY":
+                matched = value is not None
+            elif operator == "NOT_HAS_PROPERTY":
+                matched = value is None
+            elif operator in ("IN", "NOT_IN"):
+                values = { str(candidate).lower() for candidate in filter.get("values") or [] }
+                matched = (value or "").lower() in values
+                matched = matched if operator == "IN" else not matched
+            elif operator in ("GT", "GTE", "LT", "LTE"):
+                if value is None:
+                    return False
+                left, right = self._sort_key(value), self._sort_key(filter.get("value"))
+                matched = { "GT": left > right, "GTE": left >= right, "LT": left < right, "LTE": left <= right }[operator]
+            else:
+                matched = (value or "").lower() == str(filter.get("value")).lower()
+                matched = matched if operator == "EQ" else not matched
+            if not matched:
+                return False
+        return True
+
+    @staticmethod
+    def _sort_key(value):
+        try:
+            return (0, float(value), "")
+        except (TypeError, ValueError):
+            return (1, 0, str(value or ""))
+
+    @staticmethod
+    def _list_parameter(values):
+        # The SDK repeats list parameters, other clients join them with commas
+        if not values:
+            return None
+        return [name for value in values for name in value.split(",") if name]
+
+OBJECTS = "|".join(OBJECT_TYPES)
+
+def routes(fake: FakeHubspot):
+    """(method, path pattern, endpoint name, handler(match, query, body)) for every call the fake answers."""
+    return [
+        ("POST", r"/oauth/v1/token", "oauth.token", lambda match, query, body: fake.create_token(body)),
+        ("GET", rf"/crm/v3/objects/({OBJECTS})", "objects.get_page", lambda match, query, body: fake.get_page(match[1], query)),
+        ("POST", rf"/crm/v3/objects/({OBJECTS})", "objects.create", lambda match, query, body: (201, fake.create(match[1], body))),
+        ("POST", rf"/crm/v3/objects/({OBJECTS})/search", "objects.search", lambda match, query, body: fake.search(match[1], body)),
+        ("POST", rf"/crm/v3/objects/({OBJECTS})/batch/read", "objects.batch_read", lambda match, query, body: fake.batch_read(match[1], body)),
+        ("POST", rf"/crm/v3/objects/({OBJECTS})/batch/create", "objects.batch_create", lambda match, query, body: (201, fake.batch_create(match[1], body))),
+        ("POST", rf"/crm/v3/objects/({OBJECTS})/batch/update", "objects.batch_update", lambda match, query, body: fake.batch_update(match[1], body)),
+        ("POST", rf"/crm/v3/objects/({OBJECTS})/batch/upsert", "objects.batch_upsert", lambda match, query, body: fake.batch_upsert(match[1], body)),
+        ("GET", rf"/crm/v3/objects/({OBJECTS})/(\d+)", "objects.get", lambda match, query, body: fake.get_object(match[1], match[2], query)),
+        ("PATCH", rf"/crm/v3/objects/({OBJECTS})/(\d+)", "objects.update", lambda match, query, body: fake.update(match[1], match[2], body)),
+        (
+            "POST", rf"/crm/v4/associations/({OBJECTS})/({OBJECTS})/batch/read", "associations.batch_read",
+            lambda match, query, body: fake.read_associations(match[1], match[2], body),
+        ),
+        (
+            "POST", rf"/crm/v4/associations/({OBJECTS})/({OBJECTS})/batch/associate/default", "associations.batch_associate",
+            lambda match, query, body: fake.associate_default(match[1], match[2], [
+                (str(input["from"]["id"]), str(input["to"]["id"])) for input in body.get("inputs") or []
+            ]),
+        ),
+        (
+            "PUT", rf"/crm/v4/objects/({OBJECTS})/(\d+)/associations/default/({OBJECTS})/(\d+)", "associations.associate",
+            lambda match, query, body: fake.associate_default(match[1], match[3], [(match[2], match[4])]),
+        ),
+    ]
+
+def create_handler(fake: FakeHubspot):
+    table = [(method, re.compile(pattern + "$"), endpoint, handle) for method, pattern, endpoint, handle in routes(fake)]
+
+    class Handler(BaseHTTPRequestHandler):
+        # Keep-alive, so the API's pooled connections are reused like they are against HubSpot
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            self._dispatch("GET")
+
+        def do_POST(self):
+            self._dispatch("POST")
+
+        def do_PATCH(self):
+            self._dispatch("PATCH")
+
+        def do_PUT(self):
+            self._dispatch("PUT")
+
+        def log_message(self, format, *args):
+            pass
+
+        def _dispatch(self, method: str):
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+            length = int(self.headers.get("Content-Length") or 0)
+            raw_body = self.rfile.read(length) if length else b""
+
+            if url.path == "/__stats":
+                stats = fake.get_stats()
+                if method == "POST":
+                    fake.reset_stats()
+                return self._send(200, stats)
+
+            for route_method, pattern, endpoint, handle in table:
+                match = pattern.match(url.path)
+                if match is None or route_method != method:
+                    continue
+                if not fake.admit(endpoint):
+                    return self._send(429, {
+                        "status": "error", "message": "You have reached your secondly limit.",
+                        "errorType": "RATE_LIMIT", "category": "RATE_LIMITS",
+                    }, { "Retry-After": str(fake.retry_after) })
+                failure = fake.take_failure(endpoint)
+                if failure:
+                    return self._send(
+                        failure, { "status": "error", "message": "Injected failure", "category": "INJECTED" },
+                        { "Retry-After": str(fake.retry_after) } if failure == 429 else None,
+                    )
+                try:
+                    if "x-www-form-urlencoded" in (self.headers.get("Content-Type") or ""):
+                        body = parse_qs(raw_body.decode("utf-8"))
+                    else:
+                        body = json.loads(raw_body or b"{}")
+                    result = handle(match, query, body)
+                except NotFound as e:
+                    return self._send(404, { "status": "error", "message": str(e), "category": "OBJECT_NOT_FOUND" })
+                except (KeyError, TypeError, ValueError) as e:
+                    return self._send(400, { "status": "error", "message": f"Invalid input: {e}", "category": "VALIDATION_ERROR" })
+                status, data = result if isinstance(result, tuple) else (200, result)
+                return self._send(status, data)
+            self._send(404, { "status": "error", "message": f"No fake for {method} {url.path}", "category": "OBJECT_NOT_FOUND" })
+
+        def _send(self, status: int, data: dict, headers: dict = None):
+            payload = json.dumps(data).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json;charset=utf-8")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+    return Handler
+
+def create_server(port: int, fake: FakeHubspot):
+    server = ThreadingHTTPServer(("127.0.0.1", port), create_handler(fake))
+    server.daemon_threads = True
+    return server
+
+def add_arguments(parser):
+    parser.add_argument("--contacts", type=int, default=100)
+    parser.add_argument("--deals-per-contact", type=int, default=2)
+    parser.add_argument("--tickets-per-deal", type=int, default=2)
+    parser.add_argument("--latency", type=float, default=50, help="milliseconds added to every call")
+    parser.add_argument("--jitter", type=float, default=20, help="up to this many more milliseconds, at random")
+    parser.add_argument("--rate-429", type=float, default=0, help="fraction of calls rejected with 429")
+    parser.add_argument("--rate-limit", type=float, default=0, help="calls per second beyond which calls get 429, 0 for none")
+    parser.add_argument("--retry-after", type=int, default=1, help="whole seconds, as HTTP requires")
+
+def from_arguments(args):
+    store = Store()
+    seed(store, args.contacts, args.deals_per_contact, args.tickets_per_deal)
+    return FakeHubspot(store, args.latency, args.jitter, args.rate_429, args.rate_limit, args.retry_after)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=5098)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    fake = from_arguments(args)
+    server = create_server(args.port, fake)
+    print(f"Fake HubSpot on http://127.0.0.1:{args.port} with {args.contacts} contacts")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+Runs the API against benchmarks/fake_hubspot.py and measures its hot paths, one endpoint after
+the other, each with `--requests` requests from `--concurrency` keep-alive clients:
+
+    register     POST /api/register, one new user per request
+    login        POST /api/login, once per registered user
+    deals        POST /api/deals, one new deal per request
+    tickets      POST /api/tickets/<deal_id>, on the deals created before
+    new-crm-objects  GET /api/new-crm-objects, each client walking the pages with the returned cursor
+
+For each it reports throughput, p50 and p99 latency, failed requests and the HubSpot calls the
+fake served per request. The fake's latency, 429s and association graph are set with the
+options of fake_hubspot.py. The API uses a fresh SQLite database unless `--database-url` is
+given, and keeps its own HubSpot rate limits, so raise HUBSPOT_RATE_LIMIT and
+HUBSPOT_SEARCH_RATE_LIMIT in the environment to measure the API rather than the throttle.
+
+    python benchmarks/load_test.py --server gthread --requests 200 --concurrency 16 --latency 80
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from fake_hubspot import add_arguments
+from serving import COMMANDS, ROOT, start_server
+
+SCENARIOS = ["register", "login", "deals", "tickets", "new-crm-objects"]
+
+def start_fake(port: int, args):
+    command = [
+        sys.executable, os.path.join(ROOT, "benchmarks", "fake_hubspot.py"), "--port", str(port),
+        "--contacts", str(args.contacts), "--deals-per-contact", str(args.deals_per_contact),
+        "--tickets-per-deal", str(args.tickets_per_deal), "--latency", str(args.latency), "--jitter", str(args.jitter),
+        "--rate-429", str(args.rate_429), "--rate-limit", str(args.rate_limit), "--retry-after", str(args.retry_after),
+    ]
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"Fake HubSpot didn't start on port {port}")
+
+def fake_calls(port: int, reset: bool = False):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    try:
+        connection.request("POST" if reset else "GET", "/__stats")
+        return json.loads(connection.getresponse().read())["total"]
+    finally:
+        connection.close()
+
+def send(connection, method: str, path: str, body=None, token: str = None):
+    headers = {}
+    if body is not None:
+        headers["Content-Type"] = "application/json"
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    connection.request(method, path, body=None if body is None else json.dumps(body), headers=headers)
+    response = connection.getresponse()
+    payload = response.read()
+    if response.getheader("Connection", "").lower() == "close":
+        connection.close()
+    try:
+        return response.status, json.loads(payload) if payload else None
+    except ValueError:
+        return response.status, None
+
+def run(port: int, count: int, concurrency: int, request):
+    """
+    Calls `request(connection, index, state)` for every index from `count` clients at a time, each
+    client with its own connection and state. Returns `(latency, status, body)` per index, in order,
+    and the wall time it took.
+    """
+    local = threading.local()
+
+    def one(index):
+        if not hasattr(local, "connection"):
+            local.connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+            local.state = {}
+        started_at = time.perf_counter()
+        try:
+            status, body = request(local.connection, index, local.state)
+        except (OSError, http.client.HTTPException):
+            local.connection.close()
+            return time.perf_counter() - started_at, None, None
+        return time.perf_counter() - started_at, status, body
+
+    started_at = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(one, range(count)))
+    return results, time.perf_counter() - started_at
+
+def report(name: str, results: list, elapsed: float, expected_status: int, hubspot_calls: int):
+    latencies = sorted(latency * 1000 for latency, status, _ in results if status == expected_status)
+    errors = len(results) - len(latencies)
+    if not latencies:
+        print(f"{name:<16} every request failed ({errors})")
+        return
+    print(
+        f"{name:<16} {len(latencies) / elapsed:8.1f} req/s   p50 {statistics.median(latencies):7.1f} ms"
+        f"   p99 {latencies[max(int(len(latencies) * 0.99) - 1, 0)]:7.1f} ms   errors {errors:<4}"
+        f"   HubSpot calls/request {hubspot_calls / len(results):5.2f}"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--server", choices=list(COMMANDS), default="gthread")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--page-size", type=int, default=10)
+    parser.add_argument("--database-url", help="defaults to a new SQLite database")
+    parser.add_argument("--port", type=int, default=5099)
+    parser.add_argument("--fake-port", type=int, default=5098)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="hubspot-crm-load-test-")
+    env = {
+        **os.environ,
+        "HUBSPOT_API_BASE_URL": f"http://127.0.0.1:{args.fake_port}",
+        "HUBSPOT_CLIENT_ID": "load-test", "HUBSPOT_CLIENT_SECRET": "load-test", "HUBSPOT_REFRESH_TOKEN": "load-test",
+        # Nothing may be read from, or written over, the files of a real HubSpot account
+        "HUBSPOT_TOKEN_FILE": os.path.join(directory, "hubspot-token.json"),
+        "HUBSPOT_RATE_LIMIT_FILE": os.path.join(directory, "hubspot-rate-limit.json"),
+        "METRICS_DIR": os.path.join(directory, "metrics"),
+        "DATABASE_URL": args.database_url or f"sqlite:///{os.path.join(directory, 'load-test.db')}",
+    }
+    env.setdefault("JWT_SECRET_KEY", "benchmark-secret-key-of-sufficient-length")
+    env.setdefault("SECRET_KEY", "benchmark-secret-key")
+    subprocess.run(
+        [sys.executable, "-m", "flask", "--app", "run", "db", "upgrade"],
+        cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+    fake = start_fake(args.fake_port, args)
+    try:
+        server = start_server(args.server, args.port, env)
+    except Exception:
+        fake.terminate()
+        raise
+    run_id = uuid.uuid4().hex[:8]
+    password = "LoadTest1234"
+    tokens, deals = [], []
+
+    def register(connection, index, state):
+        return send(connection, "POST", "/api/register", {
+            "email": f"load-{run_id}-{index}@example.com", "password": password,
+            "phone": "+15555550100", "firstname": "Load", "lastname": "Tester",
+        })
+
+    def login(connection, index, state):
+        return send(connection, "POST", "/api/login", { "email": f"load-{run_id}-{index}@example.com", "password": password })
+
+    def create_deal(connection, index, state):
+        return send(connection, "POST", "/api/deals", {
+            "dealname": f"Load deal {run_id} {index}", "amount": 1000 + index, "dealstage": "appointmentscheduled",
+        }, tokens[index % len(tokens)])
+
+    def create_ticket(connection, index, state):
+        token, deal_id = deals[index % len(deals)]
+        return send(connection, "POST", f"/api/tickets/{deal_id}", {
+            "subject": f"Load ticket {run_id} {index}", "description": "Load test", "category": "general_inquiry",
+            "pipeline": "0", "hs_pipeline_stage": "1", "hs_ticket_priority": "MEDIUM",
+        }, token)
+
+    def get_contacts(connection, index, state):
+        cursor = state.get("cursor")
+        path = f"/api/new-crm-objects?limit={args.page_size}" + (f"&cursor={cursor}" if cursor else "")
+        status, body = send(connection, "GET", path, token=tokens[index % len(tokens)])
+        page = body["data"].get("data") if status == 200 else None
+        if page is None:
+            # A page that failed is still answered with 200, count it as an error
+            return None, body
+        state["cursor"] = page["next_after"]
+        return status, body
+
+    scenarios = {
+        "register": (register, 201),
+        "login": (login, 200),
+        "deals": (create_deal, 201),
+        "tickets": (create_ticket, 201),
+        "new-crm-objects": (get_contacts, 200),
+    }
+
+    print(
+        f"{args.server}, {args.requests} requests per scenario, {args.concurrency} clients, {os.cpu_count()} CPUs, "
+        f"HubSpot latency {args.latency:.0f}+{args.jitter:.0f} ms, {args.contacts} seeded contacts"
+    )
+    # Logins need registered users, the later scenarios need tokens and tickets need deals
+    needed = set(args.scenarios)
+    if needed & {"deals", "tickets", "new-crm-objects"}:
+        needed.add("login")
+    if "tickets" in needed:
+        needed.add("deals")
+    if "login" in needed:
+        needed.add("register")
+    try:
+        for name in [name for name in SCENARIOS if name in needed]:
+            request, expected_status = scenarios[name]
+            fake_calls(args.fake_port, reset=True)
+            results, elapsed = run(args.port, args.requests, args.concurrency, request)
+            hubspot_calls = fake_calls(args.fake_port)
+            if name == "login":
+                tokens = [body["data"]["access_token"] for _, status, body in results if status == 200]
+            elif name == "deals":
+                deals = [
+                    (tokens[index % len(tokens)], body["data"]["id"])
+                    for index, (_, status, body) in enumerate(results) if status == 201
+                ]
+            if name in args.scenarios:
+                report(name, results, elapsed, expected_status, hubspot_calls)
+            if name in ("login", "deals") and not (tokens if name == "login" else deals):
+                print(f"No {'user could log in' if name == 'login' else 'deal was created'}, stopping")
+                break
+    finally:
+        server.terminate()
+        server.wait()
+        fake.terminate()
+        fake.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Measures what recording metrics adds to a request: serves `--requests` requests through Flask's
+test client in a fresh process with METRICS_ENABLED=false and again with it on, and times a
+single histogram observation. No HubSpot account or database is needed.
+
+    python benchmarks/metrics.py --requests 5000 --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import json, sys, time
+from app import create_app
+from app.services.metrics import metrics
+from flask_jwt_extended import create_access_token
+
+requests = int(sys.argv[1])
+app = create_app()
+client = app.test_client()
+with app.app_context():
+    headers = {"Authorization": "Bearer " + create_access_token(identity="1")}
+# JWT check and validation, fails before HubSpot is called
+start = time.perf_counter()
+for _ in range(requests):
+    client.get("/api/new-crm-objects?limit=invalid", headers=headers)
+per_request = (time.perf_counter() - start) / requests
+
+start = time.perf_counter()
+for _ in range(requests):
+    metrics.observe("http_request_duration_seconds", ("GET", "/api/new-crm-objects", "400"), 0.01)
+per_observe = (time.perf_counter() - start) / requests
+print(json.dumps({"per_request": per_request, "per_observe": per_observe}))
+"""
+
+def run_once(enabled: bool, requests: int, directory: str):
+    env = {
+        **os.environ, "METRICS_ENABLED": "true" if enabled else "false", "METRICS_DIR": directory,
+        "DATABASE_URL": os.getenv("DATABASE_URL", "sqlite://"), "HUBSPOT_WARM_UP": "false",
+        "RATELIMIT_STORAGE_URI": "memory://", "RATELIMIT_IDENTITY_DEFAULT": "1000000 per minute",
+        "JWT_SECRET_KEY": os.getenv("JWT_SECRET_KEY", "benchmark-secret-key-of-sufficient-length"),
+    }
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE, str(requests)], cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        disabled = [run_once(False, args.requests, directory)["per_request"] * 1e6 for _ in range(args.runs)]
+        enabled_runs = [run_once(True, args.requests, directory) for _ in range(args.runs)]
+    enabled = [run["per_request"] * 1e6 for run in enabled_runs]
+    observe = [run["per_observe"] * 1e6 for run in enabled_runs]
+
+    print(f"{args.requests} requests x {args.runs} runs")
+    print(f"metrics off   median {statistics.median(disabled):8.1f} us/request")
+    print(f"metrics on    median {statistics.median(enabled):8.1f} us/request")
+    print(f"overhead             {statistics.median(enabled) - statistics.median(disabled):8.1f} us/request")
+    print(f"observe       median {statistics.median(observe):8.2f} us")
+
+if __name__ == "__main__":
+    main()
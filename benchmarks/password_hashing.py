@@ -0,0 +1,61 @@
+"""
+Measures login password checks per second against the size of the bcrypt pool: `--clients`
+threads each verify a password `--logins` times through a PasswordHasher, the way /api/login
+does. Checks rejected because the pool was full are counted, not retried.
+
+    python benchmarks/password_hashing.py --rounds 12 --workers 1 2 4 8 --clients 16
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app.services.passwords import PasswordHasher, PasswordHasherBusy
+
+def run(hasher: PasswordHasher, password_hash: str, clients: int, logins: int):
+    latencies, rejected = [], []
+
+    def client():
+        for _ in range(logins):
+            start = time.perf_counter()
+            try:
+                hasher.verify("Passw0rd1", password_hash)
+            except PasswordHasherBusy:
+                rejected.append(start)
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        for _ in range(clients):
+            executor.submit(client)
+    return time.perf_counter() - start, latencies, len(rejected)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--pool", choices=["threads", "processes"], default="threads")
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent logins")
+    parser.add_argument("--logins", type=int, default=4, help="Logins per client")
+    parser.add_argument("--max-pending", type=int, help="Defaults to the number of clients, so nothing is rejected")
+    args = parser.parse_args()
+
+    print(f"bcrypt cost {args.rounds}, {args.clients} clients x {args.logins} logins, {args.pool} pool, {os.cpu_count()} CPUs")
+    for workers in args.workers:
+        hasher = PasswordHasher(args.rounds, workers, args.max_pending or args.clients, args.pool)
+        password_hash = hasher.hash("Passw0rd1")
+        elapsed, latencies, rejected = run(hasher, password_hash, args.clients, args.logins)
+        values = [latency * 1000 for latency in latencies]
+        print(
+            f"workers {workers:<3} {len(latencies) / elapsed:7.1f} logins/s   median {statistics.median(values):8.1f} ms"
+            f"   max {max(values):8.1f} ms   rejected {rejected}"
+        )
+
+if __name__ == "__main__":
+    main()
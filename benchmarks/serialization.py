@@ -0,0 +1,122 @@
+"""
+Compares building and encoding a contacts page the way get_contacts used to, copying every
+contact and deal into a new dict, with the record types of app.services.records, encoded
+by the standard library provider and, when orjson is installed, the orjson one.
+
+    python benchmarks/serialization.py --contacts 100 --deals 5 --tickets 3 --runs 50
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from flask import Flask
+from app.json_provider import OrjsonProvider, RecordJSONProvider
+from app.services.hubspot import hubspot_service
+
+def make_page(contacts: int, deals: int, tickets: int):
+    """Formatted objects shaped like the ones get_contacts reads from HubSpot or the cache."""
+    page_contacts, deals_by_id, tickets_by_id, ticket_ids_by_deal = [], {}, {}, {}
+    for contact_number in range(contacts):
+        contact_id = str(contact_number + 1)
+        deal_ids = []
+        for deal_number in range(deals):
+            deal_id = f"{contact_id}{deal_number:03d}"
+            deal_ids.append(deal_id)
+            deals_by_id[deal_id] = {
+                "id": deal_id, "dealname": f"Deal {deal_id}", "amount": "1500.00", "dealstage": "qualifiedtobuy",
+                "pipeline": "default", "createdate": "2024-05-01T10:00:00Z", "hs_lastmodifieddate": "2024-05-02T10:00:00Z",
+                "hs_object_id": deal_id,
+            }
+            ticket_ids_by_deal[deal_id] = []
+            for ticket_number in range(tickets):
+                ticket_id = f"{deal_id}{ticket_number:02d}"
+                ticket_ids_by_deal[deal_id].append(ticket_id)
+                tickets_by_id[ticket_id] = {
+                    "id": ticket_id, "subject": f"Ticket {ticket_id}", "content": "The printer is on fire " * 4,
+                    "hs_pipeline": "0", "hs_pipeline_stage": "1", "hs_ticket_priority": "HIGH",
+                    "createdate": "2024-05-01T10:00:00Z", "hs_lastmodifieddate": "2024-05-02T10:00:00Z",
+                }
+        page_contacts.append({
+            "id": contact_id, "email": f"contact{contact_id}@example.com", "firstname": "Ada", "lastname": "Lovelace",
+            "phone": "+2348000000000", "createdate": "2024-05-01T10:00:00Z", "lastmodifieddate": "2024-05-02T10:00:00Z",
+            "hs_object_id": contact_id, "deal_ids": deal_ids,
+        })
+    return page_contacts, deals_by_id, tickets_by_id, ticket_ids_by_deal
+
+def assemble_dicts(page_contacts, deals, tickets, ticket_ids_by_deal):
+    """get_contacts before the record types."""
+    contacts = []
+    for page_contact in page_contacts:
+        contact = { key: value for key, value in page_contact.items() if key != "deal_ids" }
+        contact["deals"] = []
+        for deal_id in page_contact["deal_ids"]:
+            deal = dict(deals[deal_id])
+            deal["tickets"] = [tickets[ticket_id] for ticket_id in ticket_ids_by_deal.get(deal_id, [])]
+            contact["deals"].append(deal)
+        contacts.append(contact)
+    return contacts
+
+def assemble_records(page_contacts, deals, tickets, ticket_ids_by_deal):
+    return hubspot_service._assemble_contacts(page_contacts, deals, tickets, ticket_ids_by_deal, {})
+
+def measure_memory(assemble, page):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    contacts = assemble(*page)
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del contacts
+    return retained
+
+def measure_encode(assemble, dumps, page, runs: int):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        dumps({ "data": { "contacts": assemble(*page), "next_after": None }, "message": "Contacts retrieved successfully" })
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--contacts", type=int, default=100)
+    parser.add_argument("--deals", type=int, default=5, help="Deals per contact")
+    parser.add_argument("--tickets", type=int, default=3, help="Tickets per deal")
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    page = make_page(args.contacts, args.deals, args.tickets)
+    flask_app = Flask(__name__)
+    stdlib = RecordJSONProvider(flask_app)
+    paths = [
+        ("dicts + json", assemble_dicts, lambda obj: json.dumps(obj, sort_keys=True, separators=(",", ":"))),
+        ("records + json", assemble_records, lambda obj: stdlib.dumps(obj, separators=(",", ":"))),
+    ]
+    try:
+        orjson = OrjsonProvider(flask_app)
+        paths.append(("records + orjson", assemble_records, orjson.dumps))
+    except ImportError:
+        print("orjson is not installed, skipping it")
+
+    # Both shapes must encode to the same JSON
+    expected = json.loads(paths[0][2](assemble_dicts(*page)))
+    for name, assemble, dumps in paths[1:]:
+        assert json.loads(dumps(assemble(*page))) == expected, name
+
+    print(f"{args.contacts} contacts x {args.deals} deals x {args.tickets} tickets, {args.runs} runs")
+    for name, assemble, dumps in paths:
+        memory = measure_memory(assemble, page)
+        values = [sample * 1000 for sample in measure_encode(assemble, dumps, page, args.runs)]
+        print(
+            f"{name:<18} page {memory / 1024:8.1f} KiB   build + encode median {statistics.median(values):7.2f} ms"
+            f"   min {min(values):7.2f} ms   max {max(values):7.2f} ms"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Starts the API with Flask's development server or gunicorn and measures requests per second
+and latency with `--concurrency` keep-alive clients for `--duration` seconds each.
+
+By default every request carries a valid JWT and fails validation, so it exercises routing,
+JWT checks and the rate limiter without needing HubSpot or a database. Pass `--path` to load
+another endpoint, e.g. /api/new-crm-objects?limit=10 against a configured HubSpot account.
+
+    python benchmarks/serving.py --servers dev gthread gevent --concurrency 32 --duration 10
+"""
+import argparse
+import http.client
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+COMMANDS = {
+    "dev": [sys.executable, "run.py"],
+    "gthread": [sys.executable, "-m", "gunicorn", "run:app"],
+    "gevent": [sys.executable, "-m", "gunicorn", "run:app"],
+}
+
+def make_token(secret: str):
+    from flask import Flask
+    from flask_jwt_extended import JWTManager, create_access_token
+
+    token_app = Flask(__name__)
+    token_app.config["JWT_SECRET_KEY"] = secret
+    JWTManager(token_app)
+    with token_app.app_context():
+        return create_access_token(identity="1", additional_claims={"contact_id": "1"})
+
+def start_server(name: str, port: int, env: dict):
+    env = {
+        **env, "PORT": str(port), "GUNICORN_WORKER_CLASS": name, "GUNICORN_ACCESS_LOG": "",
+        "RATELIMIT_STORAGE_URI": f"mmap:///tmp/hubspot-crm-benchmark-{port}",
+        "RATELIMIT_DEFAULT": "1000000 per minute", "RATELIMIT_IDENTITY_DEFAULT": "1000000 per minute",
+    }
+    process = subprocess.Popen(COMMANDS[name], cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"{name} server didn't start on port {port}")
+
+def load(port: int, path: str, headers: dict, concurrency: int, duration: float):
+    deadline = time.monotonic() + duration
+
+    def client():
+        latencies, errors = [], 0
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                connection.request("GET", path, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                if response.status >= 500 or response.status == 429:
+                    errors += 1
+                else:
+                    latencies.append(time.perf_counter() - start)
+                if response.getheader("Connection", "").lower() == "close":
+                    connection.close()
+            except (OSError, http.client.HTTPException):
+                errors += 1
+                connection.close()
+        connection.close()
+        return latencies, errors
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda _: client(), range(concurrency)))
+    latencies = [latency for client_latencies, _ in results for latency in client_latencies]
+    return latencies, sum(errors for _, errors in results)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--servers", nargs="+", choices=list(COMMANDS), default=["dev", "gthread"])
+    parser.add_argument("--path", default="/api/new-crm-objects?limit=invalid")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--port", type=int, default=5099)
+    args = parser.parse_args()
+
+    env = { **os.environ, "HUBSPOT_WARM_UP": os.getenv("HUBSPOT_WARM_UP", "false") }
+    env.setdefault("JWT_SECRET_KEY", "benchmark-secret-key-of-sufficient-length")
+    headers = { "Authorization": f"Bearer {make_token(env['JWT_SECRET_KEY'])}" }
+
+    print(f"GET {args.path}, {args.concurrency} clients, {args.duration:.0f}s per server, {os.cpu_count()} CPUs")
+    for offset, name in enumerate(args.servers):
+        port = args.port + offset
+        process = start_server(name, port, env)
+        try:
+            latencies, errors = load(port, args.path, headers, args.concurrency, args.duration)
+        finally:
+            process.terminate()
+            process.wait()
+        values = sorted(latency * 1000 for latency in latencies)
+        print(
+            f"{name:<8} {len(values) / args.duration:8.1f} req/s   median {statistics.median(values):7.1f} ms"
+            f"   p99 {values[int(len(values) * 0.99) - 1]:7.1f} ms   errors {errors}"
+        )
+
+if __name__ == "__main__":
+    main()
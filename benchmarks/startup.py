@@ -0,0 +1,51 @@
+"""
+Measures how long a fresh process takes to import the app and run create_app(),
+and what importing the HubSpot SDK would add if it happened at startup.
+
+    python benchmarks/startup.py --runs 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.create_app()
+created = time.perf_counter()
+from app.services import hubspot_sdk
+import hubspot.client
+sdk = time.perf_counter()
+print(json.dumps({
+    "import_app": imported - start,
+    "create_app": created - imported,
+    "sdk_import": sdk - created,
+}))
+"""
+
+def run_once():
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=ROOT, capture_output=True, text=True, check=True,
+    ).stdout
+    # The app logs JSON lines too, the timings are the last line
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    samples = [run_once() for _ in range(args.runs)]
+    for name in ("import_app", "create_app", "sdk_import"):
+        values = [sample[name] * 1000 for sample in samples]
+        print(f"{name:<12} median {statistics.median(values):8.1f} ms   min {min(values):8.1f} ms   max {max(values):8.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Gunicorn settings for serving the API, picked up by `gunicorn run:app` from the working directory.
+The app is imported once in the master and forked into the workers; nothing talks to HubSpot or the
+database at import time, each worker warms up its own HubSpot client and connections after the fork.
+"""
+import multiprocessing
+import os
+
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+
+if worker_class == "gevent":
+    # Before anything else is imported, so the locks and sockets the app creates while it is
+    # preloaded are gevent's and don't block a worker's other greenlets
+    from gevent import monkey
+    monkey.patch_all()
+
+cpus = multiprocessing.cpu_count()
+
+bind = f"0.0.0.0:{os.getenv('PORT', 5001)}"
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+
+# Requests mostly wait on HubSpot, so a worker per core is enough and concurrency comes from
+# threads (gthread) or greenlets (gevent) within each worker
+workers = int(os.getenv("GUNICORN_WORKERS", cpus if worker_class in ("gthread", "gevent") else cpus * 2 + 1))
+threads = int(os.getenv("GUNICORN_THREADS", 8))
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", 1000))
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 60))
+# Workers get this long to finish in-flight requests on a reload (HUP) or shutdown (TERM)
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 30))
+# Above the idle timeout of the load balancer in front, so it never reuses a closed connection
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", 75))
+# Recycles workers now and then, spread out so they don't all restart at once
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 10000))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 1000))
+
+# Empty turns the access log off
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-") or None
+
+def pre_fork(server, worker):
+    if worker_class == "gevent":
+        # Lets the threads the preloaded app started, such as the log writer, run once first: gevent
+        # fails on their pending start-up callbacks in the master when it forks before they ran
+        import gevent
+        gevent.sleep(0)
+
+def post_worker_init(worker):
+    from app.config import config
+    from app.extensions import db
+    from app.services.hubspot import hubspot_service
+
+    # Connections opened in the master must not be shared with it, start from an empty pool
+    with worker.wsgi.app_context():
+        db.engine.dispose(close=False)
+    if config.HUBSPOT_WARM_UP:
+        hubspot_service.warm_up()
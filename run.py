@@ -1,6 +1,11 @@
 from app import create_app
+from app.config import config
+from app.services.hubspot import hubspot_service
 
+# Under gunicorn the workers warm up after the fork, see gunicorn.conf.py
 app = create_app()
 
 if __name__ == "__main__":
+    if config.HUBSPOT_WARM_UP:
+        hubspot_service.warm_up()
     app.run(port=app.config.get("PORT"), host="0.0.0.0")
@@ -0,0 +1,94 @@
+"""
+Runs the app against benchmarks/fake_hubspot.py, started in this process on a free port, with a
+fresh SQLite database. The configuration is read from the environment once, when app.config is
+first imported, so it is set here before anything imports the app.
+"""
+import os
+import socket
+import sys
+import tempfile
+import threading
+import uuid
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from fake_hubspot import FakeHubspot, Store, create_server, seed
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+FAKE_PORT = free_port()
+DIRECTORY = tempfile.mkdtemp(prefix="hubspot-crm-tests-")
+PASSWORD = "Testing1234"
+
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{os.path.join(DIRECTORY, 'tests.db')}",
+    "JWT_SECRET_KEY": "tests-secret-key-of-a-sufficient-length",
+    "HUBSPOT_API_BASE_URL": f"http://127.0.0.1:{FAKE_PORT}",
+    "HUBSPOT_CLIENT_ID": "tests", "HUBSPOT_CLIENT_SECRET": "tests", "HUBSPOT_REFRESH_TOKEN": "tests",
+    "HUBSPOT_TOKEN_STORE": "memory", "HUBSPOT_RATE_LIMIT_STORE": "none", "HUBSPOT_WARM_UP": "false",
+    "HUBSPOT_CACHE_BACKEND": "memory", "HUBSPOT_READ_SOURCE": "live", "HUBSPOT_WRITE_MODE": "sync",
+    "HUBSPOT_MIRROR_SYNC_ENABLED": "false", "HUBSPOT_MAX_RETRIES": "0",
+    "RATELIMIT_STORAGE_URI": "memory://", "RATELIMIT_DEFAULT": "10000 per minute",
+    "RATELIMIT_IDENTITY_DEFAULT": "10000 per minute", "RATELIMIT_ROUTES": "{}",
+    "METRICS_ENABLED": "false", "METRICS_DIR": os.path.join(DIRECTORY, "metrics"), "PASSWORD_HASH_ROUNDS": "4",
+})
+
+@pytest.fixture(scope="session")
+def fake_hubspot():
+    store = Store()
+    seed(store, contacts=12, deals_per_contact=2, tickets_per_deal=2)
+    fake = FakeHubspot(store)
+    server = create_server(FAKE_PORT, fake)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield fake
+    server.shutdown()
+
+@pytest.fixture(scope="session")
+def app(fake_hubspot):
+    from flask_migrate import upgrade
+    from app import create_app
+    app = create_app()
+    with app.app_context():
+        upgrade(directory=os.path.join(ROOT, "migrations"))
+    return app
+
+@pytest.fixture(autouse=True)
+def hubspot(fake_hubspot, monkeypatch):
+    """The shared HubspotService with nothing cached or shared from earlier tests, and the fake's call counts at zero."""
+    from app.services.cache import create_cache
+    from app.services.hubspot import hubspot_service
+    monkeypatch.setattr(hubspot_service, "cache", create_cache())
+    hubspot_service._forget_shared_pages()
+    fake_hubspot.reset_stats()
+    fake_hubspot.failures.clear()
+    return hubspot_service
+
+@pytest.fixture
+def register(client):
+    def register(**overrides):
+        body = {
+            "email": f"test-{uuid.uuid4().hex[:12]}@example.com", "password": PASSWORD,
+            "phone": "+15555550100", "firstname": "Test", "lastname": "User", **overrides,
+        }
+        response = client.post("/api/register", json=body)
+        assert response.status_code == 201, response.json
+        return body
+    return register
+
+@pytest.fixture
+def account(client, register):
+    """A newly registered user's registration body, with the headers of their requests under `headers`."""
+    user = register()
+    response = client.post("/api/login", json={"email": user["email"], "password": PASSWORD})
+    assert response.status_code == 200, response.json
+    return {**user, "headers": {"Authorization": f"Bearer {response.json['data']['access_token']}"}}
+
+@pytest.fixture
+def auth_headers(account):
+    return account["headers"]
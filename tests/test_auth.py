@@ -0,0 +1,40 @@
+from app.models import User
+from app.services.passwords import PasswordHasherBusy, password_hasher
+from conftest import PASSWORD
+
+def login(client, email):
+    return client.post("/api/login", json={"email": email, "password": PASSWORD})
+
+def stored_hash(app, email):
+    with app.app_context():
+        return User.query.filter_by(email=email).one().password_hash
+
+def test_login_rehashes_with_configured_cost(app, client, register, monkeypatch):
+    user = register()
+    monkeypatch.setattr(password_hasher, "rounds", password_hasher.rounds + 1)
+
+    assert login(client, user["email"]).status_code == 200
+    assert stored_hash(app, user["email"]).split("$")[2] == f"{password_hasher.rounds:02d}"
+
+def test_busy_pool_skips_rehash(app, client, register, monkeypatch):
+    user = register()
+    old_hash = stored_hash(app, user["email"])
+    monkeypatch.setattr(password_hasher, "rounds", password_hasher.rounds + 1)
+
+    def busy(password):
+        raise PasswordHasherBusy()
+
+    monkeypatch.setattr(password_hasher, "hash", busy)
+
+    response = login(client, user["email"])
+
+    assert response.status_code == 200
+    assert response.json["data"]["access_token"]
+    assert stored_hash(app, user["email"]) == old_hash
+
+def test_wrong_password_is_rejected(client, register):
+    user = register()
+
+    response = client.post("/api/login", json={"email": user["email"], "password": "Wrong1234"})
+
+    assert response.status_code == 401
@@ -0,0 +1,39 @@
+def get_page(client, headers, limit=5):
+    response = client.get(f"/api/new-crm-objects?limit={limit}", headers=headers)
+    assert response.status_code == 200
+    return response.json["data"]["data"], int(response.headers["X-HubSpot-Calls"])
+
+def test_repeated_page_is_served_from_cache(client, auth_headers, fake_hubspot):
+    first, first_calls = get_page(client, auth_headers)
+    fake_hubspot.reset_stats()
+    second, second_calls = get_page(client, auth_headers)
+
+    assert first_calls > 0
+    assert second_calls == 0
+    assert fake_hubspot.get_stats()["total"] == 0
+    assert second == first
+
+def test_forgotten_deal_is_read_again(client, auth_headers, fake_hubspot, hubspot):
+    page, _ = get_page(client, auth_headers)
+    deal_id = page["contacts"][0]["deals"][0]["id"]
+    hubspot.forget("deals", [deal_id])
+    fake_hubspot.reset_stats()
+
+    _, calls = get_page(client, auth_headers)
+
+    # The deal and its ticket associations, everything else is still cached
+    assert calls == 2
+    assert fake_hubspot.get_stats()["calls"] == {"objects.batch_read": 1, "associations.batch_read": 1}
+
+def test_updated_deal_replaces_cached_copy(client, auth_headers, fake_hubspot):
+    page, _ = get_page(client, auth_headers)
+    deal = page["contacts"][0]["deals"][0]
+    response = client.post("/api/deals", headers=auth_headers, json={
+        "dealname": deal["dealname"], "amount": 4321, "dealstage": "closedwon",
+    })
+    assert response.status_code == 201
+
+    page, calls = get_page(client, auth_headers)
+
+    assert calls == 0
+    assert float(page["contacts"][0]["deals"][0]["amount"]) == 4321
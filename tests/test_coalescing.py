@@ -0,0 +1,85 @@
+import threading
+import time
+from app.services.single_flight import SingleFlight
+
+def read_concurrently(hubspot, clients: int, limit: int = 5):
+    barrier = threading.Barrier(clients)
+    pages = []
+
+    def client():
+        barrier.wait()
+        pages.append(hubspot.get_contacts(limit))
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return pages
+
+def test_identical_concurrent_reads_share_one_fetch(hubspot, fake_hubspot, monkeypatch):
+    # Slow enough that every client arrives while the first fetch is in flight
+    monkeypatch.setattr(fake_hubspot, "latency", 100)
+    # Fetches the access token, so only the page's calls are counted
+    hubspot.client
+    fake_hubspot.reset_stats()
+    before = hubspot.get_coalescing_stats()
+
+    pages = read_concurrently(hubspot, 8)
+
+    after = hubspot.get_coalescing_stats()
+    assert after["executed"] - before["executed"] == 1
+    assert after["coalesced"] - before["coalesced"] == 7
+    assert fake_hubspot.get_stats()["total"] == 4
+    # The calls are reported once, by the caller whose fetch made them
+    assert sorted(page["hubspot_calls"] for page in pages) == [0] * 7 + [4]
+    assert all(page["data"] == pages[0]["data"] for page in pages)
+
+def test_write_stops_sharing_finished_page(hubspot):
+    before = hubspot.get_coalescing_stats()
+    hubspot.get_contacts(5)
+    hubspot.get_contacts(5)
+    # Within the grace window the second read got the first one's page
+    assert hubspot.get_coalescing_stats()["executed"] - before["executed"] == 1
+
+    hubspot.forget("deals", [])
+    hubspot.get_contacts(5)
+
+    assert hubspot.get_coalescing_stats()["executed"] - before["executed"] == 2
+
+def test_waiters_get_the_callers_exception():
+    flights = SingleFlight(grace=1)
+    release = threading.Event()
+    errors = []
+
+    def fail():
+        release.wait()
+        raise RuntimeError("HubSpot is down")
+
+    def call(function):
+        try:
+            flights.do("page", function)
+        except RuntimeError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call, args=(fail,)), threading.Thread(target=call, args=(lambda: "not called",))]
+    threads[0].start()
+    while flights.get_stats()["in_flight"] == 0:
+        time.sleep(0.01)
+    threads[1].start()
+    while flights.get_stats()["coalesced"] == 0:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(errors) == 2 and errors[0] is errors[1]
+    # Failures are not kept, the next call runs again
+    assert flights.do("page", lambda: "fetched") == ("fetched", False)
+
+def test_rejected_results_are_not_kept():
+    flights = SingleFlight(grace=60)
+    flights.do("page", lambda: {"error": "failed"}, keep=lambda page: "error" not in page)
+
+    assert flights.do("page", lambda: {"data": []}, keep=lambda page: "error" not in page) == ({"data": []}, False)
+    assert flights.do("page", lambda: "not called") == ({"data": []}, True)
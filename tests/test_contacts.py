@@ -0,0 +1,78 @@
+import json
+import pytest
+from app.config import config
+
+# A cold page costs the page read, one batch read of its deals and one of their ticket
+# associations, then one batch read of the tickets, however many contacts are on it
+CALLS_PER_PAGE = 4
+
+@pytest.mark.parametrize("limit", [1, 5, 10])
+def test_get_contacts_makes_fixed_calls_per_page(client, auth_headers, fake_hubspot, limit):
+    fake_hubspot.reset_stats()
+    response = client.get(f"/api/new-crm-objects?limit={limit}", headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.headers["X-HubSpot-Calls"] == str(CALLS_PER_PAGE)
+    assert fake_hubspot.get_stats()["total"] == CALLS_PER_PAGE
+    contacts = response.json["data"]["data"]["contacts"]
+    assert len(contacts) == limit
+    for contact in contacts:
+        assert len(contact["deals"]) == 2
+        assert all(len(deal["tickets"]) == 2 for deal in contact["deals"])
+
+def test_get_contacts_pages_with_cursor(client, auth_headers):
+    seen, cursor = [], None
+    while True:
+        response = client.get("/api/new-crm-objects?limit=5" + (f"&cursor={cursor}" if cursor else ""), headers=auth_headers)
+        assert response.status_code == 200
+        page = response.json["data"]["data"]
+        seen.extend(contact["id"] for contact in page["contacts"])
+        cursor = page["next_after"]
+        if not cursor:
+            break
+
+    assert len(seen) == len(set(seen))
+    assert len(seen) >= 12
+
+@pytest.fixture
+def page_sizes(hubspot, monkeypatch):
+    """The limit of every page read, in order."""
+    sizes = []
+    get_contacts = hubspot.get_contacts
+
+    def recorded(limit=10, after=None, properties=None):
+        sizes.append(limit)
+        return get_contacts(limit, after, properties)
+
+    monkeypatch.setattr(hubspot, "get_contacts", recorded)
+    return sizes
+
+def stream(client, headers, query=""):
+    response = client.get(f"/api/new-crm-objects?stream=ndjson{query}", headers=headers)
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    return [json.loads(line) for line in response.data.decode("utf-8").splitlines()]
+
+def test_stream_exports_every_contact(client, auth_headers, fake_hubspot, page_sizes, monkeypatch):
+    monkeypatch.setattr(config, "HUBSPOT_EXPORT_PAGE_SIZE", 5)
+
+    contacts = stream(client, auth_headers)
+
+    assert [contact["id"] for contact in contacts] == sorted(fake_hubspot.store.objects["contacts"], key=int)
+    assert set(page_sizes) == {5}
+
+def test_stream_stops_at_limit(client, auth_headers, page_sizes, monkeypatch):
+    monkeypatch.setattr(config, "HUBSPOT_EXPORT_PAGE_SIZE", 5)
+
+    contacts = stream(client, auth_headers, "&limit=12")
+
+    assert len(contacts) == 12
+    assert page_sizes == [5, 5, 2]
+
+def test_stream_pages_are_at_most_hubspots_largest(client, auth_headers, page_sizes, monkeypatch):
+    monkeypatch.setattr(config, "HUBSPOT_EXPORT_PAGE_SIZE", 500)
+
+    contacts = stream(client, auth_headers, "&limit=150")
+
+    assert 12 < len(contacts) <= 150
+    assert page_sizes[0] == 100
@@ -0,0 +1,56 @@
+import pytest
+from app.config import config
+
+LINK = "associations.associate"
+BATCH_LINK = "associations.batch_associate"
+
+def deal(name: str, amount: float = 100):
+    return { "dealname": name, "amount": amount, "dealstage": "appointmentscheduled" }
+
+@pytest.fixture
+def upsert_deals(monkeypatch):
+    """Deals are upserted on their name, then linked to the contact."""
+    monkeypatch.setattr(config, "HUBSPOT_UPSERT_MODE", "batch")
+    monkeypatch.setattr(config, "HUBSPOT_DEAL_UNIQUE_PROPERTY", "dealname")
+
+def contact_id(fake_hubspot, account):
+    return fake_hubspot.store.find("contacts", "email", account["email"])["id"]
+
+def test_deal_is_linked_to_contact(client, account, fake_hubspot, upsert_deals):
+    response = client.post("/api/deals", headers=account["headers"], json=deal("Linked deal"))
+
+    assert response.status_code == 201
+    assert fake_hubspot.store.associated("deals", response.json["data"]["id"], "contacts") == [contact_id(fake_hubspot, account)]
+
+def test_retry_links_deal_whose_link_failed(client, account, fake_hubspot, upsert_deals):
+    fake_hubspot.fail(LINK)
+    assert client.post("/api/deals", headers=account["headers"], json=deal("Retried deal")).status_code == 400
+
+    response = client.post("/api/deals", headers=account["headers"], json=deal("Retried deal"))
+
+    assert response.status_code == 201
+    deal_id = response.json["data"]["id"]
+    assert fake_hubspot.store.associated("deals", deal_id, "contacts") == [contact_id(fake_hubspot, account)]
+    assert len([stored for stored in fake_hubspot.store.objects["deals"].values() if stored["properties"]["dealname"] == "Retried deal"]) == 1
+
+def test_batch_retry_links_deals_whose_link_failed(client, account, fake_hubspot, upsert_deals):
+    deals = [deal("Batch retried deal 1"), deal("Batch retried deal 2")]
+    fake_hubspot.fail(BATCH_LINK)
+    response = client.post("/api/deals/batch", headers=account["headers"], json=deals)
+    assert response.status_code == 207
+    assert response.json["failed"] == 2
+
+    response = client.post("/api/deals/batch", headers=account["headers"], json=deals)
+
+    assert response.status_code == 201
+    for result in response.json["data"]:
+        assert fake_hubspot.store.associated("deals", result["data"]["id"], "contacts") == [contact_id(fake_hubspot, account)]
+
+def test_batch_results_follow_request_order(client, account, fake_hubspot, upsert_deals):
+    names = [f"Ordered deal {number}" for number in range(5)]
+
+    response = client.post("/api/deals/batch", headers=account["headers"], json=[deal(name, number) for number, name in enumerate(names)])
+
+    assert response.status_code == 201
+    assert [result["data"]["dealname"] for result in response.json["data"]] == names
+    assert [float(result["data"]["amount"]) for result in response.json["data"]] == [0, 1, 2, 3, 4]
@@ -0,0 +1,46 @@
+PAGE = "/api/new-crm-objects?limit=3"
+
+def test_page_has_weak_etag(client, auth_headers):
+    response = client.get(PAGE, headers=auth_headers)
+
+    assert response.status_code == 200
+    etag, weak = response.get_etag()
+    assert etag and weak
+    assert response.cache_control.private and response.cache_control.no_cache
+
+def test_unchanged_page_is_not_modified(client, auth_headers):
+    etag = client.get(PAGE, headers=auth_headers).headers["ETag"]
+
+    response = client.get(PAGE, headers={**auth_headers, "If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.data == b""
+    assert response.headers["ETag"] == etag
+    assert response.headers["X-HubSpot-Calls"] == "0"
+
+def test_stale_etag_gets_the_page(client, auth_headers):
+    response = client.get(PAGE, headers={**auth_headers, "If-None-Match": 'W/"outdated"'})
+
+    assert response.status_code == 200
+    assert response.json["data"]["data"]["contacts"]
+
+def test_changed_deal_changes_etag(client, auth_headers):
+    response = client.get(PAGE, headers=auth_headers)
+    etag = response.headers["ETag"]
+    deal = response.json["data"]["data"]["contacts"][0]["deals"][0]
+    assert client.post("/api/deals", headers=auth_headers, json={
+        "dealname": deal["dealname"], "amount": 99, "dealstage": "closedlost",
+    }).status_code == 201
+
+    response = client.get(PAGE, headers={**auth_headers, "If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+def test_projection_has_its_own_etag(client, auth_headers):
+    full = client.get(PAGE, headers=auth_headers).headers["ETag"]
+    projected = client.get(f"{PAGE}&fields=contact.email,deal.dealname", headers=auth_headers)
+
+    assert projected.status_code == 200
+    assert projected.headers["ETag"] != full
+    assert client.get(f"{PAGE}&fields=contact.email,deal.dealname", headers={**auth_headers, "If-None-Match": full}).status_code == 200
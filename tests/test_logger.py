@@ -0,0 +1,38 @@
+import json
+import queue
+import pytest
+from app.logger import Logger, get_log_stats, get_pipeline
+
+@pytest.fixture
+def log_queue(monkeypatch):
+    """Takes the place of the pipeline's queue, so the records the handler queues can be read back."""
+    handler = get_pipeline().handler
+    log_queue = queue.Queue(maxsize=2)
+    monkeypatch.setattr(handler, "queue", log_queue)
+    monkeypatch.setattr(handler, "dropped", 0)
+    monkeypatch.setattr(handler, "_unreported", 0)
+    return log_queue
+
+def test_line_is_valid_json(log_queue):
+    context = {"email": 'a "quoted" name', "nested": {"ids": [1, 2]}}
+
+    Logger("tests.json").info('Contact "Ada" created', context)
+
+    line = json.loads(log_queue.get_nowait().msg)
+    assert line["message"] == 'Contact "Ada" created'
+    assert line["context"] == context
+    assert line["level"] == "INFO"
+
+def test_logger_of_same_name_has_one_handler():
+    Logger("tests.handlers")
+    logger = Logger("tests.handlers").get_logger()
+
+    assert logger.handlers == [get_pipeline().handler]
+
+def test_full_queue_drops_lines(log_queue):
+    logger = Logger("tests.dropped")
+
+    for number in range(3):
+        logger.info("Line", {"number": number})
+
+    assert get_log_stats() == {"queued": 2, "dropped": 1}
@@ -0,0 +1,36 @@
+import pytest
+from app.logger import get_pipeline
+from app.services.metrics import MetricsRegistry, metrics
+
+@pytest.fixture
+def observed(monkeypatch):
+    calls = []
+    monkeypatch.setattr(metrics, "observe", lambda name, labels, seconds: calls.append((name, labels)))
+    return calls
+
+def test_hubspot_calls_are_timed(hubspot, observed):
+    hubspot.get_contacts(2)
+
+    apis = {labels for name, labels in observed if name == "hubspot_call_duration_seconds"}
+    assert ("contacts.basic_api.get_page", "success") in apis
+
+def test_token_refresh_is_timed(hubspot, observed):
+    hubspot._generate_tokens()
+
+    assert observed == [("hubspot_call_duration_seconds", ("oauth.tokens_api.create", "success"))]
+
+def test_failed_token_refresh_is_timed(hubspot, observed, fake_hubspot, monkeypatch):
+    monkeypatch.setattr(fake_hubspot, "rate_429", 1)
+
+    with pytest.raises(Exception):
+        hubspot._generate_tokens()
+
+    assert observed == [("hubspot_call_duration_seconds", ("oauth.tokens_api.create", "429"))]
+
+def test_dropped_log_lines_are_counted(tmp_path, monkeypatch):
+    monkeypatch.setattr(get_pipeline().handler, "dropped", 3)
+
+    lines = MetricsRegistry(str(tmp_path)).render().splitlines()
+
+    assert "# TYPE log_lines_dropped_total counter" in lines
+    assert "log_lines_dropped_total 3" in lines
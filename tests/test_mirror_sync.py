@@ -0,0 +1,58 @@
+from types import SimpleNamespace
+import pytest
+from app.config import config
+from app.services import mirror_sync as mirror_sync_module
+from app.services.hubspot import hubspot_service
+from app.services.mirror import MirrorService
+from app.services.mirror_sync import MirrorSync
+
+MAX_SEARCHES = 200
+
+@pytest.fixture
+def synced(app, fake_hubspot, monkeypatch):
+    """Runs one sync of an object type with a search result limit of 4 and pages of 2, returns the saved ids."""
+    monkeypatch.setattr(mirror_sync_module, "SEARCH_RESULT_LIMIT", 4)
+    monkeypatch.setattr(config, "HUBSPOT_BATCH_SIZE", 2)
+    # Saving and the lease need Postgres, only the paging is tested here
+    monkeypatch.setattr(MirrorService, "claim", staticmethod(lambda object_type: SimpleNamespace(high_water_mark=None, locked_until=None)))
+    monkeypatch.setattr(MirrorService, "release", staticmethod(lambda state, caught_up: None))
+    saved = []
+    monkeypatch.setattr(MirrorSync, "_save", lambda self, object_type, objects: saved.extend(properties["id"] for properties, _ in objects))
+    searches = []
+    for name in ("search_modified", "search_modified_at"):
+        search = getattr(hubspot_service, name)
+
+        def counted(*args, search=search):
+            searches.append(args)
+            assert len(searches) < MAX_SEARCHES, "the sync doesn't get past the search result limit"
+            return search(*args)
+
+        monkeypatch.setattr(hubspot_service, name, counted)
+
+    def sync(object_type):
+        with app.app_context():
+            MirrorSync(app)._sync(object_type)
+        return saved
+
+    return sync
+
+def modify_at(fake_hubspot, monkeypatch, ids, modified_ms: int):
+    for id in ids:
+        stored = fake_hubspot.store.objects["tickets"][id]
+        monkeypatch.setitem(stored["properties"], "hs_lastmodifieddate", str(modified_ms))
+        monkeypatch.setitem(stored, "updated_at", modified_ms)
+
+def test_sync_gets_past_search_result_limit(fake_hubspot, monkeypatch, synced):
+    ids = sorted(fake_hubspot.store.objects["tickets"], key=int)
+    for position, id in enumerate(ids):
+        modify_at(fake_hubspot, monkeypatch, [id], 1700000000000 + position)
+
+    assert set(synced("tickets")) == set(ids)
+
+def test_sync_walks_results_sharing_one_modified_time(fake_hubspot, monkeypatch, synced):
+    ids = sorted(fake_hubspot.store.objects["tickets"], key=int)
+    # More objects modified at the same time than one query can page through
+    modify_at(fake_hubspot, monkeypatch, ids[:-2], 1700000000000)
+    modify_at(fake_hubspot, monkeypatch, ids[-2:], 1700000005000)
+
+    assert set(synced("tickets")) == set(ids)
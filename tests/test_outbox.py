@@ -0,0 +1,133 @@
+import pytest
+from app.config import config
+from app.extensions import db
+from app.models import HubspotOutbox, User
+from app.services.outbox import OutboxService, OutboxWorker
+from conftest import PASSWORD
+
+DEAL = { "dealname": "Outbox deal", "amount": 250, "dealstage": "appointmentscheduled" }
+
+@pytest.fixture
+def outbox_mode(monkeypatch):
+    monkeypatch.setattr(config, "HUBSPOT_WRITE_MODE", "outbox")
+
+@pytest.fixture
+def queued_user(client, register, outbox_mode):
+    """A user registered in outbox mode, whose contact isn't created in HubSpot yet, and their headers."""
+    user = register()
+    token = client.post("/api/login", json={"email": user["email"], "password": PASSWORD}).json["data"]["access_token"]
+    return user, {"Authorization": f"Bearer {token}"}
+
+@pytest.fixture
+def drain(app, monkeypatch):
+    """
+    Drains the outbox once. Claiming takes row locks and does interval arithmetic only Postgres
+    has, on SQLite every pending operation is claimed as it is.
+    """
+    def claim(limit):
+        return HubspotOutbox.query.filter_by(status="pending").order_by(HubspotOutbox.id).limit(limit).all()
+
+    monkeypatch.setattr(OutboxService, "claim", staticmethod(claim))
+    yield OutboxWorker(app).drain_once
+    # Keeps this test's operations out of the other tests' claims
+    with app.app_context():
+        HubspotOutbox.query.delete()
+        db.session.commit()
+
+def outbox_state(app, entry_id):
+    """
+    Attempts, status and last error of an entry. Only these columns, SQLite can't read back
+    the next attempt time computed by retry and postpone.
+    """
+    with app.app_context():
+        return db.session.query(
+            HubspotOutbox.attempts, HubspotOutbox.status, HubspotOutbox.last_error,
+        ).filter_by(id=entry_id).one()
+
+def test_registration_queues_contact(app, queued_user, fake_hubspot):
+    user, _ = queued_user
+
+    with app.app_context():
+        row = User.query.filter_by(email=user["email"]).one()
+        entry = HubspotOutbox.query.filter_by(user_id=row.id).one()
+        assert row.contact_id is None
+        assert (entry.operation, entry.status) == ("upsert_contact", "pending")
+    assert fake_hubspot.get_stats()["total"] == 0
+
+def test_deal_is_queued_behind_contact(app, client, queued_user, fake_hubspot, drain):
+    user, headers = queued_user
+
+    response = client.post("/api/deals", headers=headers, json=DEAL)
+    assert response.status_code == 202
+    deal_entry_id, = response.json["data"]["outbox_ids"]
+    assert fake_hubspot.get_stats()["total"] == 0
+
+    drain()
+    with app.app_context():
+        contact_id = User.query.filter_by(email=user["email"]).one().contact_id
+        deal_entry = db.session.get(HubspotOutbox, deal_entry_id)
+        assert contact_id
+        assert deal_entry.status == "done"
+        assert fake_hubspot.store.associated("deals", deal_entry.object_id, "contacts") == [contact_id]
+
+def test_direct_write_waits_for_queued_contact(client, queued_user, monkeypatch, drain):
+    _, headers = queued_user
+    monkeypatch.setattr(config, "HUBSPOT_WRITE_MODE", "sync")
+
+    assert client.post("/api/deals", headers=headers, json=DEAL).status_code == 409
+    assert client.post("/api/deals/batch", headers=headers, json=[DEAL]).status_code == 409
+
+    drain()
+    assert client.post("/api/deals", headers=headers, json={**DEAL, "dealname": "Direct deal"}).status_code == 201
+
+def test_failed_operation_is_retried_later(app, queued_user, fake_hubspot, monkeypatch, drain):
+    monkeypatch.setattr(fake_hubspot, "rate_429", 1)
+
+    drain()
+
+    with app.app_context():
+        user_id = User.query.filter_by(email=queued_user[0]["email"]).one().id
+        entry_id = HubspotOutbox.query.with_entities(HubspotOutbox.id).filter_by(user_id=user_id).scalar()
+    attempts, status, last_error = outbox_state(app, entry_id)
+    assert (attempts, status) == (1, "pending")
+    assert last_error
+
+def test_waiting_for_contact_uses_no_attempts(app, client, queued_user, fake_hubspot, drain):
+    _, headers = queued_user
+    deal_entry_id, = client.post("/api/deals", headers=headers, json=DEAL).json["data"]["outbox_ids"]
+    fake_hubspot.fail("objects.batch_upsert")
+
+    drain()
+
+    assert outbox_state(app, deal_entry_id) == (0, "pending", "Contact not created yet")
+
+def test_contact_upsert_has_no_attempt_cap(app, queued_user, fake_hubspot, monkeypatch, drain):
+    monkeypatch.setattr(config, "OUTBOX_MAX_ATTEMPTS", 1)
+    fake_hubspot.fail("objects.batch_upsert")
+
+    drain()
+
+    with app.app_context():
+        user_id = User.query.filter_by(email=queued_user[0]["email"]).one().id
+        entry_id = HubspotOutbox.query.with_entities(HubspotOutbox.id).filter_by(user_id=user_id).scalar()
+    attempts, status, _ = outbox_state(app, entry_id)
+    assert (attempts, status) == (1, "pending")
+
+def test_retry_failed_redrives_exhausted_operation(app, client, queued_user, fake_hubspot, monkeypatch, drain):
+    _, headers = queued_user
+    monkeypatch.setattr(config, "OUTBOX_MAX_ATTEMPTS", 1)
+    monkeypatch.setattr(config, "HUBSPOT_DEAL_UNIQUE_PROPERTY", "dealname")
+    drain()
+    deal_entry_id, = client.post("/api/deals", headers=headers, json=DEAL).json["data"]["outbox_ids"]
+    fake_hubspot.fail("objects.batch_upsert")
+
+    drain()
+    assert outbox_state(app, deal_entry_id)[:2] == (1, "failed")
+
+    monkeypatch.setattr(OutboxWorker, "run", lambda self: None)
+    result = app.test_cli_runner().invoke(args=["outbox-worker", "--retry-failed"])
+    assert result.output.strip() == "Requeued 1 failed operations"
+    assert outbox_state(app, deal_entry_id)[:2] == (0, "pending")
+
+    drain()
+    assert outbox_state(app, deal_entry_id)[:2] == (0, "done")
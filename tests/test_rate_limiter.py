@@ -0,0 +1,90 @@
+import time
+from types import SimpleNamespace
+import pytest
+from app.config import config
+from app.services import rate_limiter
+from app.services.rate_limiter import MemoryBucketStore, RateLimiter, RateLimitExceeded, RetryPolicy
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Waits of the rate limiter and retry policy, recorded instead of slept."""
+    sleeps = []
+    monkeypatch.setattr(rate_limiter, "time", SimpleNamespace(time=time.time, sleep=sleeps.append))
+    return sleeps
+
+@pytest.fixture
+def limiter(hubspot, monkeypatch, sleeps):
+    """A memory rate limiter in front of the shared HubspotService, with its pauses recorded."""
+    limiter = RateLimiter(MemoryBucketStore(), {"search": (4, 4), "objects": (10, 20)})
+    limiter.pauses = []
+    pause = limiter.pause
+    monkeypatch.setattr(limiter, "pause", lambda bucket, seconds: (limiter.pauses.append((bucket, seconds)), pause(bucket, seconds)))
+    monkeypatch.setattr(hubspot, "retry_policy", RetryPolicy(limiter))
+    monkeypatch.setattr(config, "HUBSPOT_MAX_RETRIES", 3)
+    hubspot._refresh_token()
+    return limiter
+
+def get_contact_page(hubspot):
+    return hubspot._call("contacts.basic_api.get_page", hubspot.client.crm.contacts.basic_api.get_page, limit=1)
+
+def create_contact(hubspot):
+    return hubspot._call(
+        "contacts.basic_api.create", hubspot.client.crm.contacts.basic_api.create,
+        hubspot.sdk.ContactSimplePublicObjectInputForCreate(properties={"email": "retry-create@example.com"}),
+    )
+
+def test_429_waits_retry_after_and_pauses_bucket(hubspot, limiter, fake_hubspot, sleeps, monkeypatch):
+    monkeypatch.setattr(fake_hubspot, "retry_after", 2)
+    fake_hubspot.fail("objects.get_page", 429)
+
+    assert get_contact_page(hubspot).results
+
+    assert fake_hubspot.get_stats()["calls"]["objects.get_page"] == 2
+    assert limiter.pauses == [("objects", 2.0)]
+    # The retry waited for the paused bucket rather than sleeping in the retry policy
+    assert len(sleeps) == 1 and 1.9 < sleeps[0] <= 2
+
+def test_5xx_is_retried(hubspot, limiter, fake_hubspot):
+    fake_hubspot.fail("objects.get_page", 503)
+
+    assert get_contact_page(hubspot).results
+
+    assert fake_hubspot.get_stats()["calls"]["objects.get_page"] == 2
+    assert limiter.pauses == []
+
+def test_5xx_on_create_is_not_retried(hubspot, limiter, fake_hubspot):
+    fake_hubspot.fail("objects.create", 500)
+
+    with pytest.raises(Exception) as error:
+        create_contact(hubspot)
+
+    assert error.value.status == 500
+    assert fake_hubspot.get_stats()["calls"]["objects.create"] == 1
+
+def test_429_on_create_is_retried(hubspot, limiter, fake_hubspot):
+    fake_hubspot.fail("objects.create", 429)
+
+    assert create_contact(hubspot).id
+
+    assert fake_hubspot.get_stats()["calls"]["objects.create"] == 2
+
+def test_wait_over_max_wait_raises(hubspot, limiter, fake_hubspot, monkeypatch):
+    monkeypatch.setattr(config, "HUBSPOT_RATE_LIMIT_MAX_WAIT", 5)
+    monkeypatch.setattr(fake_hubspot, "retry_after", 30)
+    monkeypatch.setattr(fake_hubspot, "rate_429", 1)
+
+    with pytest.raises(RateLimitExceeded):
+        get_contact_page(hubspot)
+
+    assert fake_hubspot.get_stats()["calls"]["429"] == 1
+    assert limiter.pauses == [("objects", 30.0)]
+
+def test_empty_bucket_over_max_wait_raises(sleeps, monkeypatch):
+    monkeypatch.setattr(config, "HUBSPOT_RATE_LIMIT_MAX_WAIT", 1)
+    limiter = RateLimiter(MemoryBucketStore(), {"search": (0.5, 2)})
+
+    limiter.acquire("search")
+    limiter.acquire("search")
+    with pytest.raises(RateLimitExceeded):
+        limiter.acquire("search")
+    assert sleeps == []
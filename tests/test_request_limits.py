@@ -0,0 +1,88 @@
+import os
+import pytest
+from app.services import request_limits
+from app.services.request_limits import MmapStorage
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(request_limits, "time", clock)
+    return clock
+
+@pytest.fixture
+def storage_uri(tmp_path):
+    return f"mmap://{tmp_path / 'rate-limits'}"
+
+def test_counts_within_window_and_restarts_after_it(storage_uri, clock):
+    storage = MmapStorage(f"{storage_uri}?slots=64")
+
+    assert storage.incr("user:1", 60) == 1
+    assert storage.incr("user:1", 60, amount=2) == 3
+    assert storage.get("user:1") == 3
+    assert storage.get_expiry("user:1") == clock.now + 60
+
+    clock.now += 60
+    assert storage.get("user:1") == 0
+    assert storage.incr("user:1", 60) == 1
+    assert storage.get_expiry("user:1") == clock.now + 60
+
+def test_elastic_expiry_moves_window(storage_uri, clock):
+    storage = MmapStorage(f"{storage_uri}?slots=64")
+    storage.incr("user:1", 60)
+
+    clock.now += 30
+    assert storage.incr("user:1", 60, elastic_expiry=True) == 2
+    assert storage.get_expiry("user:1") == clock.now + 60
+
+def test_clear_and_reset(storage_uri, clock):
+    storage = MmapStorage(f"{storage_uri}?slots=64")
+    for key in ("user:1", "user:2", "ip:10.0.0.1"):
+        storage.incr(key, 60)
+
+    storage.clear("user:1")
+    assert storage.get("user:1") == 0
+    assert storage.get("user:2") == 1
+
+    assert storage.reset() == 2
+    assert storage.get("user:2") == 0
+    assert storage.get("ip:10.0.0.1") == 0
+
+def test_full_table_takes_over_slot_expiring_soonest(storage_uri, clock):
+    storage = MmapStorage(f"{storage_uri}?slots=2")
+    storage.incr("user:1", 30)
+    storage.incr("user:2", 60)
+
+    assert storage.incr("user:3", 60) == 1
+
+    assert storage.get("user:1") == 0
+    assert storage.get("user:2") == 1
+    assert storage.get("user:3") == 1
+
+def test_processes_share_counts(storage_uri):
+    storage = MmapStorage(f"{storage_uri}?slots=64")
+    processes, increments = 4, 200
+
+    children = []
+    for _ in range(processes):
+        pid = os.fork()
+        if pid == 0:
+            status = 1
+            try:
+                for _ in range(increments):
+                    storage.incr("user:1", 60)
+                status = 0
+            finally:
+                os._exit(status)
+        children.append(pid)
+    for pid in children:
+        assert os.waitpid(pid, 0)[1] == 0
+
+    assert storage.get("user:1") == processes * increments
+    assert MmapStorage(f"{storage_uri}?slots=64").get("user:1") == processes * increments
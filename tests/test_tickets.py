@@ -0,0 +1,54 @@
+import pytest
+
+DEAL = { "amount": 100, "dealstage": "appointmentscheduled" }
+TICKET = {
+    "subject": "Ticket", "description": "Needs help", "category": "general_inquiry",
+    "pipeline": "0", "hs_ticket_priority": "HIGH", "hs_pipeline_stage": "1",
+}
+
+@pytest.fixture
+def deal_ids(client, account):
+    """Ids of two deals of the account's contact."""
+    return [
+        client.post("/api/deals", headers=account["headers"], json={**DEAL, "dealname": f"Ticket deal {number}"}).json["data"]["id"]
+        for number in range(2)
+    ]
+
+@pytest.fixture
+def reversed_batches(fake_hubspot, monkeypatch):
+    monkeypatch.setattr(fake_hubspot, "reverse_batches", True)
+
+def assert_linked(fake_hubspot, results, deal_ids):
+    for result, deal_id in zip(results, deal_ids):
+        assert fake_hubspot.store.associated("tickets", result["data"]["id"], "deals") == [deal_id]
+
+def test_batch_results_follow_request_order(client, account, deal_ids, fake_hubspot, reversed_batches):
+    tickets = [{**TICKET, "subject": f"Ordered ticket {number}", "deal_id": deal_ids[number % 2]} for number in range(4)]
+
+    response = client.post("/api/tickets/batch", headers=account["headers"], json=tickets)
+
+    assert response.status_code == 201
+    assert response.json["failed"] == 0
+    assert [result["data"]["subject"] for result in response.json["data"]] == [ticket["subject"] for ticket in tickets]
+    assert_linked(fake_hubspot, response.json["data"], [ticket["deal_id"] for ticket in tickets])
+
+def test_same_properties_for_different_deals_are_matched_on_deal(client, account, deal_ids, fake_hubspot, reversed_batches):
+    tickets = [{**TICKET, "subject": "Same ticket", "deal_id": deal_id} for deal_id in deal_ids]
+
+    response = client.post("/api/tickets/batch", headers=account["headers"], json=tickets)
+
+    assert response.status_code == 201
+    assert_linked(fake_hubspot, response.json["data"], deal_ids)
+    assert fake_hubspot.get_stats()["calls"]["associations.batch_read"] == 1
+
+def test_unresolved_match_is_an_error_not_a_guess(client, account, deal_ids, fake_hubspot, reversed_batches):
+    tickets = [{**TICKET, "subject": "Unresolved ticket", "deal_id": deal_id} for deal_id in deal_ids]
+    tickets.append({**TICKET, "subject": "Distinct ticket", "deal_id": deal_ids[0]})
+    fake_hubspot.fail("associations.batch_read")
+
+    response = client.post("/api/tickets/batch", headers=account["headers"], json=tickets)
+
+    assert response.status_code == 207
+    assert response.json["failed"] == 2
+    assert ["error" in result for result in response.json["data"]] == [True, True, False]
+    assert_linked(fake_hubspot, response.json["data"][2:], deal_ids[:1])
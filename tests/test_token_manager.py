@@ -0,0 +1,60 @@
+import time
+from threading import Barrier, Lock, Thread
+from types import SimpleNamespace
+from app.services.token_manager import Token, TokenFileStore, TokenManager
+
+class FakeOAuth:
+    """Counts token generations, each one slow enough for concurrent callers to overlap."""
+
+    def __init__(self, name="oauth"):
+        self.name = name
+        self.calls = 0
+        self._lock = Lock()
+
+    def generate_tokens(self):
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+        time.sleep(0.05)
+        return SimpleNamespace(access_token=f"{self.name}-{call}", expires_in=3600)
+
+def token_manager(oauth, store=None):
+    manager = TokenManager(oauth.generate_tokens, store)
+    # Only the tests' calls refresh, the background refresher exits right away
+    manager.stop()
+    return manager
+
+def test_concurrent_callers_refresh_once():
+    oauth = FakeOAuth()
+    manager = token_manager(oauth)
+    manager._token = Token("expired", time.time() - 1)
+    barrier, tokens = Barrier(8), []
+
+    def get_token():
+        barrier.wait()
+        tokens.append(manager.get_access_token())
+
+    threads = [Thread(target=get_token) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert oauth.calls == 1
+    assert tokens == ["oauth-1"] * 8
+
+def test_managers_sharing_a_store_reuse_its_token(tmp_path):
+    path = str(tmp_path / "token.json")
+    first, second = FakeOAuth("first"), FakeOAuth("second")
+
+    assert token_manager(first, TokenFileStore(path)).get_access_token() == "first-1"
+    assert token_manager(second, TokenFileStore(path)).get_access_token() == "first-1"
+    assert (first.calls, second.calls) == (1, 0)
+
+def test_expired_stored_token_is_replaced(tmp_path):
+    store = TokenFileStore(str(tmp_path / "token.json"))
+    store.write(Token("stored", time.time() - 1))
+    oauth = FakeOAuth()
+
+    assert token_manager(oauth, store).get_access_token() == "oauth-1"
+    assert store.read().access_token == "oauth-1"
@@ -0,0 +1,106 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+import pytest
+from app.config import config
+from app.services.webhook import WebhookService
+
+URL = "/api/hubspot/webhook"
+
+def signed_headers(body: str, timestamp: int = None):
+    timestamp = str(timestamp or int(time.time() * 1000))
+    source = f"POST{'http://localhost' + URL}{body}{timestamp}"
+    digest = hmac.new(config.HUBSPOT_CLIENT_SECRET.encode("utf-8"), source.encode("utf-8"), hashlib.sha256).digest()
+    return {
+        "Content-Type": "application/json",
+        "X-HubSpot-Request-Timestamp": timestamp,
+        "X-HubSpot-Signature-v3": base64.b64encode(digest).decode("utf-8"),
+    }
+
+def post_events(client, events):
+    body = json.dumps(events)
+    return client.post(URL, data=body, headers=signed_headers(body))
+
+def event(subscription_type: str, object_id: int, occurred_at: int = 1, **extra):
+    return { "subscriptionType": subscription_type, "objectId": object_id, "occurredAt": occurred_at, **extra }
+
+@pytest.fixture
+def queued(app, monkeypatch):
+    batches = []
+    monkeypatch.setattr(app.extensions["hubspot_webhooks"], "enqueue", lambda events: batches.append(events) or True)
+    return batches
+
+def test_valid_events_are_queued(client, queued):
+    events = [
+        event("deal.propertyChange", 1001),
+        event("contact.deletion", 1002),
+        { "subscriptionType": "contact.associationChange", "occurredAt": 1, "fromObjectId": 1002, "toObjectId": 1001, "associationType": "CONTACT_TO_DEAL" },
+    ]
+
+    response = post_events(client, events)
+
+    assert response.status_code == 202
+    assert queued == [events]
+
+def test_bad_signature_is_rejected(client, queued):
+    body = json.dumps([event("deal.creation", 1001)])
+    headers = signed_headers(body)
+    headers["X-HubSpot-Signature-v3"] = base64.b64encode(b"forged").decode("utf-8")
+
+    assert client.post(URL, data=body, headers=headers).status_code == 401
+    assert queued == []
+
+def test_old_timestamp_is_rejected(client, queued):
+    body = json.dumps([event("deal.creation", 1001)])
+    old = int((time.time() - config.HUBSPOT_WEBHOOK_MAX_AGE - 60) * 1000)
+
+    assert client.post(URL, data=body, headers=signed_headers(body, old)).status_code == 401
+
+@pytest.mark.parametrize("events", [
+    {"subscriptionType": "deal.creation", "objectId": 1},
+    [event("deal.creation", 1001), "deal.creation"],
+    [event("deal.creation", 1001), {"objectId": 1002}],
+    [{"subscriptionType": "deal.creation"}],
+    [event("deal.creation", 1001, occurred_at="yesterday")],
+    [{"subscriptionType": "deal.associationChange", "objectId": 1001, "toObjectId": 1002}],
+])
+def test_malformed_events_are_rejected(client, queued, events):
+    assert post_events(client, events).status_code == 400
+    assert queued == []
+
+def test_collapse_keeps_latest_state():
+    changes = WebhookService.collapse([
+        event("deal.deletion", 7, occurred_at=3),
+        event("deal.creation", 7, occurred_at=1),
+        event("contact.propertyChange", 8, occurred_at=2),
+        { "subscriptionType": "contact.merge", "occurredAt": 4, "primaryObjectId": 9, "mergedObjectIds": [10] },
+        {
+            "subscriptionType": "deal.associationChange", "occurredAt": 5,
+            "fromObjectId": 7, "toObjectId": 11, "associationType": "DEAL_TO_TICKET",
+        },
+    ])
+
+    assert changes == {
+        "deals": {"7": "deleted"},
+        "contacts": {"8": "changed", "9": "changed", "10": "deleted"},
+        "tickets": {"11": "changed"},
+    }
+
+def test_collapse_skips_malformed_events():
+    changes = WebhookService.collapse([None, "deal.creation", {"objectId": 1}, event("ticket.creation", 12, occurred_at="late"), event("ticket.creation", 13)])
+
+    assert changes == {"tickets": {"13": "created"}}
+
+def test_applied_events_drop_cached_objects(app, client, auth_headers, hubspot, fake_hubspot):
+    page = client.get("/api/new-crm-objects?limit=2", headers=auth_headers).json["data"]["data"]
+    deal_id = page["contacts"][0]["deals"][0]["id"]
+    assert hubspot.cache.get("deals", deal_id) is not None
+
+    app.extensions["hubspot_webhooks"].apply([event("deal.propertyChange", int(deal_id))])
+
+    assert hubspot.cache.get("deals", deal_id) is None
+    fake_hubspot.reset_stats()
+    response = client.get("/api/new-crm-objects?limit=2", headers=auth_headers)
+    assert response.headers["X-HubSpot-Calls"] == "2"